@@ -0,0 +1,24 @@
+"""既存データに対して派生属性を再構築する
+
+    python backfill.py                  # すべて実行
+    python backfill.py goal-counters    # 指定した処理のみ実行
+"""
+import argparse
+
+import handler
+
+TASKS = {
+    "goal-counters": ("目標カウンタの再構築", handler.backfill_goal_counters),
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tasks", nargs="*", metavar="task", help=f"{' / '.join(TASKS)}（省略時はすべて）")
+    args = parser.parse_args()
+    unknown = [name for name in args.tasks if name not in TASKS]
+    if unknown:
+        parser.error(f"不明な処理: {', '.join(unknown)}")
+
+    for name in args.tasks or TASKS:
+        label, task = TASKS[name]
+        print(f"{label}: {task()} 件")
@@ -0,0 +1,237 @@
+"""レスポンス本文の圧縮
+
+Accept-Encoding で受け付けられる符号化のうち、COMPRESSION_ENCODINGS の先頭にあるものを使う。
+圧縮するのは Content-Type が許可リストにあり、本文が最小サイズ以上のレスポンスだけ
+（小さな本文は圧縮しても縮まらず、CPU を使うだけになる）。StreamingResponse (エクスポート) は
+大きさが分からないため、チャンクを受け取るたびに圧縮して流す。
+
+    gzip  標準ライブラリ (zlib)
+    br    `brotli` パッケージが必要
+    zstd  Python 3.14 の compression.zstd、なければ `zstandard` パッケージが必要
+
+使えない符号化は設定にあっても無視する。
+"""
+import logging
+import zlib
+from collections.abc import Callable, Iterable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Encoders
+# ---------------------------------------------------------------------------
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _brotli_encoder() -> Callable[[int], object] | None:
+    try:
+        import brotli
+    except ImportError:
+        return None
+
+    class _BrotliEncoder:
+        def __init__(self, quality: int):
+            self._compressor = brotli.Compressor(quality=quality)
+
+        def compress(self, data: bytes) -> bytes:
+            return self._compressor.process(data)
+
+        def finish(self) -> bytes:
+            return self._compressor.finish()
+
+    return _BrotliEncoder
+
+
+def _zstd_encoder() -> Callable[[int], object] | None:
+    try:
+        from compression import zstd
+    except ImportError:
+        zstd = None
+    if zstd is not None:
+
+        class _ZstdEncoder:
+            def __init__(self, level: int):
+                self._compressor = zstd.ZstdCompressor(level=level)
+
+            def compress(self, data: bytes) -> bytes:
+                return self._compressor.compress(data)
+
+            def finish(self) -> bytes:
+                return self._compressor.flush()
+
+        return _ZstdEncoder
+
+    try:
+        import zstandard
+    except ImportError:
+        return None
+
+    class _ZstandardEncoder:
+        def __init__(self, level: int):
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+        def compress(self, data: bytes) -> bytes:
+            return self._compressor.compress(data)
+
+        def finish(self) -> bytes:
+            return self._compressor.flush()
+
+    return _ZstandardEncoder
+
+
+# 圧縮レベルの既定値 (速度寄り。API 応答は都度圧縮するため高い圧縮率より CPU を優先する)
+DEFAULT_LEVELS = {"gzip": 6, "br": 4, "zstd": 3}
+
+
+def available_encoders() -> dict[str, Callable[[int], object]]:
+    """この環境で使える符号化と、そのエンコーダー (圧縮レベルを受け取る) を返す"""
+    encoders = {"gzip": _GzipEncoder}
+    for name, load in (("br", _brotli_encoder), ("zstd", _zstd_encoder)):
+        encoder = load()
+        if encoder is not None:
+            encoders[name] = encoder
+    return encoders
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Accept-Encoding を符号化名 → q 値に変換する"""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+
+class CompressionMiddleware:
+    """Accept-Encoding に応じてレスポンス本文を圧縮する ASGI ミドルウェア"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: Iterable[str] = ("gzip",),
+        minimum_size: int = 1024,
+        content_types: Iterable[str] = ("application/json",),
+        levels: dict[str, int] | None = None,
+    ):
+        self.app = app
+        available = available_encoders()
+        self.encodings = []
+        for name in encodings:
+            if name in available:
+                self.encodings.append(name)
+            else:
+                logger.warning("compression encoding %s is not available", name)
+        self.encoders = available
+        self.minimum_size = minimum_size
+        self.content_types = frozenset(content_types)
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+
+    def _negotiate(self, accept_encoding: str) -> str | None:
+        accepted = parse_accept_encoding(accept_encoding)
+        for name in self.encodings:
+            if accepted.get(name, accepted.get("*", 0.0)) > 0:
+                return name
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self._negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """1 レスポンス分の送信を仲介し、条件を満たせば本文を圧縮する"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Message | None = None
+        self._encoder = None
+        self._passthrough = False
+
+    def _is_compressible(self, headers: MutableHeaders) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        return content_type in self.middleware.content_types
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._encoder is None:
+            headers = MutableHeaders(raw=self._start["headers"])
+            if not self._is_compressible(headers) or (not more_body and len(body) < self.middleware.minimum_size):
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+
+            self._encoder = self.middleware.encoders[self.encoding](self.middleware.levels[self.encoding])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            del headers["Content-Length"]
+            if not more_body:
+                data = self._encoder.compress(body) + self._encoder.finish()
+                headers["Content-Length"] = str(len(data))
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": data})
+                return
+            await self._send(self._start)
+
+        if more_body:
+            data = self._encoder.compress(body)
+            if data:
+                await self._send({"type": "http.response.body", "body": data, "more_body": True})
+        else:
+            data = self._encoder.compress(body) + self._encoder.finish()
+            await self._send({"type": "http.response.body", "body": data})
@@ -1,11 +1,29 @@
+import asyncio
+import base64
+import contextvars
+import json
+import logging
+import threading
 import uuid
-from datetime import date, datetime, UTC
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, UTC
+from email.utils import format_datetime, parsedate_to_datetime
 from decimal import Decimal
+from functools import cache, partial
 
 import boto3
-from boto3.dynamodb.conditions import Key
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel, Field
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field, TypeAdapter, create_model
+
+from cache import cached, set_generation_source, use_generation
+from metrics import instrument_dynamodb
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Schemas
@@ -39,6 +57,7 @@ class GoalResponse(BaseModel):
     status: str = "active"
     target_date: str | None = None
     subject: str = ""
+    records_count: int = 0
     created_at: str
     updated_at: str
 
@@ -54,6 +73,18 @@ class GoalProgress(BaseModel):
     records_count: int
 
 
+class GoalWithProgress(GoalResponse):
+    progress_percent: float
+    remaining_hours: float
+
+
+class GoalChangesResponse(BaseModel):
+    token: str
+    reset: bool
+    upserts: list[GoalWithProgress]
+    deletes: list[str]
+
+
 # ---------------------------------------------------------------------------
 # DynamoDB helpers
 # ---------------------------------------------------------------------------
@@ -64,16 +95,100 @@ def _get_settings():
     return settings
 
 
-def _get_dynamodb_resource():
+_dynamodb_resource = None
+_dynamodb_resource_lock = threading.Lock()
+
+
+def _build_dynamodb_resource():
     s = _get_settings()
+    config = Config(
+        max_pool_connections=s.dynamodb_max_pool_connections,
+        tcp_keepalive=s.dynamodb_tcp_keepalive,
+        connect_timeout=s.dynamodb_connect_timeout,
+        read_timeout=s.dynamodb_read_timeout,
+        retries={"max_attempts": s.dynamodb_max_attempts, "mode": s.dynamodb_retry_mode},
+    )
     kwargs = {
         "region_name": s.dynamodb_region,
         "aws_access_key_id": s.aws_access_key_id,
         "aws_secret_access_key": s.aws_secret_access_key,
+        "config": config,
     }
     if s.dynamodb_endpoint:
         kwargs["endpoint_url"] = s.dynamodb_endpoint
-    return boto3.resource("dynamodb", **kwargs)
+    return _prepare_resource(boto3.session.Session().resource("dynamodb", **kwargs))
+
+
+class _NumberDeserializer(TypeDeserializer):
+    """数値 (N) を Decimal ではなく int / float として読み取る"""
+
+    def _deserialize_n(self, value):
+        return int(value) if value.lstrip("-").isdigit() else float(value)
+
+
+def _install_number_deserializer(resource):
+    """リソースが応答の変換に使う deserializer を _NumberDeserializer に置き換える"""
+    injector = getattr(resource, "_injector", None)
+    if injector is not None:
+        injector._deserializer = _NumberDeserializer()
+    return resource
+
+
+def _prepare_resource(resource):
+    """共有リソースに数値の変換と計測用のイベントフックを設定する"""
+    _install_number_deserializer(resource)
+    s = _get_settings()
+    if s.metrics_enabled:
+        instrument_dynamodb(resource.meta.client, consumed_capacity=s.metrics_consumed_capacity)
+    return resource
+
+
+def _get_dynamodb_resource():
+    """プロセス内で共有する DynamoDB リソースを返す（初回呼び出し時に生成）"""
+    global _dynamodb_resource
+    if _dynamodb_resource is None:
+        with _dynamodb_resource_lock:
+            if _dynamodb_resource is None:
+                _dynamodb_resource = _build_dynamodb_resource()
+    return _dynamodb_resource
+
+
+def set_dynamodb_resource(resource) -> None:
+    """共有 DynamoDB リソースを差し替える（テストで moto のリソースを注入する用途）"""
+    global _dynamodb_resource
+    with _dynamodb_resource_lock:
+        _dynamodb_resource = _prepare_resource(resource) if resource is not None else None
+
+
+def reset_dynamodb_resource() -> None:
+    """共有 DynamoDB リソースを破棄し、次回呼び出し時に設定から再生成させる"""
+    set_dynamodb_resource(None)
+
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str) -> ThreadPoolExecutor:
+    """DynamoDB 呼び出し用のスレッドプールを用途ごとに 1 つ返す"""
+    if name not in _executors:
+        with _executors_lock:
+            if name not in _executors:
+                _executors[name] = ThreadPoolExecutor(
+                    max_workers=_get_settings().dynamodb_max_concurrency,
+                    thread_name_prefix=f"dynamodb-{name}",
+                )
+    return _executors[name]
+
+
+async def _run(func, *args, **kwargs):
+    """同期の DynamoDB 処理を専用スレッドプールで実行し、イベントループを塞がないようにする
+
+    boto3 のクライアントはスレッドセーフなため、共有リソースをそのまま使える。
+    同時実行数は Starlette の既定スレッドプール (40) ではなく DYNAMODB_MAX_CONCURRENCY で決まる。
+    """
+    call = partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor("request"), call)
 
 
 def _get_goals_table():
@@ -84,6 +199,110 @@ def _get_records_table():
     return _get_dynamodb_resource().Table(_get_settings().records_table_name)
 
 
+def _get_versions_table():
+    return _get_dynamodb_resource().Table(_get_settings().versions_table_name)
+
+
+def _get_changes_table():
+    return _get_dynamodb_resource().Table(_get_settings().changes_table_name)
+
+
+_type_serializer = TypeSerializer()
+_type_deserializer = TypeDeserializer()
+
+
+class InvalidCursorError(ValueError):
+    """ページングカーソルを解釈できない、または別ユーザー・別の条件の一覧のものである"""
+
+
+# カーソルに含める、発行した一覧の条件 (絞り込み) の属性名
+CURSOR_FILTER_ATTRIBUTE = "filter"
+
+
+def _cursor_filter(*values) -> str:
+    """一覧の条件を 1 つの文字列にする（別の条件で渡されたカーソルを見分けるため）"""
+    return json.dumps([None if v is None else str(v) for v in values], separators=(",", ":"))
+
+
+def _check_cursor(cursor: str, user_id: str, cursor_filter: str, keys: set[str]) -> dict:
+    """カーソルを読み、ユーザー・一覧の条件・キー属性が揃っていることを確かめて開始キーを返す"""
+    start = _decode_cursor(cursor)
+    if (
+        start.get("user_id") != user_id
+        or start.pop(CURSOR_FILTER_ATTRIBUTE, None) != cursor_filter
+        or not keys <= start.keys()
+    ):
+        raise InvalidCursorError(cursor)
+    return start
+
+
+def _encode_cursor(key: dict) -> str:
+    raw = json.dumps(
+        {k: _type_serializer.serialize(v) for k, v in key.items()},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return {k: _type_deserializer.deserialize(v) for k, v in json.loads(raw).items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursorError(cursor) from e
+
+
+def _query_all(table, **kwargs) -> Iterator[dict]:
+    """LastEvaluatedKey を辿りながら query の結果を 1 件ずつ返す"""
+    while True:
+        resp = table.query(**kwargs)
+        yield from resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _scan_all(table, **kwargs) -> Iterator[dict]:
+    """LastEvaluatedKey を辿りながら scan の結果を 1 件ずつ返す"""
+    while True:
+        resp = table.scan(**kwargs)
+        yield from resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _projection_kwargs(fields: Iterable[str] | None) -> dict:
+    """取得する属性を fields に絞る ProjectionExpression を組み立てる（None なら全属性）"""
+    if not fields:
+        return {}
+    names = {f"#p{i}": name for i, name in enumerate(fields)}
+    return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+
+def _query_page(
+    table, limit: int, start_key: dict | None, cursor_filter: str = "", **kwargs
+) -> tuple[list[dict], str | None]:
+    """1 ページ分 query し、次ページ用のカーソル (一覧の条件 cursor_filter を含む) と合わせて返す
+
+    FilterExpression で除かれた分は読み足し、limit 件に満たないページを返さないようにする。
+    """
+    items = []
+    while True:
+        kwargs["Limit"] = limit - len(items)
+        if start_key:
+            kwargs["ExclusiveStartKey"] = start_key
+        resp = table.query(**kwargs)
+        items += resp.get("Items", [])
+        start_key = resp.get("LastEvaluatedKey")
+        if not start_key:
+            return items, None
+        if len(items) >= limit:
+            return items, _encode_cursor({**start_key, CURSOR_FILTER_ATTRIBUTE: cursor_filter})
+
+
 # ---------------------------------------------------------------------------
 # Dependencies
 # ---------------------------------------------------------------------------
@@ -93,31 +312,100 @@ def get_user_id() -> str:
     return _get_settings().default_user_id
 
 
+def _get_repository():
+    from repository import get_repository
+    return get_repository()
+
+
 # ---------------------------------------------------------------------------
 # Business logic
 # ---------------------------------------------------------------------------
 
 
 def _serialize_goal(item: dict) -> dict:
-    result = dict(item)
-    for key, value in result.items():
-        if isinstance(value, Decimal):
-            result[key] = float(value)
+    # 数値は _NumberDeserializer が読み取り時に int / float へ変換している
+    result = {"target_date": None, **item}
+    if "target_hours" in result:
+        result["target_hours"] = float(result["target_hours"])
+    # current_minutes / records_count は records API が学習記録の書き込み時に加算する
+    if "current_minutes" in result:
+        result["current_hours"] = round(result.pop("current_minutes") / 60, 2)
+    result.setdefault("current_hours", 0.0)
+    result["records_count"] = int(result.get("records_count", 0))
     return result
 
 
-def create_goal(user_id: str, data: dict) -> dict:
-    table = _get_goals_table()
-    now = datetime.now(UTC).isoformat()
-    goal_id = str(uuid.uuid4())
+def get_version(user_id: str) -> dict:
+    """ユーザーの目標データの版数と最終更新時刻を返す
+
+    版数は目標の書き込みと、records API による進捗カウンタの加減算のたびに 1 増える。
+    """
+    resp = _get_versions_table().get_item(
+        Key={"user_id": user_id, "scope": "goals"}, ConsistentRead=True
+    )
+    item = resp.get("Item", {})
+    return {"version": int(item.get("version", 0)), "updated_at": item.get("updated_at")}
+
+
+# キャッシュの世代は goals の版数（records API による進捗カウンタの更新や、他のプロセスの書き込みでも進む）
+set_generation_source(lambda user_id, scope: get_version(user_id)["version"])
 
+
+def _change_key(scope: str, version: int) -> str:
+    # 版数を 0 埋めし、文字列の順序を版数の順序に揃える（records API と同じ形）
+    return f"{scope}#{version:012d}"
+
+
+def _bump_version(user_id: str, log: list[tuple[str, str]]) -> None:
+    """版数を 1 進め、変更ログに新しい版で変わった ID（と操作）を書く
+
+    records API も学習記録の書き込みで goals の版数を進める。版数は ADD で割り当てるため競合しない。
+    目標の書き込みは確定した後なので、ここで失敗しても例外にはせずログに残す
+    （変更ログが欠けた版は _read_change_log が reset として返す）。
+    """
+    s = _get_settings()
+    now = datetime.now(UTC)
+    try:
+        resp = _get_versions_table().update_item(
+            Key={"user_id": user_id, "scope": "goals"},
+            UpdateExpression="SET updated_at = :now ADD version :one",
+            ExpressionAttributeValues={":now": now.isoformat(), ":one": 1},
+            ReturnValues="UPDATED_NEW",
+        )
+        version = resp["Attributes"]["version"]
+        _get_changes_table().put_item(Item={
+            "user_id": user_id,
+            "change_key": _change_key("goals", version),
+            "version": version,
+            "upserts": [goal_id for goal_id, op in log if op == "upsert"],
+            "deletes": [goal_id for goal_id, op in log if op == "delete"],
+            "reset": any(op == "reset" for _, op in log),
+            "changed_at": now.isoformat(),
+            "expires_at": int((now + timedelta(days=s.changes_retention_days)).timestamp()),
+        })
+    except ClientError:
+        logger.exception("failed to record a change: user=%s scope=goals", user_id)
+
+
+def _mark_changed(user_id: str, log: list[tuple[str, str]]) -> None:
+    """書き込みの反映後に版数を進める（変更ログも同時に書く）
+
+    キャッシュは版数を世代に使うため、版数が進めば古いエントリは参照されなくなる。
+    log は [(goal_id, "upsert" / "delete")]。ID を書かない一括の書き込みは [("", "reset")]。
+    """
+    _bump_version(user_id, log)
+
+
+def _build_goal_item(user_id: str, data: dict, now: str) -> dict:
+    """GoalCreate の内容から保存するアイテムを組み立てる"""
     item = {
         "user_id": user_id,
-        "goal_id": goal_id,
+        "goal_id": str(uuid.uuid4()),
         "title": data["title"],
         "description": data.get("description", ""),
         "target_hours": Decimal(str(data["target_hours"])),
-        "current_hours": Decimal("0"),
+        "current_minutes": 0,
+        "records_count": 0,
         "status": "active",
         "subject": data.get("subject", ""),
         "created_at": now,
@@ -125,50 +413,97 @@ def create_goal(user_id: str, data: dict) -> dict:
     }
     if data.get("target_date"):
         item["target_date"] = str(data["target_date"])
+    return item
+
 
-    table.put_item(Item=item)
+def create_goal(user_id: str, data: dict) -> dict:
+    item = _build_goal_item(user_id, data, datetime.now(UTC).isoformat())
+    _get_goals_table().put_item(Item=item)
+    _mark_changed(user_id, [(item["goal_id"], "upsert")])
     return _serialize_goal(item)
 
 
-def get_goal(user_id: str, goal_id: str) -> dict | None:
-    table = _get_goals_table()
-    resp = table.get_item(Key={"user_id": user_id, "goal_id": goal_id})
+def _read_goal(user_id: str, goal_id: str) -> dict | None:
+    resp = _get_goals_table().get_item(Key={"user_id": user_id, "goal_id": goal_id})
     item = resp.get("Item")
     return _serialize_goal(item) if item else None
 
 
-def list_goals(user_id: str, status: str | None = None) -> list[dict]:
-    table = _get_goals_table()
+@cached("goals")
+def get_goal(user_id: str, goal_id: str) -> dict | None:
+    return _read_goal(user_id, goal_id)
+
+
+# API のフィールド名と DynamoDB の属性名が異なるもの
+_FIELD_ATTRIBUTES = {"current_hours": "current_minutes"}
+
 
+def _goals_query_kwargs(user_id: str, status: str | None, fields: tuple[str, ...] | None = None) -> dict:
+    """fields 指定時は、その属性と並べ替えに使う created_at だけを読む"""
+    projection = None
+    if fields:
+        projection = dict.fromkeys([*(_FIELD_ATTRIBUTES.get(f, f) for f in fields), "created_at"])
+    kwargs = _projection_kwargs(projection)
     if status:
-        resp = table.query(
-            IndexName="status-index",
-            KeyConditionExpression=Key("user_id").eq(user_id) & Key("status").eq(status),
-        )
-    else:
-        resp = table.query(KeyConditionExpression=Key("user_id").eq(user_id))
+        return {
+            "IndexName": "status-index",
+            "KeyConditionExpression": Key("user_id").eq(user_id) & Key("status").eq(status),
+            **kwargs,
+        }
+    return {"KeyConditionExpression": Key("user_id").eq(user_id), **kwargs}
 
-    items = [_serialize_goal(i) for i in resp.get("Items", [])]
+
+@cached("goals")
+def list_goals(user_id: str, status: str | None = None, fields: tuple[str, ...] | None = None) -> list[dict]:
+    table = _get_goals_table()
+    items = [_serialize_goal(i) for i in _query_all(table, **_goals_query_kwargs(user_id, status, fields))]
     items.sort(key=lambda x: x.get("created_at", ""), reverse=True)
     return items
 
 
-def update_goal(user_id: str, goal_id: str, data: dict) -> dict | None:
-    existing = get_goal(user_id, goal_id)
-    if not existing:
-        return None
+@cached("goals")
+def list_goals_page(
+    user_id: str,
+    limit: int,
+    cursor: str | None = None,
+    status: str | None = None,
+    fields: tuple[str, ...] | None = None,
+) -> tuple[list[dict], str | None]:
+    """目標を created_at の降順で 1 ページ分返す
 
-    table = _get_goals_table()
+    created-index (user_id, created_at) を降順に読むため、ページをまたいでも全件の一覧と同じ順になる。
+    status は FilterExpression で絞り込む。
+    """
+    cursor_filter = _cursor_filter(status)
+    start_key = _check_cursor(cursor, user_id, cursor_filter, {"goal_id", "created_at"}) if cursor else None
+
+    kwargs = {
+        **_goals_query_kwargs(user_id, None, fields),
+        "IndexName": "created-index",
+        "ScanIndexForward": False,
+    }
+    if status:
+        kwargs["FilterExpression"] = Attr("status").eq(status)
+    items, next_cursor = _query_page(_get_goals_table(), limit, start_key, cursor_filter, **kwargs)
+    return [_serialize_goal(i) for i in items], next_cursor
+
+
+def _is_condition_failed(e: ClientError) -> bool:
+    return e.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+
+def update_goal(user_id: str, goal_id: str, data: dict) -> dict | None:
     update_fields = {k: v for k, v in data.items() if v is not None}
     if not update_fields:
-        return existing
+        return get_goal(user_id, goal_id)
 
+    table = _get_goals_table()
     update_fields["updated_at"] = datetime.now(UTC).isoformat()
 
     for key, value in update_fields.items():
         if hasattr(value, "isoformat"):
             update_fields[key] = str(value)
-        if key in ("target_hours", "current_hours") and not isinstance(value, Decimal):
+        if key == "target_hours" and not isinstance(value, Decimal):
             update_fields[key] = Decimal(str(value))
 
     update_expr_parts = []
@@ -182,72 +517,214 @@ def update_goal(user_id: str, goal_id: str, data: dict) -> dict | None:
         expr_names[placeholder_name] = key
         expr_values[placeholder_value] = value
 
-    table.update_item(
-        Key={"user_id": user_id, "goal_id": goal_id},
-        UpdateExpression="SET " + ", ".join(update_expr_parts),
-        ExpressionAttributeNames=expr_names,
-        ExpressionAttributeValues=expr_values,
-    )
+    # 存在確認・更新・更新後の取得を 1 回の条件付き書き込みで行う
+    try:
+        resp = table.update_item(
+            Key={"user_id": user_id, "goal_id": goal_id},
+            UpdateExpression="SET " + ", ".join(update_expr_parts),
+            ConditionExpression=Attr("goal_id").exists(),
+            ExpressionAttributeNames=expr_names,
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_NEW",
+        )
+    except ClientError as e:
+        if _is_condition_failed(e):
+            return None
+        raise
 
-    return get_goal(user_id, goal_id)
+    _mark_changed(user_id, [(goal_id, "upsert")])
+    return _serialize_goal(resp["Attributes"])
 
 
 def delete_goal(user_id: str, goal_id: str) -> bool:
-    existing = get_goal(user_id, goal_id)
-    if not existing:
-        return False
-
     table = _get_goals_table()
-    table.delete_item(Key={"user_id": user_id, "goal_id": goal_id})
+    try:
+        table.delete_item(
+            Key={"user_id": user_id, "goal_id": goal_id},
+            ConditionExpression=Attr("goal_id").exists(),
+        )
+    except ClientError as e:
+        if _is_condition_failed(e):
+            return False
+        raise
+
+    _mark_changed(user_id, [(goal_id, "delete")])
     return True
 
 
-def recalculate_current_hours(user_id: str, goal_id: str) -> dict | None:
-    """目標に紐づく学習記録から現在の学習時間を再計算"""
-    goal = get_goal(user_id, goal_id)
-    if not goal:
-        return None
+def _aggregate_goal_records(user_id: str, goal_id: str) -> tuple[int, int]:
+    """goal-index から目標に紐づく学習記録の合計時間（分）と件数を集計"""
+    records = _query_all(
+        _get_records_table(),
+        IndexName="goal-index",
+        KeyConditionExpression=Key("goal_id").eq(goal_id),
+        ProjectionExpression="user_id, duration_minutes",
+    )
 
-    records_table = _get_records_table()
-    resp = records_table.query(KeyConditionExpression=Key("user_id").eq(user_id))
-    records = resp.get("Items", [])
+    total_minutes = 0
+    records_count = 0
+    for r in records:
+        if r["user_id"] != user_id:
+            continue
+        total_minutes += int(r["duration_minutes"])
+        records_count += 1
+    return total_minutes, records_count
 
-    total_minutes = sum(
-        int(r["duration_minutes"])
-        for r in records
-        if r.get("goal_id") == goal_id
+
+def recalculate_current_hours(user_id: str, goal_id: str) -> dict | None:
+    """目標に紐づく学習記録から current_minutes / records_count を再構築
+
+    通常は records API が書き込み時にカウンタを加算するため、データ移行や
+    不整合の修復にのみ使う。
+    """
+    total_minutes, records_count = _aggregate_goal_records(user_id, goal_id)
+    return update_goal(
+        user_id, goal_id, {"current_minutes": total_minutes, "records_count": records_count}
     )
-    current_hours = round(total_minutes / 60, 2)
 
-    return update_goal(user_id, goal_id, {"current_hours": current_hours})
 
+def backfill_goal_counters() -> int:
+    """全目標のカウンタを学習記録から再構築し、処理件数を返す"""
+    count = 0
+    for item in _scan_all(_get_goals_table(), ProjectionExpression="user_id, goal_id"):
+        recalculate_current_hours(item["user_id"], item["goal_id"])
+        count += 1
+    return count
 
-def get_goal_progress(user_id: str, goal_id: str) -> dict | None:
-    goal = recalculate_current_hours(user_id, goal_id)
-    if not goal:
-        return None
 
+def _progress_fields(goal: dict) -> dict:
     target = goal["target_hours"]
     current = goal["current_hours"]
     progress = min(round((current / target) * 100, 1), 100.0) if target > 0 else 0.0
-    remaining = max(target - current, 0)
+    remaining = max(target - current, 0.0)
+    return {"progress_percent": progress, "remaining_hours": round(remaining, 2)}
 
-    records_table = _get_records_table()
-    resp = records_table.query(KeyConditionExpression=Key("user_id").eq(user_id))
-    records_count = sum(1 for r in resp.get("Items", []) if r.get("goal_id") == goal_id)
 
+def _goal_progress(goal: dict) -> dict:
     return {
-        "goal_id": goal_id,
+        "goal_id": goal["goal_id"],
         "title": goal["title"],
-        "target_hours": target,
-        "current_hours": current,
-        "progress_percent": progress,
-        "remaining_hours": round(remaining, 2),
+        "target_hours": goal["target_hours"],
+        "current_hours": goal["current_hours"],
         "status": goal["status"],
-        "records_count": records_count,
+        "records_count": goal["records_count"],
+        **_progress_fields(goal),
     }
 
 
+@cached("goals")
+def get_goal_progress(user_id: str, goal_id: str) -> dict | None:
+    # キャッシュした関数の中から別のキャッシュした関数を呼ぶと、版数を読み直すため直接読む
+    goal = _read_goal(user_id, goal_id)
+    return _goal_progress(goal) if goal else None
+
+
+def list_goal_progress(user_id: str, status: str | None = None) -> list[dict]:
+    """目標一覧を進捗付きで返す（目標ごとに /progress を呼ばずに済むよう、1 回の query で済ませる）"""
+    return [{**goal, **_progress_fields(goal)} for goal in list_goals(user_id, status=status)]
+
+
+def _sync_token(user_id: str, scope: str, version: dict) -> str:
+    return _encode_cursor(
+        {"user_id": user_id, "scope": scope, "version": version["version"], "updated_at": version["updated_at"]}
+    )
+
+
+def _is_sync_expired(updated_at: str | None) -> bool:
+    """トークンの版が変更ログの保持期間より古い（それ以降の変更ログが消えているかもしれない）"""
+    if not updated_at:
+        return False
+    cutoff = datetime.now(UTC) - timedelta(days=_get_settings().changes_retention_days)
+    return datetime.fromisoformat(updated_at) < cutoff
+
+
+def _collect_changes(
+    user_id: str,
+    scope: str,
+    since: str | None,
+    version: dict,
+    read_log: Callable[[int, int], Iterable[tuple[str, str]]],
+    fetch: Callable[[list[str]], list[dict]],
+    id_key: str,
+) -> dict:
+    """同期トークン since 以降の変更を、現在のアイテム（upserts）と削除された ID（deletes）にまとめる
+
+    records API の同名の関数と同じ。トークンがない・保持期間を過ぎた・変更が多すぎる場合は reset を返す。
+    """
+    result = {"token": _sync_token(user_id, scope, version), "reset": False, "upserts": [], "deletes": []}
+    if since is None:
+        return {**result, "reset": True}
+    after = _decode_cursor(since)
+    try:
+        after_version = int(after["version"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidCursorError(since) from e
+    if after.get("user_id") != user_id or after.get("scope") != scope:
+        raise InvalidCursorError(since)
+    if after_version > version["version"] or _is_sync_expired(after.get("updated_at")):
+        return {**result, "reset": True}
+
+    # 同じ ID が何度も変わっていれば、最後の操作だけが残る
+    ops: dict[str, str] = {}
+    if after_version < version["version"]:
+        for item_id, op in read_log(after_version, version["version"]):
+            if op == "reset":
+                return {**result, "reset": True}
+            ops[item_id] = op
+    if len(ops) > _get_settings().changes_max_items:
+        return {**result, "reset": True}
+
+    found = {item[id_key]: item for item in fetch([i for i, op in ops.items() if op == "upsert"])}
+    result["upserts"] = [found[i] for i in ops if i in found]
+    result["deletes"] = [i for i in ops if i not in found]
+    return result
+
+
+def _read_change_log(user_id: str, after: int, until: int) -> Iterator[tuple[str, str]]:
+    entries = _query_all(
+        _get_changes_table(),
+        KeyConditionExpression=Key("user_id").eq(user_id)
+        & Key("change_key").between(_change_key("goals", after + 1), _change_key("goals", until)),
+    )
+    expected = after + 1
+    for entry in entries:
+        # 版が飛んでいれば、変更ログを書けなかった（または書き込み中の）版がある
+        if entry.get("reset") or entry["version"] != expected:
+            yield "", "reset"
+            return
+        expected += 1
+        yield from ((goal_id, "upsert") for goal_id in entry["upserts"])
+        yield from ((goal_id, "delete") for goal_id in entry["deletes"])
+    if expected != until + 1:
+        yield "", "reset"
+
+
+def _get_goals_by_ids(user_id: str, goal_ids: list[str]) -> list[dict]:
+    """目標を進捗付きで返す（ユーザーの目標は少ないため、1 回の query で全件読んで絞る）"""
+    if not goal_ids:
+        return []
+    wanted = set(goal_ids)
+    goals = (
+        _serialize_goal(item)
+        for item in _query_all(_get_goals_table(), KeyConditionExpression=Key("user_id").eq(user_id))
+        if item["goal_id"] in wanted
+    )
+    return [{**goal, **_progress_fields(goal)} for goal in goals]
+
+
+def get_changes(user_id: str, since: str | None) -> dict:
+    """同期トークン since 以降に作成・更新・削除された目標（進捗付き）と、次の同期トークンを返す"""
+    return _collect_changes(
+        user_id,
+        "goals",
+        since,
+        get_version(user_id),
+        partial(_read_change_log, user_id),
+        partial(_get_goals_by_ids, user_id),
+        "goal_id",
+    )
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
@@ -255,60 +732,202 @@ def get_goal_progress(user_id: str, goal_id: str) -> dict | None:
 router = APIRouter()
 
 
+DEFAULT_PAGE_LIMIT = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _validator_headers(version: dict) -> dict[str, str]:
+    headers = {"ETag": f'W/"{version["version"]}"', "Cache-Control": "no-cache"}
+    if version["updated_at"]:
+        headers["Last-Modified"] = format_datetime(datetime.fromisoformat(version["updated_at"]), usegmt=True)
+    return headers
+
+
+def _is_not_modified(request: Request, version: dict, etag: str) -> bool:
+    """If-None-Match (優先) / If-Modified-Since を版数と比べる"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and version["updated_at"]:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        updated_at = datetime.fromisoformat(version["updated_at"]).replace(microsecond=0)
+        return updated_at <= since
+    return False
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """fields クエリ (カンマ区切り) を検証する。goal_id は常に含める"""
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in GoalResponse.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不明なフィールドです: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["goal_id", *names]))
+
+
+@cache
+def _projected_list_adapter(fields: tuple[str, ...]) -> TypeAdapter:
+    """GoalResponse から指定フィールドだけを持つ一覧用モデルを作る"""
+    model = create_model(
+        "GoalProjection",
+        **{name: (GoalResponse.model_fields[name].annotation, GoalResponse.model_fields[name]) for name in fields},
+    )
+    return TypeAdapter(list[model])
+
+
+def _projected_response(items: list[dict], fields: tuple[str, ...], response: Response) -> Response:
+    adapter = _projected_list_adapter(fields)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(items)),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+
+def _get_json_response_class():
+    from main import json_response_class
+    return json_response_class
+
+
+def _trusted_response(content, response: Response) -> Response:
+    """内部で組み立てたデータを response_model で検証し直さずに返す（_serialize_goal が API の形に揃えている）"""
+    return _get_json_response_class()(content, headers=dict(response.headers))
+
+
+async def _conditional_get(request: Request, response: Response, user_id: str) -> Response | None:
+    """条件付き GET を処理する
+
+    データが変わっていなければ 304 を返す。変わっていれば検証子ヘッダーを response に付けて None を返す。
+    読んだ版数はキャッシュの世代にも使い、検証子と本文が同じ版数のものになるようにする。
+    """
+    version = await _run(_get_repository().get_version, user_id)
+    headers = _validator_headers(version)
+    if _is_not_modified(request, version, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    use_generation("goals", user_id, version["version"])
+    response.headers.update(headers)
+    return None
+
+
 @router.get("/", response_model=list[GoalResponse])
-def route_list_goals(
+async def route_list_goals(
+    request: Request,
+    response: Response,
     status: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    fields: str | None = Query(None, description="返すフィールド (カンマ区切り)。指定したフィールドだけを読み取る"),
     user_id: str = Depends(get_user_id),
 ):
-    return list_goals(user_id, status=status)
+    projection = _parse_fields(fields)
+    not_modified = await _conditional_get(request, response, user_id)
+    if not_modified is not None:
+        return not_modified
+
+    if limit is None and cursor is None:
+        items = await _run(_get_repository().list_goals, user_id, status=status, fields=projection)
+    else:
+        try:
+            items, next_cursor = await _run(
+                _get_repository().list_goals_page,
+                user_id,
+                limit or DEFAULT_PAGE_LIMIT,
+                cursor,
+                status=status,
+                fields=projection,
+            )
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="カーソルが不正です")
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    if projection:
+        return _projected_response(items, projection, response)
+    return _trusted_response(items, response)
 
 
 @router.post("/", response_model=GoalResponse, status_code=201)
-def route_create_goal(
+async def route_create_goal(
     body: GoalCreate,
     user_id: str = Depends(get_user_id),
 ):
-    return create_goal(user_id, body.model_dump())
+    return await _run(_get_repository().create_goal, user_id, body.model_dump())
+
+
+@router.get("/progress", response_model=list[GoalWithProgress])
+async def route_list_goal_progress(
+    request: Request,
+    response: Response,
+    status: str | None = Query(None),
+    user_id: str = Depends(get_user_id),
+):
+    not_modified = await _conditional_get(request, response, user_id)
+    if not_modified is not None:
+        return not_modified
+    goals = await _run(_get_repository().list_goal_progress, user_id, status=status)
+    return _trusted_response(goals, response)
+
+
+@router.get("/changes", response_model=GoalChangesResponse)
+async def route_get_changes(
+    response: Response,
+    since: str | None = Query(None, description="前回の応答の token。省略すると reset と現在の token だけを返す"),
+    user_id: str = Depends(get_user_id),
+):
+    try:
+        changes = await _run(_get_repository().get_changes, user_id, since)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="同期トークンが不正です")
+    return _trusted_response(changes, response)
 
 
 @router.get("/{goal_id}", response_model=GoalResponse)
-def route_get_goal(
+async def route_get_goal(
     goal_id: str,
     user_id: str = Depends(get_user_id),
 ):
-    goal = get_goal(user_id, goal_id)
+    goal = await _run(_get_repository().get_goal, user_id, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="目標が見つかりません")
     return goal
 
 
 @router.get("/{goal_id}/progress", response_model=GoalProgress)
-def route_get_goal_progress(
+async def route_get_goal_progress(
     goal_id: str,
     user_id: str = Depends(get_user_id),
 ):
-    progress = get_goal_progress(user_id, goal_id)
+    progress = await _run(_get_repository().get_goal_progress, user_id, goal_id)
     if not progress:
         raise HTTPException(status_code=404, detail="目標が見つかりません")
     return progress
 
 
 @router.put("/{goal_id}", response_model=GoalResponse)
-def route_update_goal(
+async def route_update_goal(
     goal_id: str,
     body: GoalUpdate,
     user_id: str = Depends(get_user_id),
 ):
-    goal = update_goal(user_id, goal_id, body.model_dump(exclude_unset=True))
+    goal = await _run(
+        _get_repository().update_goal, user_id, goal_id, body.model_dump(exclude_unset=True)
+    )
     if not goal:
         raise HTTPException(status_code=404, detail="目標が見つかりません")
     return goal
 
 
 @router.delete("/{goal_id}", status_code=204)
-def route_delete_goal(
+async def route_delete_goal(
     goal_id: str,
     user_id: str = Depends(get_user_id),
 ):
-    if not delete_goal(user_id, goal_id):
+    if not await _run(_get_repository().delete_goal, user_id, goal_id):
         raise HTTPException(status_code=404, detail="目標が見つかりません")
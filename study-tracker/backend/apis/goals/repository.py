@@ -0,0 +1,274 @@
+"""目標の保存先 (リポジトリ)
+
+ルートは get_repository() が返す実装を通して読み書きする。実装は STORAGE_BACKEND で選ぶ:
+    dynamodb  DynamoDB（既定）。handler のビジネスロジック（キャッシュ・進捗カウンタ）をそのまま使う
+    sqlite    組み込みの SQLite（SQLITE_PATH）。1 台で動かす構成向け。進捗は学習記録から SQL の集約で計算する
+
+Records / Goals API は同じ STORAGE_BACKEND・SQLITE_PATH で動かす。
+"""
+import threading
+from datetime import UTC, datetime
+from typing import Protocol
+
+import handler
+from handler import GoalResponse, GoalUpdate
+from sqlite_store import SQLiteStore
+
+
+class GoalRepository(Protocol):
+    def create_goal(self, user_id: str, data: dict) -> dict: ...
+
+    def get_goal(self, user_id: str, goal_id: str) -> dict | None: ...
+
+    def list_goals(
+        self, user_id: str, status: str | None = None, fields: tuple[str, ...] | None = None
+    ) -> list[dict]: ...
+
+    def list_goals_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: str | None = None,
+        status: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> tuple[list[dict], str | None]: ...
+
+    def update_goal(self, user_id: str, goal_id: str, data: dict) -> dict | None: ...
+
+    def delete_goal(self, user_id: str, goal_id: str) -> bool: ...
+
+    def get_goal_progress(self, user_id: str, goal_id: str) -> dict | None: ...
+
+    def list_goal_progress(self, user_id: str, status: str | None = None) -> list[dict]: ...
+
+    def get_version(self, user_id: str) -> dict: ...
+
+    def get_changes(self, user_id: str, since: str | None) -> dict: ...
+
+
+# ---------------------------------------------------------------------------
+# DynamoDB
+# ---------------------------------------------------------------------------
+
+
+class DynamoDBGoalRepository:
+    """handler の DynamoDB 実装をそのまま使う"""
+
+    create_goal = staticmethod(handler.create_goal)
+    get_goal = staticmethod(handler.get_goal)
+    list_goals = staticmethod(handler.list_goals)
+    list_goals_page = staticmethod(handler.list_goals_page)
+    update_goal = staticmethod(handler.update_goal)
+    delete_goal = staticmethod(handler.delete_goal)
+    get_goal_progress = staticmethod(handler.get_goal_progress)
+    list_goal_progress = staticmethod(handler.list_goal_progress)
+    get_version = staticmethod(handler.get_version)
+    get_changes = staticmethod(handler.get_changes)
+
+
+# ---------------------------------------------------------------------------
+# SQLite
+# ---------------------------------------------------------------------------
+
+
+_GOAL_COLUMNS = (
+    "goal_id", "user_id", "title", "description", "target_hours", "status",
+    "target_date", "subject", "created_at", "updated_at",
+)
+# 学習記録から集約する項目（どちらも要求されなければ records を読まない）
+_PROGRESS_FIELDS = frozenset({"current_hours", "records_count"})
+_UPDATABLE_COLUMNS = frozenset(GoalUpdate.model_fields)
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def _select_goals_sql(fields: tuple[str, ...] | None, where: str) -> str:
+    """目標を読む SELECT を組み立てる（進捗は (user_id, goal_id) のインデックスで学習記録を集約する）"""
+    names = fields or tuple(GoalResponse.model_fields)
+    columns = [c for c in _GOAL_COLUMNS if c in names or c in ("goal_id", "created_at")]
+    select = ", ".join(f"g.{c}" for c in columns)
+    if _PROGRESS_FIELDS.isdisjoint(names):
+        return f"SELECT {select} FROM goals g WHERE {where}"
+    return (
+        f"SELECT {select}, COALESCE(SUM(r.duration_minutes), 0) AS current_minutes, "
+        "COUNT(r.record_id) AS records_count "
+        "FROM goals g LEFT JOIN records r ON r.user_id = g.user_id AND r.goal_id = g.goal_id "
+        f"WHERE {where} GROUP BY g.user_id, g.goal_id"
+    )
+
+
+class SQLiteGoalRepository:
+    """目標を SQLite に保存する実装
+
+    進捗カウンタは持たず、current_hours / records_count は読み取りのたびに学習記録から集約する。
+    読み取りはプロセス内で完結するため、キャッシュは使わない。
+    """
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def close(self) -> None:
+        self.store.close()
+
+    def create_goal(self, user_id: str, data: dict) -> dict:
+        item = handler._build_goal_item(user_id, data, _now())
+        item["target_hours"] = float(item["target_hours"])
+        with self.store.transaction() as conn:
+            conn.execute(
+                f"INSERT INTO goals ({', '.join(_GOAL_COLUMNS)}) VALUES ({', '.join('?' * len(_GOAL_COLUMNS))})",
+                tuple(item.get(column) for column in _GOAL_COLUMNS),
+            )
+            self.store.bump_versions(conn, user_id, {"goals": [(item["goal_id"], "upsert")]})
+        return handler._serialize_goal(item)
+
+    def _select(
+        self, user_id: str, where: str = "", params: tuple = (), fields: tuple[str, ...] | None = None, suffix: str = ""
+    ) -> list[dict]:
+        sql = _select_goals_sql(fields, "g.user_id = ?" + where) + " ORDER BY g.created_at DESC, g.goal_id DESC" + suffix
+        return [handler._serialize_goal(row) for row in self.store.query(sql, (user_id, *params))]
+
+    def get_goal(self, user_id: str, goal_id: str) -> dict | None:
+        goals = self._select(user_id, " AND g.goal_id = ?", (goal_id,))
+        return goals[0] if goals else None
+
+    def list_goals(self, user_id: str, status: str | None = None, fields: tuple[str, ...] | None = None) -> list[dict]:
+        if status:
+            return self._select(user_id, " AND g.status = ?", (status,), fields)
+        return self._select(user_id, fields=fields)
+
+    def list_goals_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: str | None = None,
+        status: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """目標を created_at の降順で 1 ページ分返す"""
+        where, params = "", []
+        if status:
+            where += " AND g.status = ?"
+            params.append(status)
+        cursor_filter = handler._cursor_filter(status)
+        if cursor:
+            after = handler._check_cursor(cursor, user_id, cursor_filter, {"created_at", "goal_id"})
+            where += " AND (g.created_at, g.goal_id) < (?, ?)"
+            params += [after["created_at"], after["goal_id"]]
+
+        # 1 件多く読み、次ページがあるかを判定する
+        goals = self._select(user_id, where, (*params, limit + 1), fields, " LIMIT ?")
+        if len(goals) <= limit:
+            return goals, None
+        last = goals[limit - 1]
+        next_cursor = handler._encode_cursor({
+            "user_id": user_id, "created_at": last["created_at"], "goal_id": last["goal_id"],
+            handler.CURSOR_FILTER_ATTRIBUTE: cursor_filter,
+        })
+        return goals[:limit], next_cursor
+
+    def update_goal(self, user_id: str, goal_id: str, data: dict) -> dict | None:
+        update_fields = {
+            k: str(v) if hasattr(v, "isoformat") else v
+            for k, v in data.items()
+            if v is not None and k in _UPDATABLE_COLUMNS
+        }
+        if not update_fields:
+            return self.get_goal(user_id, goal_id)
+        update_fields["updated_at"] = _now()
+
+        with self.store.transaction() as conn:
+            cursor = conn.execute(
+                f"UPDATE goals SET {', '.join(f'{k} = ?' for k in update_fields)} WHERE user_id = ? AND goal_id = ?",
+                (*update_fields.values(), user_id, goal_id),
+            )
+            if cursor.rowcount == 0:
+                return None
+            self.store.bump_versions(conn, user_id, {"goals": [(goal_id, "upsert")]})
+        return self.get_goal(user_id, goal_id)
+
+    def delete_goal(self, user_id: str, goal_id: str) -> bool:
+        with self.store.transaction() as conn:
+            cursor = conn.execute("DELETE FROM goals WHERE user_id = ? AND goal_id = ?", (user_id, goal_id))
+            if cursor.rowcount == 0:
+                return False
+            self.store.bump_versions(conn, user_id, {"goals": [(goal_id, "delete")]})
+        return True
+
+    def get_goal_progress(self, user_id: str, goal_id: str) -> dict | None:
+        goal = self.get_goal(user_id, goal_id)
+        return handler._goal_progress(goal) if goal else None
+
+    def list_goal_progress(self, user_id: str, status: str | None = None) -> list[dict]:
+        return [{**goal, **handler._progress_fields(goal)} for goal in self.list_goals(user_id, status=status)]
+
+    def get_version(self, user_id: str) -> dict:
+        return self.store.get_versions(user_id, ("goals",))[0]
+
+    def _get_goals_by_ids(self, user_id: str, goal_ids: list[str]) -> list[dict]:
+        if not goal_ids:
+            return []
+        goals = self._select(user_id, f" AND g.goal_id IN ({', '.join('?' * len(goal_ids))})", tuple(goal_ids))
+        return [{**goal, **handler._progress_fields(goal)} for goal in goals]
+
+    def get_changes(self, user_id: str, since: str | None) -> dict:
+        # 版数・変更ログ・現在の目標を同じ時点のデータで読む
+        with self.store.transaction(write=False):
+            return handler._collect_changes(
+                user_id,
+                "goals",
+                since,
+                self.get_version(user_id),
+                lambda after, until: self.store.read_changes(user_id, "goals", after, until),
+                lambda goal_ids: self._get_goals_by_ids(user_id, goal_ids),
+                "goal_id",
+            )
+
+
+# ---------------------------------------------------------------------------
+# Repository
+# ---------------------------------------------------------------------------
+
+
+def _build_repository() -> GoalRepository:
+    s = handler._get_settings()
+    if s.storage_backend == "sqlite":
+        store = SQLiteStore(
+            s.sqlite_path,
+            busy_timeout=s.sqlite_busy_timeout,
+            synchronous=s.sqlite_synchronous,
+            changes_retention_days=s.changes_retention_days,
+        )
+        return SQLiteGoalRepository(store)
+    if s.storage_backend != "dynamodb":
+        raise RuntimeError(f"STORAGE_BACKEND は dynamodb / sqlite のいずれかです: {s.storage_backend}")
+    return DynamoDBGoalRepository()
+
+
+_repository: GoalRepository | None = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> GoalRepository:
+    """プロセス内で共有するリポジトリを返す（初回呼び出し時に設定から生成）"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = _build_repository()
+    return _repository
+
+
+def set_repository(repository: GoalRepository | None) -> None:
+    """共有リポジトリを差し替える（以前のものが接続を持っていれば閉じる）"""
+    global _repository
+    with _repository_lock:
+        previous, _repository = _repository, repository
+    if previous is not None and previous is not repository and hasattr(previous, "close"):
+        previous.close()
+
+
+def reset_repository() -> None:
+    """共有リポジトリを破棄し、次回呼び出し時に設定から再生成させる"""
+    set_repository(None)
@@ -0,0 +1,189 @@
+"""組み込み SQLite の接続とスキーマ
+
+STORAGE_BACKEND=sqlite のときに使う。Records / Goals API は同じファイル (SQLITE_PATH) を開き、
+学習記録・目標・版数を 1 つのデータベースで共有する。どちらのサービスが先に起動してもよいよう、
+スキーマは両方のサービスが同じ内容で作る (既にあれば何もしない)。
+
+WAL モードで開くため、書き込み中も読み取りは待たされない。書き込みは BEGIN IMMEDIATE で始め、
+同時に書き込もうとした側は SQLITE_BUSY_TIMEOUT 秒まで待つ。
+sqlite3 の接続はスレッド間で共有せず、スレッドごとに 1 つ開く。
+
+書き込みは版数を進めるのと同じトランザクションで変更ログ (changes) に変わった ID を書き、差分同期 (/changes) に使う。
+"""
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+
+# DynamoDB の日次集計・目標カウンタに当たるテーブルは持たず、学習記録から集約する。
+# 集約に使う列をインデックスに含め、表を読まずにインデックスだけで集計する。
+# WITHOUT ROWID のため、インデックスは主キー (user_id, record_id) を末尾に含む
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    user_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    study_date TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    memo TEXT NOT NULL DEFAULT '',
+    goal_id TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, record_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_user_date ON records (user_id, study_date, subject, duration_minutes);
+CREATE INDEX IF NOT EXISTS records_user_subject_date ON records (user_id, subject, study_date);
+CREATE INDEX IF NOT EXISTS records_user_goal ON records (user_id, goal_id, duration_minutes);
+
+CREATE TABLE IF NOT EXISTS goals (
+    user_id TEXT NOT NULL,
+    goal_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    target_hours REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    target_date TEXT,
+    subject TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, goal_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS goals_user_status ON goals (user_id, status);
+
+CREATE TABLE IF NOT EXISTS versions (
+    user_id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, scope)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS changes (
+    user_id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    item_id TEXT NOT NULL,
+    op TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, scope, version, item_id)
+) WITHOUT ROWID;
+"""
+
+# 保持期間を過ぎた変更ログは、版数がこの数進むごとにまとめて消す
+CHANGES_PRUNE_INTERVAL = 100
+
+
+class SQLiteStore:
+    """SQLite ファイル 1 つ分の接続 (スレッドごと) とトランザクション"""
+
+    def __init__(
+        self, path: str, busy_timeout: float = 5.0, synchronous: str = "NORMAL", changes_retention_days: float = 7.0
+    ):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.synchronous = synchronous
+        self.changes_retention_days = changes_retention_days
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.connection().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None で自動コミットにし、トランザクションは transaction() で明示的に張る
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """呼び出したスレッドの接続を返す（初回呼び出し時に開く）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def query(self, sql: str, params=()) -> list[dict]:
+        return [dict(row) for row in self.connection().execute(sql, params)]
+
+    @contextmanager
+    def transaction(self, write: bool = True) -> Iterator[sqlite3.Connection]:
+        """トランザクションを張って接続を返す（例外ならロールバック）
+
+        write=False は読み取りのみで、複数のクエリを同じ時点のデータで読むために使う。
+        """
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def bump_versions(self, conn: sqlite3.Connection, user_id: str, changes: dict[str, list[tuple[str, str]]]) -> None:
+        """書き込みと同じトランザクションで、スコープの版数を 1 進め、変更ログ（ID, 操作）を書く
+
+        changes はスコープごとの [(ID, "upsert" / "delete")]。ID を書かない一括の書き込みは [("", "reset")]。
+        """
+        now = datetime.now(UTC)
+        for scope, log in changes.items():
+            (version,) = conn.execute(
+                "INSERT INTO versions (user_id, scope, version, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT (user_id, scope) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at "
+                "RETURNING version",
+                (user_id, scope, now.isoformat()),
+            ).fetchone()
+            conn.executemany(
+                "INSERT OR REPLACE INTO changes (user_id, scope, version, item_id, op, changed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(user_id, scope, version, item_id, op, now.isoformat()) for item_id, op in log],
+            )
+            if version % CHANGES_PRUNE_INTERVAL == 0:
+                cutoff = now - timedelta(days=self.changes_retention_days)
+                conn.execute(
+                    "DELETE FROM changes WHERE user_id = ? AND scope = ? AND changed_at < ?",
+                    (user_id, scope, cutoff.isoformat()),
+                )
+
+    def read_changes(self, user_id: str, scope: str, after: int, until: int) -> list[tuple[str, str]]:
+        """版数が after より後・until 以前の変更ログを、版数の順に (ID, 操作) で返す"""
+        return [
+            (row["item_id"], row["op"])
+            for row in self.connection().execute(
+                "SELECT item_id, op FROM changes WHERE user_id = ? AND scope = ? AND version > ? AND version <= ? "
+                "ORDER BY version",
+                (user_id, scope, after, until),
+            )
+        ]
+
+    def get_versions(self, user_id: str, scopes: tuple[str, ...]) -> list[dict]:
+        """スコープごとの版数と最終更新時刻を、scopes の順に返す（書き込みがなければ 0）"""
+        rows = {
+            row["scope"]: row
+            for row in self.query(
+                f"SELECT scope, version, updated_at FROM versions "
+                f"WHERE user_id = ? AND scope IN ({', '.join('?' * len(scopes))})",
+                (user_id, *scopes),
+            )
+        }
+        return [
+            {"version": rows[scope]["version"], "updated_at": rows[scope]["updated_at"]}
+            if scope in rows else {"version": 0, "updated_at": None}
+            for scope in scopes
+        ]
+
+    def close(self) -> None:
+        """開いたすべての接続を閉じる"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
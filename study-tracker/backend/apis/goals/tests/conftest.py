@@ -13,6 +13,7 @@ def aws_env():
     os.environ["DYNAMODB_ENDPOINT"] = ""
     os.environ["DYNAMODB_REGION"] = "ap-northeast-1"
     os.environ["GOALS_TABLE_NAME"] = "study-tracker-goals"
+    os.environ["VERSIONS_TABLE_NAME"] = "study-tracker-versions"
     os.environ["RECORDS_TABLE_NAME"] = "study-tracker-records"
 
 
@@ -31,6 +32,7 @@ def dynamodb_mock(aws_env):
                 {"AttributeName": "user_id", "AttributeType": "S"},
                 {"AttributeName": "goal_id", "AttributeType": "S"},
                 {"AttributeName": "status", "AttributeType": "S"},
+                {"AttributeName": "created_at", "AttributeType": "S"},
             ],
             GlobalSecondaryIndexes=[
                 {
@@ -40,7 +42,15 @@ def dynamodb_mock(aws_env):
                         {"AttributeName": "status", "KeyType": "RANGE"},
                     ],
                     "Projection": {"ProjectionType": "ALL"},
-                }
+                },
+                {
+                    "IndexName": "created-index",
+                    "KeySchema": [
+                        {"AttributeName": "user_id", "KeyType": "HASH"},
+                        {"AttributeName": "created_at", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
             ],
             BillingMode="PAY_PER_REQUEST",
         )
@@ -55,6 +65,8 @@ def dynamodb_mock(aws_env):
                 {"AttributeName": "user_id", "AttributeType": "S"},
                 {"AttributeName": "record_id", "AttributeType": "S"},
                 {"AttributeName": "study_date", "AttributeType": "S"},
+                {"AttributeName": "user_subject", "AttributeType": "S"},
+                {"AttributeName": "goal_id", "AttributeType": "S"},
             ],
             GlobalSecondaryIndexes=[
                 {
@@ -64,21 +76,95 @@ def dynamodb_mock(aws_env):
                         {"AttributeName": "study_date", "KeyType": "RANGE"},
                     ],
                     "Projection": {"ProjectionType": "ALL"},
-                }
+                },
+                {
+                    "IndexName": "subject-index",
+                    "KeySchema": [
+                        {"AttributeName": "user_subject", "KeyType": "HASH"},
+                        {"AttributeName": "study_date", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                },
+                {
+                    "IndexName": "goal-index",
+                    "KeySchema": [
+                        {"AttributeName": "goal_id", "KeyType": "HASH"},
+                        {"AttributeName": "study_date", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {
+                        "ProjectionType": "INCLUDE",
+                        "NonKeyAttributes": ["duration_minutes"],
+                    },
+                },
             ],
             BillingMode="PAY_PER_REQUEST",
         )
 
+        resource.create_table(
+            TableName="study-tracker-versions",
+            KeySchema=[
+                {"AttributeName": "user_id", "KeyType": "HASH"},
+                {"AttributeName": "scope", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "user_id", "AttributeType": "S"},
+                {"AttributeName": "scope", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+        resource.create_table(
+            TableName="study-tracker-changes",
+            KeySchema=[
+                {"AttributeName": "user_id", "KeyType": "HASH"},
+                {"AttributeName": "change_key", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "user_id", "AttributeType": "S"},
+                {"AttributeName": "change_key", "AttributeType": "S"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+        import cache
         import handler
-        original_resource = handler._get_dynamodb_resource
-        handler._get_dynamodb_resource = lambda: resource
+        import repository
+        repository.reset_repository()
+        handler.set_dynamodb_resource(resource)
 
         yield resource
 
-        handler._get_dynamodb_resource = original_resource
+        handler.reset_dynamodb_resource()
+        cache.reset_cache()
 
 
 @pytest.fixture
-def client(dynamodb_mock):
+def sqlite_store(aws_env, tmp_path, monkeypatch):
+    import cache
+    import repository
+    from main import settings
+
+    monkeypatch.setattr(settings, "storage_backend", "sqlite")
+    monkeypatch.setattr(settings, "sqlite_path", str(tmp_path / "study-tracker.db"))
+    repository.reset_repository()
+
+    yield repository.get_repository().store
+
+    repository.reset_repository()
+    cache.reset_cache()
+
+
+@pytest.fixture(params=["dynamodb", "sqlite"])
+def client(request):
+    """API のテストは両方の保存先で実行する（dynamodb_mock / sqlite_store を直接使うテストはその保存先のみ）"""
+    if request.param == "dynamodb":
+        if "sqlite_store" in request.fixturenames:
+            pytest.skip("SQLite 固有のテスト")
+        request.getfixturevalue("dynamodb_mock")
+    elif "dynamodb_mock" in request.fixturenames:
+        pytest.skip("DynamoDB 固有のテスト")
+    else:
+        request.getfixturevalue("sqlite_store")
+
     from main import app
     return TestClient(app)
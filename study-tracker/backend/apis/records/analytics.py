@@ -0,0 +1,256 @@
+"""学習記録の列指向スナップショットと集計
+
+長い期間の統計 (サマリー・日別・科目別・目標別) を、ユーザーの学習記録を列にまとめたスナップショットから計算する。
+列は numpy の配列で持ち、集計は bincount のベクトル演算で行う。numpy を取り込めない環境では
+同じ結果を Python のループで計算する (起動時に警告を出す)。
+
+スナップショットはユーザーの records 版数と組にしてプロセス内に保持し (ANALYTICS_MAX_SNAPSHOTS ユーザーまで)、
+版数が進んだら (書き込みがあったら) 次の読み取りで作り直す。作り直しは学習記録を全件読むため、
+書き込みの直後の 1 回は遅くなる。
+"""
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy がない環境
+    # numpy は依存関係に含めている。入っていない環境でも動くようにループの集計に戻すが、
+    # 長い期間の統計が遅くなるので気付けるようにログに残す
+    np = None
+    logger.warning("numpy is not available; analytics falls back to the pure Python engine")
+
+# スナップショットに読む属性
+COLUMNS = ("study_date", "subject", "duration_minutes", "goal_id")
+
+
+def _get_settings():
+    from main import settings
+    return settings
+
+
+def _ranked(totals: dict[str, list[int]], key: str) -> list[dict]:
+    """{名前: [分, 件数]} を学習時間の多い順の一覧にする"""
+    return [
+        {key: name, "total_minutes": minutes, "record_count": count}
+        for name, (minutes, count) in sorted(totals.items(), key=lambda kv: (-kv[1][0], kv[0]))
+    ]
+
+
+def _summary(total_minutes: int, total_records: int, subjects: dict, study_days: int, date_from: date, date_to: date):
+    # handler._aggregate_rollups と同じ形・同じ丸め
+    days_in_range = (date_to - date_from).days + 1
+    daily_average = total_minutes / days_in_range if days_in_range > 0 else 0.0
+    return {
+        "total_minutes": total_minutes,
+        "total_records": total_records,
+        "subjects": subjects,
+        "daily_average_minutes": round(daily_average, 1),
+        "study_days": study_days,
+    }
+
+
+def _encode(values: list) -> tuple[list[str], "np.ndarray"]:
+    """値を整数のコードに置き換える (コードは値の昇順に振り、None は -1)
+
+    np.unique は文字列の配列を並べ替えるため遅い。出現順に辞書でコードを振ってから、種類の数だけの表で振り直す。
+    """
+    codes: dict = {}
+    raw = np.fromiter((codes.setdefault(v, len(codes)) for v in values), dtype=np.int32, count=len(values))
+    names = sorted(v for v in codes if v is not None)
+    rank = {name: i for i, name in enumerate(names)}
+    remap = np.array([rank.get(v, -1) for v in codes], dtype=np.int32)
+    return names, remap[raw]
+
+
+# ---------------------------------------------------------------------------
+# Engines
+# ---------------------------------------------------------------------------
+
+
+class RecordRows:
+    """numpy がない場合のスナップショット (学習記録を行のまま持ち、ループで集計する)"""
+
+    engine = "python"
+
+    def __init__(self, records: Iterable[dict], version=None):
+        self.version = version
+        self.rows = sorted(
+            ((r["study_date"], r["subject"], int(r["duration_minutes"]), r.get("goal_id")) for r in records),
+            key=lambda row: row[0],
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def analytics(self, date_from: date, date_to: date) -> dict:
+        start, end = str(date_from), str(date_to)
+        total_minutes = 0
+        subjects: dict[str, list[int]] = {}
+        goals: dict[str, list[int]] = {}
+        days: dict[str, dict] = {}
+        total_records = 0
+
+        for study_date, subject, minutes, goal_id in self.rows:
+            if not start <= study_date <= end:
+                continue
+            total_records += 1
+            total_minutes += minutes
+            subject_total = subjects.setdefault(subject, [0, 0])
+            subject_total[0] += minutes
+            subject_total[1] += 1
+            if goal_id:
+                goal_total = goals.setdefault(goal_id, [0, 0])
+                goal_total[0] += minutes
+                goal_total[1] += 1
+            day = days.setdefault(study_date, {"date": study_date, "total_minutes": 0, "record_count": 0, "subjects": []})
+            day["total_minutes"] += minutes
+            day["record_count"] += 1
+            if subject not in day["subjects"]:
+                day["subjects"].append(subject)
+
+        for day in days.values():
+            day["subjects"].sort()
+        return {
+            "summary": _summary(
+                total_minutes, total_records, {k: v[0] for k, v in subjects.items()}, len(days), date_from, date_to
+            ),
+            "daily": list(days.values()),
+            "subjects": _ranked(subjects, "subject"),
+            "goals": _ranked(goals, "goal_id"),
+        }
+
+
+class RecordColumns:
+    """学習記録を列 (numpy 配列) で持つスナップショット
+
+    day (1970-01-01 からの日数)・subject (科目コード)・minutes・goal (目標コード、なしは -1) を
+    day の昇順に並べて持つ。期間は二分探索で切り出し、その範囲だけを bincount で集計する。
+    """
+
+    engine = "numpy"
+
+    def __init__(self, records: Iterable[dict], version=None):
+        self.version = version
+        dates, subjects, minutes, goals = [], [], [], []
+        for r in records:
+            dates.append(r["study_date"])
+            subjects.append(r["subject"])
+            minutes.append(r["duration_minutes"])
+            goals.append(r.get("goal_id") or None)
+
+        days = np.array(dates, dtype="datetime64[D]").astype(np.int64)
+        order = np.argsort(days, kind="stable")
+        self.day = days[order]
+        self.minutes = np.array(minutes, dtype=np.int64)[order]
+        self.subject_names, subject_codes = _encode(subjects)
+        self.subject = subject_codes[order]
+        self.goal_ids, goal_codes = _encode(goals)
+        self.goal = goal_codes[order]
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def analytics(self, date_from: date, date_to: date) -> dict:
+        lo = int(np.datetime64(date_from, "D").astype(np.int64))
+        hi = int(np.datetime64(date_to, "D").astype(np.int64))
+        start = np.searchsorted(self.day, lo, side="left")
+        end = np.searchsorted(self.day, hi, side="right")
+        # 日×科目の表は、期間のうち記録のある最初の日から最後の日までの分だけ作る
+        first = int(self.day[start]) if start < end else lo
+        n_days = int(self.day[end - 1]) - first + 1 if start < end else 0
+        offset = self.day[start:end] - first
+        subject = self.subject[start:end]
+        minutes = self.minutes[start:end]
+        goal = self.goal[start:end]
+        n_subjects = len(self.subject_names)
+        first_date = date_from + timedelta(days=first - lo)
+
+        # 日×科目の表を 1 回の bincount で作り、日別・科目別はその合計から求める
+        cells = offset * n_subjects + subject
+        cell_minutes = np.bincount(cells, weights=minutes, minlength=n_days * n_subjects).reshape(n_days, n_subjects)
+        cell_counts = np.bincount(cells, minlength=n_days * n_subjects).reshape(n_days, n_subjects)
+        day_minutes = cell_minutes.sum(axis=1).astype(np.int64)
+        day_counts = cell_counts.sum(axis=1)
+        subject_minutes = cell_minutes.sum(axis=0).astype(np.int64)
+        subject_counts = cell_counts.sum(axis=0)
+
+        # 科目コードは名前の昇順のため、日ごとの科目も名前順に並ぶ
+        subjects_by_day: dict[int, list[str]] = {}
+        for day, code in zip(*(a.tolist() for a in np.nonzero(cell_counts))):
+            subjects_by_day.setdefault(day, []).append(self.subject_names[code])
+        daily = [
+            {
+                "date": str(first_date + timedelta(days=day)),
+                "total_minutes": int(day_minutes[day]),
+                "record_count": int(day_counts[day]),
+                "subjects": subjects_by_day[day],
+            }
+            for day in np.flatnonzero(day_counts).tolist()
+        ]
+
+        has_goal = goal >= 0
+        goal_minutes = np.bincount(goal[has_goal], weights=minutes[has_goal], minlength=len(self.goal_ids))
+        goal_counts = np.bincount(goal[has_goal], minlength=len(self.goal_ids))
+        subjects = {
+            name: [int(subject_minutes[i]), int(subject_counts[i])]
+            for i, name in enumerate(self.subject_names) if subject_counts[i]
+        }
+        goals = {
+            goal_id: [int(goal_minutes[i]), int(goal_counts[i])]
+            for i, goal_id in enumerate(self.goal_ids) if goal_counts[i]
+        }
+        return {
+            "summary": _summary(
+                int(minutes.sum()), int(len(minutes)), {k: v[0] for k, v in subjects.items()},
+                len(daily), date_from, date_to,
+            ),
+            "daily": daily,
+            "subjects": _ranked(subjects, "subject"),
+            "goals": _ranked(goals, "goal_id"),
+        }
+
+
+def build_snapshot(records: Iterable[dict], version=None) -> RecordColumns | RecordRows:
+    """使えるエンジンでスナップショットを作る (numpy があれば RecordColumns)"""
+    return RecordColumns(records, version) if np is not None else RecordRows(records, version)
+
+
+# ---------------------------------------------------------------------------
+# Snapshots
+# ---------------------------------------------------------------------------
+
+
+_snapshots: OrderedDict[str, RecordColumns | RecordRows] = OrderedDict()
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(user_id: str, repository):
+    """ユーザーの最新のスナップショットを返す (版数が変わっていなければ保持しているものを使う)
+
+    版数 (version と updated_at の組) はデータより先に読むため、作成中に書き込みがあっても、
+    次の読み取りで作り直されるだけで済む。
+    """
+    version = repository.get_combined_version(user_id, ("records",))
+    with _snapshots_lock:
+        snapshot = _snapshots.get(user_id)
+        if snapshot is not None and snapshot.version == version:
+            _snapshots.move_to_end(user_id)
+            return snapshot
+
+    snapshot = build_snapshot(repository.iter_records(user_id, fields=COLUMNS), version)
+    with _snapshots_lock:
+        _snapshots[user_id] = snapshot
+        _snapshots.move_to_end(user_id)
+        while len(_snapshots) > _get_settings().analytics_max_snapshots:
+            _snapshots.popitem(last=False)
+    return snapshot
+
+
+def reset_snapshots() -> None:
+    with _snapshots_lock:
+        _snapshots.clear()
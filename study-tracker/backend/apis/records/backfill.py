@@ -0,0 +1,25 @@
+"""既存データに対して派生属性を再構築する
+
+    python backfill.py                  # すべて実行
+    python backfill.py subject-index    # 指定した処理のみ実行
+"""
+import argparse
+
+import handler
+
+TASKS = {
+    "subject-index": ("user_subject 属性の付与", handler.backfill_user_subject),
+    "rollups": ("日次・科目別集計の再構築", handler.rebuild_rollups),
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tasks", nargs="*", metavar="task", help=f"{' / '.join(TASKS)}（省略時はすべて）")
+    args = parser.parse_args()
+    unknown = [name for name in args.tasks if name not in TASKS]
+    if unknown:
+        parser.error(f"不明な処理: {', '.join(unknown)}")
+
+    for name in args.tasks or TASKS:
+        label, task = TASKS[name]
+        print(f"{label}: {task()} 件")
@@ -0,0 +1,78 @@
+"""長期間の統計 (analytics.py) を、Python のループと numpy の列集計で比べる
+
+件数ごとに同じ学習記録 (乱数の種を固定) からスナップショットを作り、1 年分・全期間の集計の中央値を出す。
+build はスナップショットの作成 (書き込み後の最初の 1 回に掛かる分) で、学習記録の読み取りは含まない。
+
+    python -m benchmarks.analytics --records 10000 100000 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+import analytics
+from benchmarks.seed import DEFAULT_END, SUBJECTS
+
+GOAL_IDS = [f"bench-goal-{i}" for i in range(5)]
+
+
+def _records(count: int, days: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "study_date": str(DEFAULT_END - timedelta(days=rng.randrange(days))),
+            "subject": rng.choice(SUBJECTS),
+            "duration_minutes": rng.randint(10, 180),
+            "goal_id": rng.choice(GOAL_IDS) if rng.random() < 0.3 else None,
+        }
+        for _ in range(count)
+    ]
+
+
+def _measure(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(count: int, days: int, repeat: int) -> dict:
+    """1 つの件数について、(エンジン, 操作) ごとの中央値 [ms] を返す"""
+    records = _records(count, days)
+    year_ago = DEFAULT_END - timedelta(days=364)
+    all_days = DEFAULT_END - timedelta(days=days - 1)
+    results = {}
+    for engine in (analytics.RecordRows, analytics.RecordColumns):
+        snapshot = engine(records)
+        results[engine.engine] = {
+            "build": _measure(lambda: engine(records), max(repeat // 5, 1)),
+            "analytics(365d)": _measure(lambda: snapshot.analytics(year_ago, DEFAULT_END), repeat),
+            f"analytics({days}d)": _measure(lambda: snapshot.analytics(all_days, DEFAULT_END), repeat),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--days", type=int, default=365 * 3)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if analytics.np is None:
+        raise SystemExit("numpy がインストールされていません: pip install numpy")
+
+    print(f"days={args.days} repeat={args.repeat}  median [ms]")
+    print(f"{'records':>10}  {'operation':<20}{'python':>12}{'numpy':>12}{'speedup':>10}")
+    for count in args.records:
+        results = run(count, args.days, args.repeat)
+        for name, python_ms in results["python"].items():
+            numpy_ms = results["numpy"][name]
+            print(f"{count:>10}  {name:<20}{python_ms:>12.2f}{numpy_ms:>12.2f}{python_ms / numpy_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""一覧応答の大きさごとに、符号化ごとの転送量と圧縮にかかる CPU 時間を計測する
+
+学習記録一覧と同じ形の JSON を件数ごとに作り、この環境で使える符号化 (gzip / br / zstd) と
+圧縮レベルごとに 1 応答あたりの圧縮後バイト数と圧縮時間を出す。
+
+    python -m benchmarks.compression --records 10 100 1000 10000
+"""
+import argparse
+import json
+import time
+import uuid
+
+from compress import DEFAULT_LEVELS, available_encoders
+
+
+def _body(count: int) -> bytes:
+    records = [
+        {
+            "record_id": str(uuid.uuid4()),
+            "user_id": "bench-user",
+            "study_date": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "subject": f"科目{i % 8}",
+            "duration_minutes": i % 180 + 1,
+            "start_time": "09:00:00",
+            "end_time": None,
+            "memo": "章末問題を解いた" if i % 3 else "",
+            "goal_id": None,
+            "created_at": "2025-01-01T00:00:00+00:00",
+            "updated_at": "2025-01-01T00:00:00+00:00",
+        }
+        for i in range(count)
+    ]
+    return json.dumps(records, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _measure(factory, level: int, body: bytes, repeat: int) -> tuple[int, float]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoder = factory(level)
+        data = encoder.compress(body) + encoder.finish()
+        best = min(best, time.perf_counter() - started)
+        size = len(data)
+    return size, best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--levels", type=int, nargs="+", default=None, help="省略時は各符号化の既定レベル")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    encoders = available_encoders()
+    print(f"encodings={','.join(encoders)} repeat={args.repeat}")
+    print(f"{'records':>8}{'encoding':>10}{'level':>7}{'bytes':>12}{'ratio':>8}{'ms':>9}")
+    for count in args.records:
+        body = _body(count)
+        print(f"{count:>8}{'identity':>10}{'':>7}{len(body):>12}{1.0:>8.2f}{0.0:>9.2f}")
+        for name, factory in encoders.items():
+            for level in args.levels or [DEFAULT_LEVELS[name]]:
+                size, ms = _measure(factory, level, body, args.repeat)
+                print(f"{count:>8}{name:>10}{level:>7}{size:>12}{size / len(body):>8.2f}{ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+# moto のテーブルと共有リソースの差し替えは機能テストと同じ fixture を使う
+from tests.conftest import aws_env, dynamodb_mock  # noqa: F401
@@ -0,0 +1,50 @@
+"""起動済みの API サーバーに HTTP でリクエストを送り、スループットを計測する
+
+サーバーの起動方法 (SERVER_MODE / SERVER_RUNNER / SERVER_WORKERS) ごとの比較に使う。
+クライアントも同じマシンで動くため、CPU 数が少ない環境では値が低めに出る。
+
+    SERVER_MODE=prod SERVER_PORT=8001 python serve.py &
+    python -m benchmarks.http_throughput --url http://127.0.0.1:8001/health --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def _measure(url: str, requests: int, clients: int) -> tuple[float, float]:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    latencies: list[float] = []
+    async with httpx.AsyncClient(limits=limits) as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                resp = await client.get(url)
+                resp.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return requests / elapsed, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000/health")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=50, help="同時に送るリクエスト数 (keep-alive 接続数)")
+    args = parser.parse_args()
+
+    rps, p99 = asyncio.run(_measure(args.url, args.requests, args.clients))
+    print(f"url={args.url} requests={args.requests} clients={args.clients}")
+    print(f"{rps:8.1f} req/s  p99 {p99:6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""同時実行数の上限ごとに Records API のスループットを計測する
+
+DynamoDB への送信を before-send フックで差し替え、一定の往復遅延 (既定 20ms)
+の後に空の応答を返す。DynamoDB 側の処理時間を除き、API サーバーが遅延を
+どれだけ重ねられるかだけを測る。上限 40 は Starlette の既定スレッドプールと
+同じで、同期ルートだった頃の上限に相当する。
+
+    python -m benchmarks.load_concurrency --concurrency 40 100 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import httpx  # noqa: E402
+from botocore.awsrequest import AWSResponse  # noqa: E402
+
+EMPTY_QUERY_BODY = b'{"Items": [], "Count": 0, "ScannedCount": 0}'
+
+
+class _RawBody:
+    def __init__(self, body: bytes):
+        self._body = body
+
+    def stream(self, **kwargs):
+        yield self._body
+
+
+def _fake_send(latency: float):
+    def send(request, **kwargs):
+        time.sleep(latency)
+        return AWSResponse(request.url, 200, {}, _RawBody(EMPTY_QUERY_BODY))
+
+    return send
+
+
+async def _measure(app, requests: int, clients: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                resp = await client.get("/api/v1/records/?subject=Python")
+                resp.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[40, 100, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=200, help="同時に送るリクエスト数")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    import handler
+    from main import app, settings
+
+    client = handler._get_dynamodb_resource().meta.client
+    client.meta.events.register("before-send.dynamodb", _fake_send(args.latency_ms / 1000))
+
+    print(f"requests={args.requests} clients={args.clients} latency={args.latency_ms}ms")
+    for concurrency in args.concurrency:
+        settings.dynamodb_max_concurrency = concurrency
+        handler._executors.clear()
+        rps = asyncio.run(_measure(app, args.requests, args.clients))
+        print(f"DYNAMODB_MAX_CONCURRENCY={concurrency:>4}: {rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Records / Goals API の負荷シナリオ (locust)
+
+画面の操作に近い割合で、一覧 (ページング)・ダッシュボード・統計・カレンダー・目標の進捗を読み、
+ときどき学習記録を書き込む。データは benchmarks.seed で投入したもの (DEFAULT_END までの期間) を前提にする。
+終了時にエンドポイントごとの RPS と p50 / p95 / p99 を出す。
+
+    RECORDS_API_URL=http://localhost:8001 GOALS_API_URL=http://localhost:8002 \\
+        locust -f benchmarks/locustfile.py --headless -u 50 -r 10 -t 1m
+"""
+import os
+import random
+from datetime import date, timedelta
+
+from locust import HttpUser, between, events, task
+
+END = date.fromisoformat(os.environ.get("BENCH_END", "2025-12-31"))
+RECORDS_API_URL = os.environ.get("RECORDS_API_URL", "http://localhost:8001")
+GOALS_API_URL = os.environ.get("GOALS_API_URL", "http://localhost:8002")
+
+
+def _random_month() -> tuple[int, int]:
+    day = END - timedelta(days=random.randrange(365))
+    return day.year, day.month
+
+
+class RecordsUser(HttpUser):
+    host = RECORDS_API_URL
+    wait_time = between(0.5, 2)
+
+    @task(5)
+    def dashboard(self):
+        date_from = END - timedelta(days=6)
+        self.client.get(
+            f"/api/v1/records/dashboard?date_from={date_from}&date_to={END}", name="/records/dashboard"
+        )
+
+    @task(4)
+    def list_page(self):
+        resp = self.client.get("/api/v1/records/?limit=100", name="/records/?limit")
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor:
+            self.client.get(f"/api/v1/records/?limit=100&cursor={cursor}", name="/records/?limit&cursor")
+
+    @task(3)
+    def calendar(self):
+        year, month = _random_month()
+        self.client.get(f"/api/v1/records/stats/calendar?year={year}&month={month}", name="/records/stats/calendar")
+
+    @task(2)
+    def stats_year(self):
+        date_from = END - timedelta(days=364)
+        self.client.get(
+            f"/api/v1/records/stats/summary?date_from={date_from}&date_to={END}", name="/records/stats/summary"
+        )
+
+    @task(1)
+    def create_record(self):
+        self.client.post("/api/v1/records/", name="/records/ [POST]", json={
+            "study_date": str(END),
+            "subject": random.choice(["Python", "英語", "数学"]),
+            "duration_minutes": random.randint(10, 120),
+        })
+
+
+class GoalsUser(HttpUser):
+    host = GOALS_API_URL
+    wait_time = between(1, 3)
+
+    @task(3)
+    def progress(self):
+        self.client.get("/api/v1/goals/progress?status=active", name="/goals/progress")
+
+    @task(1)
+    def list_goals(self):
+        self.client.get("/api/v1/goals/", name="/goals/")
+
+
+@events.quitting.add_listener
+def _print_percentiles(environment, **kwargs):
+    stats = environment.stats
+    print(f"{'name':<32}{'requests':>10}{'failures':>10}{'rps':>9}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for entry in [*sorted(stats.entries.values(), key=lambda e: e.name), stats.total]:
+        print(
+            f"{entry.name:<32}{entry.num_requests:>10}{entry.num_failures:>10}{entry.total_rps:>9.1f}"
+            f"{entry.get_response_time_percentile(0.5):>8.0f}"
+            f"{entry.get_response_time_percentile(0.95):>8.0f}"
+            f"{entry.get_response_time_percentile(0.99):>8.0f}"
+        )
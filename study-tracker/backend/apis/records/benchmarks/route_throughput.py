@@ -0,0 +1,154 @@
+"""実際のルートのスループットを、DynamoDB の往復遅延を足した moto で計測する
+
+moto の DynamoDB に 1 回の呼び出しごとに一定の遅延 (既定 20ms) を足し、同時に
+--clients 本のリクエストを送り続けて req/s を測る。--app-dir に別の作業ツリーの
+records ディレクトリを渡すと、同じ計測を変更前のコードで行える。
+
+    python -m benchmarks.route_throughput
+    git worktree add /tmp/before <commit>
+    python -m benchmarks.route_throughput --app-dir /tmp/before/study-tracker/backend/apis/records
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-1")
+
+import boto3  # noqa: E402
+import httpx  # noqa: E402
+from moto import mock_aws  # noqa: E402
+
+USER_ID = "default-user"
+GOAL_ID = "bench-goal"
+
+# (テーブル名, ハッシュキー, レンジキー, [(索引名, ハッシュキー, レンジキー)])
+TABLES = [
+    ("study-tracker-records", "user_id", "record_id", [
+        ("date-index", "user_id", "study_date"),
+        ("subject-index", "user_subject", "study_date"),
+        ("goal-index", "goal_id", "study_date"),
+    ]),
+    ("study-tracker-goals", "user_id", "goal_id", [
+        ("status-index", "user_id", "status"),
+        ("created-index", "user_id", "created_at"),
+    ]),
+    ("study-tracker-rollups", "user_id", "rollup_key", []),
+    ("study-tracker-versions", "user_id", "scope", []),
+    ("study-tracker-changes", "user_id", "change_key", []),
+]
+
+
+def _create_tables(resource) -> None:
+    for name, hash_key, range_key, indexes in TABLES:
+        attributes = {hash_key, range_key} | {a for _, h, r in indexes for a in (h, r)}
+        definition = {
+            "TableName": name,
+            "KeySchema": [
+                {"AttributeName": hash_key, "KeyType": "HASH"},
+                {"AttributeName": range_key, "KeyType": "RANGE"},
+            ],
+            "AttributeDefinitions": [{"AttributeName": a, "AttributeType": "S"} for a in sorted(attributes)],
+            "BillingMode": "PAY_PER_REQUEST",
+        }
+        if indexes:
+            definition["GlobalSecondaryIndexes"] = [
+                {
+                    "IndexName": index_name,
+                    "KeySchema": [
+                        {"AttributeName": h, "KeyType": "HASH"},
+                        {"AttributeName": r, "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+                for index_name, h, r in indexes
+            ]
+        resource.create_table(**definition)
+
+
+def _add_latency(client, latency: float) -> dict:
+    """呼び出しごとに latency 秒待たせ、同時に実行中だった呼び出しの最大数を数える"""
+    state = {"in_flight": 0, "max_in_flight": 0}
+    lock = threading.Lock()
+
+    def before(**kwargs):
+        with lock:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        time.sleep(latency)
+
+    def after(**kwargs):
+        with lock:
+            state["in_flight"] -= 1
+
+    client.meta.events.register("before-call.dynamodb", before)
+    client.meta.events.register("after-call.dynamodb", after)
+    return state
+
+
+async def _measure(app, method: str, url: str, body: dict | None, requests: int, clients: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                resp = await client.request(method, url, json=body)
+                resp.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", type=Path, default=Path(__file__).resolve().parent.parent)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--clients", type=int, default=200, help="同時に送るリクエスト数")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--records", type=int, default=100, help="事前に作る学習記録の件数")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(args.app_dir.resolve()))
+    os.chdir(args.app_dir)
+
+    with mock_aws():
+        import handler
+        from main import app
+
+        resource = boto3.resource("dynamodb")
+        _create_tables(resource)
+        handler.set_dynamodb_resource(resource)
+        resource.Table("study-tracker-goals").put_item(Item={
+            "user_id": USER_ID, "goal_id": GOAL_ID, "title": "計測", "target_hours": 100,
+            "status": "active", "current_minutes": 0, "records_count": 0,
+            "created_at": "2025-01-01T00:00:00+00:00", "updated_at": "2025-01-01T00:00:00+00:00",
+        })
+        record = {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 30, "goal_id": GOAL_ID}
+        asyncio.run(_measure(app, "POST", "/api/v1/records/", record, args.records, 20))
+
+        # 初期化 (テーブル作成・データ投入) の後から遅延を足す
+        client = handler._get_dynamodb_resource().meta.client
+        state = _add_latency(client, args.latency_ms / 1000)
+
+        # 書き込みで件数が変わらないよう、読み取りを先に測る
+        routes = [
+            ("GET", "/api/v1/records/?subject=Python", None),
+            ("GET", "/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31", None),
+            ("POST", "/api/v1/records/", record),
+        ]
+        print(f"app={args.app_dir} requests={args.requests} clients={args.clients} latency={args.latency_ms}ms")
+        for method, url, body in routes:
+            state["max_in_flight"] = 0
+            rps = asyncio.run(_measure(app, method, url, body, args.requests, args.clients))
+            print(f"{method:<4} {url:<72} {rps:8.1f} req/s  (DynamoDB 同時実行 最大 {state['max_in_flight']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""計測用のデータを DynamoDB Local / moto server に投入する
+
+1 ユーザー分の学習記録を指定件数 (1k / 100k / 1M など) 作り、日次集計と目標のカウンタも
+記録と矛盾しない値で書き込む。乱数の種を固定しているため、同じ引数なら同じデータになる。
+
+    docker compose up -d dynamodb-local dynamodb-init
+    DYNAMODB_ENDPOINT=http://localhost:8000 python -m benchmarks.seed --records 100000
+
+moto server (`moto_server -p 5000`) に入れる場合は --create-tables でテーブルも作る。
+STORAGE_BACKEND=sqlite なら SQLITE_PATH のファイルに入れる (日次集計・目標カウンタは不要)。
+"""
+import argparse
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import UTC, date, datetime, timedelta
+from itertools import islice
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "dummy")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "dummy")
+
+import handler  # noqa: E402
+import repository  # noqa: E402
+
+SUBJECTS = ["Python", "TypeScript", "英語", "数学", "アルゴリズム", "AWS", "統計", "設計"]
+MEMOS = ["", "", "復習", "章末問題を解いた", "写経", "ドキュメントを読んだ"]
+DEFAULT_END = date(2025, 12, 31)
+WRITE_CHUNK_SIZE = 1000
+
+
+def _table_definition(name: str, hash_key: str, range_key: str, indexes: list[tuple] = ()) -> dict:
+    """create_table の引数を組み立てる (indexes は (名前, ハッシュキー, レンジキー, 射影))"""
+    attributes = {hash_key, range_key} | {a for _, h, r, _ in indexes for a in (h, r)}
+    definition = {
+        "TableName": name,
+        "KeySchema": [
+            {"AttributeName": hash_key, "KeyType": "HASH"},
+            {"AttributeName": range_key, "KeyType": "RANGE"},
+        ],
+        "AttributeDefinitions": [
+            {"AttributeName": a, "AttributeType": "S"} for a in sorted(attributes)
+        ],
+        "BillingMode": "PAY_PER_REQUEST",
+    }
+    if indexes:
+        definition["GlobalSecondaryIndexes"] = [
+            {
+                "IndexName": index_name,
+                "KeySchema": [
+                    {"AttributeName": h, "KeyType": "HASH"},
+                    {"AttributeName": r, "KeyType": "RANGE"},
+                ],
+                "Projection": projection,
+            }
+            for index_name, h, r, projection in indexes
+        ]
+    return definition
+
+
+def create_tables() -> None:
+    """docker-compose の dynamodb-init と同じテーブルを作る (既にあるものは飛ばす)"""
+    s = handler._get_settings()
+    resource = handler._get_dynamodb_resource()
+    existing = {t.name for t in resource.tables.all()}
+    definitions = [
+        _table_definition(s.records_table_name, "user_id", "record_id", [
+            ("date-index", "user_id", "study_date", {"ProjectionType": "ALL"}),
+            ("subject-index", "user_subject", "study_date", {"ProjectionType": "ALL"}),
+            ("goal-index", "goal_id", "study_date",
+             {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["duration_minutes"]}),
+        ]),
+        _table_definition(s.goals_table_name, "user_id", "goal_id", [
+            ("status-index", "user_id", "status", {"ProjectionType": "ALL"}),
+            ("created-index", "user_id", "created_at", {"ProjectionType": "ALL"}),
+        ]),
+        _table_definition(s.rollups_table_name, "user_id", "rollup_key"),
+        _table_definition(s.versions_table_name, "user_id", "scope"),
+        _table_definition(s.changes_table_name, "user_id", "change_key"),
+    ]
+    for definition in definitions:
+        if definition["TableName"] not in existing:
+            resource.create_table(**definition).wait_until_exists()
+
+
+def generate_records(user_id: str, count: int, goal_ids: list[str], end: date, days: int, seed: int = 0):
+    """学習記録のアイテムを count 件返す (end から days 日前までに散らばる)"""
+    rng = random.Random(seed)
+    now = datetime.now(UTC).isoformat()
+    start = end - timedelta(days=days - 1)
+    for _ in range(count):
+        data = {
+            "study_date": start + timedelta(days=rng.randrange(days)),
+            "subject": rng.choice(SUBJECTS),
+            "duration_minutes": rng.randint(10, 180),
+            "memo": rng.choice(MEMOS),
+            "goal_id": rng.choice(goal_ids) if goal_ids and rng.random() < 0.3 else None,
+        }
+        yield handler._build_record_item(user_id, data, now)
+
+
+def _put_all(table, items) -> None:
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+
+def seed_user(
+    user_id: str,
+    count: int,
+    *,
+    goals: int = 3,
+    end: date = DEFAULT_END,
+    days: int = 365 * 3,
+    seed: int = 0,
+    threads: int = 8,
+) -> dict:
+    """1 ユーザー分の学習記録・日次集計・目標を書き込み、件数を返す"""
+    now = datetime.now(UTC).isoformat()
+    goal_items = {
+        f"bench-goal-{i}": {
+            "user_id": user_id,
+            "goal_id": f"bench-goal-{i}",
+            "title": f"計測用の目標 {i}",
+            "description": "",
+            "target_hours": 100 * (i + 1),
+            "current_minutes": 0,
+            "records_count": 0,
+            "status": "active",
+            "subject": "",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(goals)
+    }
+    rollups: dict[tuple[str, str], list[int]] = {}
+
+    def tally(items):
+        for item in items:
+            total = rollups.setdefault((item["study_date"], item["subject"]), [0, 0])
+            total[0] += item["duration_minutes"]
+            total[1] += 1
+            if "goal_id" in item:
+                goal = goal_items[item["goal_id"]]
+                goal["current_minutes"] += item["duration_minutes"]
+                goal["records_count"] += 1
+            yield item
+
+    records = tally(generate_records(user_id, count, list(goal_items), end, days, seed))
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        # 1M 件でもメモリに載せきらないよう、書き込み待ちのチャンクはスレッド数の 2 倍までにする
+        pending: deque[Future] = deque()
+        while chunk := list(islice(records, WRITE_CHUNK_SIZE)):
+            pending.append(pool.submit(_put_all, handler._get_records_table(), chunk))
+            if len(pending) >= threads * 2:
+                pending.popleft().result()
+        for future in pending:
+            future.result()
+
+    _put_all(handler._get_rollups_table(), (
+        {
+            "user_id": user_id,
+            "rollup_key": handler._rollup_key(study_date, subject),
+            "study_date": study_date,
+            "subject": subject,
+            "total_minutes": minutes,
+            "record_count": record_count,
+        }
+        for (study_date, subject), (minutes, record_count) in rollups.items()
+    ))
+    _put_all(handler._get_goals_table(), goal_items.values())
+    # 書き込んだ ID は変更ログに書かず、それより前の同期トークンを reset にする
+    handler._mark_changed(user_id, {"records": [("", "reset")], "goals": [("", "reset")]})
+    return {"records": count, "rollups": len(rollups), "goals": len(goal_items)}
+
+
+def seed_sqlite_user(
+    user_id: str,
+    count: int,
+    *,
+    goals: int = 3,
+    end: date = DEFAULT_END,
+    days: int = 365 * 3,
+    seed: int = 0,
+) -> dict:
+    """1 ユーザー分の学習記録と目標を SQLite に書き込み、件数を返す"""
+    repo = repository.get_repository()
+    now = datetime.now(UTC).isoformat()
+    goal_ids = [f"bench-goal-{i}" for i in range(goals)]
+    with repo.store.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO goals (user_id, goal_id, title, target_hours, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(user_id, goal_id, f"計測用の目標 {i}", 100 * (i + 1), now, now) for i, goal_id in enumerate(goal_ids)],
+        )
+    records = generate_records(user_id, count, goal_ids, end, days, seed)
+    while chunk := list(islice(records, WRITE_CHUNK_SIZE * 10)):
+        with repo.store.transaction() as conn:
+            repo._insert(conn, chunk)
+    with repo.store.transaction() as conn:
+        repo.store.bump_versions(conn, user_id, {"records": [("", "reset")], "goals": [("", "reset")]})
+    return {"records": count, "goals": len(goal_ids)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", default=handler._get_settings().default_user_id)
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--goals", type=int, default=3)
+    parser.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END, help="最後の学習日")
+    parser.add_argument("--days", type=int, default=365 * 3, help="記録を散らばらせる日数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--create-tables", action="store_true")
+    args = parser.parse_args()
+
+    sqlite = handler._get_settings().storage_backend == "sqlite"
+    if args.create_tables and not sqlite:
+        create_tables()
+    started = time.perf_counter()
+    counts = (seed_sqlite_user if sqlite else seed_user)(
+        args.user_id, args.records, goals=args.goals, end=args.end, days=args.days, seed=args.seed
+    )
+    print(f"user_id={args.user_id} {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
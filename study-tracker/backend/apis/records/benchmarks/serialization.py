@@ -0,0 +1,102 @@
+"""学習記録一覧の応答経路 (読み取り結果の変換 → 直列化) を 1 万件で計測する
+
+DynamoDB の応答 (属性値の JSON) から HTTP 応答の本文を作るまでを、段階ごとに比べる。
+
+    before   TypeDeserializer (Decimal) → 項目ごとに Decimal を走査して変換 → response_model で検証・直列化
+    after    _NumberDeserializer (int / float) → _serialize_record → 検証せずに直列化
+
+    python -m benchmarks.serialization --records 10000 --repeat 5
+"""
+import argparse
+import json
+import time
+import uuid
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+
+def _raw_items(count: int) -> list[dict]:
+    """Query 応答の Items と同じ形 (属性値の JSON) の学習記録を作る"""
+    items = []
+    for i in range(count):
+        items.append({
+            "user_id": {"S": "bench-user"},
+            "record_id": {"S": str(uuid.uuid4())},
+            "study_date": {"S": f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}"},
+            "subject": {"S": f"科目{i % 8}"},
+            "user_subject": {"S": f"bench-user#科目{i % 8}"},
+            "duration_minutes": {"N": str(i % 180 + 1)},
+            "start_time": {"S": "09:00:00"},
+            "memo": {"S": "復習"},
+            "created_at": {"S": "2025-01-01T00:00:00+00:00"},
+            "updated_at": {"S": "2025-01-01T00:00:00+00:00"},
+        })
+    return items
+
+
+def _serialize_record_per_item(item: dict) -> dict:
+    """変更前の _serialize_record (項目をコピーし、値を走査して Decimal を変換する)"""
+    result = {k: v for k, v in item.items() if k not in ("user_subject",)}
+    for key, value in result.items():
+        if isinstance(value, Decimal):
+            result[key] = int(value)
+    return result
+
+
+def _best(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import handler
+    from main import json_response_class
+
+    raw = _raw_items(args.records)
+    decimal_deserializer = TypeDeserializer()
+    number_deserializer = handler._NumberDeserializer()
+    adapter = TypeAdapter(list[handler.StudyRecordResponse])
+
+    decimal_items = [{k: decimal_deserializer.deserialize(v) for k, v in i.items()} for i in raw]
+    number_items = [{k: number_deserializer.deserialize(v) for k, v in i.items()} for i in raw]
+    before = [_serialize_record_per_item(i) for i in decimal_items]
+    after = [handler._serialize_record(i) for i in number_items]
+    assert json.loads(adapter.dump_json(adapter.validate_python(before))) == json.loads(
+        json_response_class(after).body
+    )
+
+    stages = [
+        ("deserialize", lambda: [{k: decimal_deserializer.deserialize(v) for k, v in i.items()} for i in raw],
+         lambda: [{k: number_deserializer.deserialize(v) for k, v in i.items()} for i in raw]),
+        ("serialize_record", lambda: [_serialize_record_per_item(i) for i in decimal_items],
+         lambda: [handler._serialize_record(i) for i in number_items]),
+        ("render", lambda: adapter.dump_json(adapter.validate_python(before)),
+         lambda: json_response_class(after).body),
+    ]
+
+    print(f"records={args.records} repeat={args.repeat} response_class={json_response_class.__name__}")
+    print(f"{'stage':<18}{'before (ms)':>12}{'after (ms)':>12}")
+    total_before = total_after = 0.0
+    for name, run_before, run_after in stages:
+        b, a = _best(run_before, args.repeat), _best(run_after, args.repeat)
+        total_before += b
+        total_after += a
+        print(f"{name:<18}{b:>12.1f}{a:>12.1f}")
+    print(f"{'total':<18}{total_before:>12.1f}{total_after:>12.1f}")
+    print(f"{'render (json)':<18}{'':>12}{_best(lambda: JSONResponse(after).body, args.repeat):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
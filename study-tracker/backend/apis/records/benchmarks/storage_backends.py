@@ -0,0 +1,139 @@
+"""保存先 (STORAGE_BACKEND) ごとに、リポジトリの操作の所要時間を比べる
+
+同じデータ (乱数の種を固定) を DynamoDB (moto) と SQLite に入れ、読み取り・書き込みの中央値と p95 を出す。
+moto はプロセス内で動くため、実際の DynamoDB のネットワーク往復 (数 ms / 回) は含まれない。
+キャッシュは無効にして、保存先そのものの速さを測る。
+
+    python -m benchmarks.storage_backends --records 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "dummy")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "dummy")
+
+import cache  # noqa: E402
+import handler  # noqa: E402
+import repository  # noqa: E402
+from benchmarks.seed import DEFAULT_END, MEMOS, SUBJECTS, create_tables  # noqa: E402
+
+USER_ID = "bench-user"
+GOAL_IDS = [f"bench-goal-{i}" for i in range(3)]
+CHUNK_SIZE = 500
+
+
+def _payloads(count: int, days: int, seed: int = 0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield {
+            "study_date": str(DEFAULT_END - timedelta(days=rng.randrange(days))),
+            "subject": rng.choice(SUBJECTS),
+            "duration_minutes": rng.randint(10, 180),
+            "memo": rng.choice(MEMOS),
+            "goal_id": rng.choice(GOAL_IDS) if rng.random() < 0.3 else None,
+        }
+
+
+def _put_goals(backend: str) -> None:
+    now = "2025-01-01T00:00:00+00:00"
+    if backend == "sqlite":
+        with repository.get_repository().store.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO goals (user_id, goal_id, title, target_hours, created_at, updated_at) "
+                "VALUES (?, ?, ?, 100, ?, ?)",
+                [(USER_ID, goal_id, goal_id, now, now) for goal_id in GOAL_IDS],
+            )
+        return
+    for goal_id in GOAL_IDS:
+        handler._get_goals_table().put_item(Item={
+            "user_id": USER_ID, "goal_id": goal_id, "title": goal_id, "target_hours": 100,
+            "current_minutes": 0, "records_count": 0, "status": "active", "created_at": now, "updated_at": now,
+        })
+
+
+def _seed(backend: str, count: int, days: int) -> None:
+    _put_goals(backend)
+    repo = repository.get_repository()
+    payloads = list(_payloads(count, days))
+    for start in range(0, len(payloads), CHUNK_SIZE):
+        repo.create_records_batch(USER_ID, payloads[start:start + CHUNK_SIZE])
+
+
+def _scenarios(repo) -> dict:
+    record_id = repo.list_records_page(USER_ID, 1)[0][0]["record_id"]
+    year_ago = DEFAULT_END - timedelta(days=364)
+    week_ago = DEFAULT_END - timedelta(days=6)
+    payload = {"study_date": str(DEFAULT_END), "subject": "Python", "duration_minutes": 30, "goal_id": GOAL_IDS[0]}
+    return {
+        "get_record": lambda: repo.get_record(USER_ID, record_id),
+        "list_records_page(100)": lambda: repo.list_records_page(USER_ID, 100),
+        "list_records(subject)": lambda: repo.list_records(USER_ID, subject="Python", date_from=year_ago),
+        "stats_summary(365d)": lambda: repo.get_stats_summary(USER_ID, year_ago, DEFAULT_END),
+        "calendar(month)": lambda: repo.get_calendar_data(USER_ID, DEFAULT_END.year, DEFAULT_END.month),
+        "dashboard(7d)": lambda: repo.get_dashboard(USER_ID, week_ago, DEFAULT_END, 5),
+        "create_record": lambda: repo.create_record(USER_ID, payload),
+        "update_record": lambda: repo.update_record(USER_ID, record_id, {"duration_minutes": random.randint(10, 90)}),
+    }
+
+
+def _measure(func, repeat: int) -> tuple[float, float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def run(backend: str, count: int, days: int, repeat: int) -> dict:
+    """1 つの保存先にデータを入れ、操作ごとの (中央値, p95) [ms] を返す"""
+    settings = handler._get_settings()
+    settings.storage_backend = backend
+    settings.cache_backend = "none"
+    settings.metrics_enabled = False
+    cache.reset_cache()
+    repository.reset_repository()
+    try:
+        if backend == "dynamodb":
+            create_tables()
+        _seed(backend, count, days)
+        repo = repository.get_repository()
+        return {name: _measure(func, repeat) for name, func in _scenarios(repo).items()}
+    finally:
+        repository.reset_repository()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365 * 3)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    from moto import mock_aws
+
+    settings = handler._get_settings()
+    settings.dynamodb_endpoint = ""
+    results = {}
+    with mock_aws():
+        handler.reset_dynamodb_resource()
+        results["dynamodb"] = run("dynamodb", args.records, args.days, args.repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.sqlite_path = os.path.join(tmp, "bench.db")
+        results["sqlite"] = run("sqlite", args.records, args.days, args.repeat)
+
+    print(f"records={args.records} days={args.days} repeat={args.repeat}  median / p95 [ms]")
+    print(f"{'operation':<26}{'dynamodb (moto)':>20}{'sqlite':>20}")
+    for name in results["dynamodb"]:
+        cells = "".join(f"{f'{m:.2f} / {p:.2f}':>20}" for m, p in (results[b][name] for b in ("dynamodb", "sqlite")))
+        print(f"{name:<26}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""handler の集計・変換処理のマイクロベンチマーク (pytest-benchmark)
+
+moto に BENCH_RECORDS 件 (既定 1000) の学習記録を投入し、キャッシュを通さずに計測する。
+DynamoDB の往復は moto の処理時間になるため、値はアプリ側の処理量の比較に使う。
+
+    make bench
+    BENCH_RECORDS=100000 poetry run pytest benchmarks/ --benchmark-only
+"""
+import os
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import handler  # noqa: E402
+from benchmarks.seed import DEFAULT_END, seed_user  # noqa: E402
+
+BENCH_RECORDS = int(os.environ.get("BENCH_RECORDS", "1000"))
+USER_ID = "bench-user"
+
+
+@pytest.fixture
+def seeded(dynamodb_mock):
+    seed_user(USER_ID, BENCH_RECORDS, days=365, threads=1)
+    return dynamodb_mock
+
+
+def test_serialize_record(benchmark, seeded):
+    items = list(handler._query_all(handler._get_records_table(), **handler._records_query_kwargs(USER_ID)))
+    result = benchmark(lambda: [handler._serialize_record(i) for i in items])
+    assert len(result) == BENCH_RECORDS
+
+
+def test_get_stats_summary(benchmark, seeded):
+    summary = benchmark(handler.get_stats_summary.__wrapped__, USER_ID, date(DEFAULT_END.year, 1, 1), DEFAULT_END)
+    assert summary["total_records"] == BENCH_RECORDS
+
+
+def test_get_calendar_data(benchmark, seeded):
+    days = benchmark(handler.get_calendar_data.__wrapped__, USER_ID, DEFAULT_END.year, DEFAULT_END.month)
+    assert days
+
+
+def test_list_records_page(benchmark, seeded):
+    items, _ = benchmark(handler.list_records_page.__wrapped__, USER_ID, 100)
+    assert len(items) == 100
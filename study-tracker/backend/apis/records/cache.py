@@ -0,0 +1,282 @@
+"""読み取り結果のキャッシュ
+
+キーは「スコープ・ユーザー・世代・関数名・引数」で組み立てる。世代はユーザー・スコープの版数
+(versions テーブル) で、どのプロセス・サービスの書き込みでも進むため、版数が進めばそのユーザーの
+古いエントリはすべて参照されなくなる（キーを列挙して削除する必要がなく、残ったエントリは TTL / LRU で消える）。
+版数は set_generation_source() で登録した関数で読む。条件付き GET で読んだ版数は use_generation() で渡し、
+同じリクエストで読み直さない。
+JSON にして CACHE_MAX_ENTRY_BYTES を超える値（ページングなしの大きな一覧など）は保存しない。
+
+バックエンドは CACHE_BACKEND で選ぶ:
+    memory  プロセス内の TTL 付き LRU（既定）
+    redis   Redis 互換サーバー（`redis` パッケージが必要。複数プロセス・サービス間で共有できる）
+    none    キャッシュしない
+"""
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _get_settings():
+    from main import settings
+    return settings
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+class MemoryBackend:
+    """プロセス内の TTL 付き LRU キャッシュ"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Redis 互換サーバーを使うキャッシュ"""
+
+    name = "redis"
+
+    def __init__(self, url: str | None = None, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "CACHE_BACKEND=redis には redis パッケージが必要です (pip install redis)"
+                ) from e
+            client = redis.Redis.from_url(url)
+        self._client = client
+
+    def get(self, key: str) -> str | None:
+        value = self._client.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._client.set(key, value, px=int(ttl * 1000))
+
+
+class NullBackend:
+    """何も保持しない（CACHE_BACKEND=none）"""
+
+    name = "none"
+
+    def get(self, key: str) -> str | None:
+        return None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Cache
+# ---------------------------------------------------------------------------
+
+
+class Cache:
+    """ユーザー・スコープの世代（版数）ごとに値を持つ読み取りキャッシュ
+
+    バックエンドの障害はキャッシュなしとして扱い、リクエストは失敗させない。
+    """
+
+    def __init__(self, backend, ttl: float, prefix: str = "study-tracker", max_entry_bytes: int = 0):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.max_entry_bytes = max_entry_bytes
+        self._stats: dict[str, dict[str, int]] = {}
+        self._errors = 0
+        self._oversized = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, field: str) -> None:
+        with self._lock:
+            counts = self._stats.setdefault(name, {"hits": 0, "misses": 0})
+            counts[field] += 1
+
+    def _error(self, action: str) -> None:
+        logger.warning("cache %s failed", action, exc_info=True)
+        with self._lock:
+            self._errors += 1
+
+    def get_or_load(
+        self, scope: str, user_id: str, name: str, params: dict, load: Callable[[], object], generation=None
+    ):
+        """世代 generation のエントリがあればそれを返し、なければ load() の結果を保存して返す
+
+        値は JSON で保持するため、タプルはリストとして返る。
+        JSON が max_entry_bytes (0 は無制限) を超える値は保存せずに返す。
+        """
+        key = (
+            f"{self.prefix}:{scope}:{user_id}:{generation}:{name}:"
+            + json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+        )
+        try:
+            cached = self.backend.get(key)
+        except Exception:
+            self._error("get")
+            cached = None
+            key = None
+
+        if cached is not None:
+            self._count(name, "hits")
+            return json.loads(cached)
+
+        self._count(name, "misses")
+        value = load()
+        if key is not None:
+            payload = json.dumps(value, default=str, ensure_ascii=False)
+            if self.max_entry_bytes and len(payload.encode()) > self.max_entry_bytes:
+                with self._lock:
+                    self._oversized += 1
+                return value
+            try:
+                self.backend.set(key, payload, self.ttl)
+            except Exception:
+                self._error("set")
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_function = {name: dict(counts) for name, counts in self._stats.items()}
+            errors = self._errors
+            oversized = self._oversized
+        hits = sum(c["hits"] for c in by_function.values())
+        misses = sum(c["misses"] for c in by_function.values())
+        total = hits + misses
+        return {
+            "backend": self.backend.name,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 3) if total else 0.0,
+            "errors": errors,
+            "oversized": oversized,
+            "by_function": by_function,
+        }
+
+
+def _build_cache() -> Cache:
+    s = _get_settings()
+    if s.cache_backend == "redis":
+        backend = RedisBackend(s.cache_redis_url)
+    elif s.cache_backend == "none":
+        backend = NullBackend()
+    else:
+        backend = MemoryBackend(s.cache_max_entries)
+    return Cache(backend, s.cache_ttl_seconds, s.cache_key_prefix, s.cache_max_entry_bytes)
+
+
+_cache: Cache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    """プロセス内で共有するキャッシュを返す（初回呼び出し時に設定から生成）"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _build_cache()
+    return _cache
+
+
+def set_cache(cache: Cache | None) -> None:
+    """共有キャッシュを差し替える（テストでバックエンドを注入する用途）"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def reset_cache() -> None:
+    """共有キャッシュを破棄し、次回呼び出し時に設定から再生成させる"""
+    set_cache(None)
+
+
+# ---------------------------------------------------------------------------
+# Generations
+# ---------------------------------------------------------------------------
+
+
+_generation_source: Callable[[str, str], object] | None = None
+# リクエスト内で既に読んだ版数 {(scope, user_id): 版数}
+_request_generations: contextvars.ContextVar[dict | None] = contextvars.ContextVar("cache_generations", default=None)
+
+
+def set_generation_source(source: Callable[[str, str], object] | None) -> None:
+    """世代に使う版数を読む関数 source(user_id, scope) を登録する"""
+    global _generation_source
+    _generation_source = source
+
+
+def use_generation(scope: str, user_id: str, generation) -> None:
+    """このリクエスト（コンテキスト）で読んだ版数を世代に使い、キャッシュの読み取りで版数を読み直さない
+
+    版数はデータより先に読んでいるため、その版数のキーに入るのは少なくともその版数以降のデータになる。
+    """
+    generations = dict(_request_generations.get() or {})
+    generations[(scope, user_id)] = generation
+    _request_generations.set(generations)
+
+
+def _generation(scope: str, user_id: str):
+    generations = _request_generations.get() or {}
+    if (scope, user_id) in generations:
+        return generations[(scope, user_id)]
+    if _generation_source is None:
+        raise RuntimeError("キャッシュの世代を読む関数が登録されていません (set_generation_source)")
+    return _generation_source(user_id, scope)
+
+
+def cached(scope: str):
+    """第 1 引数を user_id とする読み取り関数の結果を、ユーザー・スコープの版数ごとにキャッシュするデコレータ"""
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(user_id: str, *args, **kwargs):
+            cache = get_cache()
+            load = functools.partial(func, user_id, *args, **kwargs)
+            if isinstance(cache.backend, NullBackend):
+                return load()
+            bound = signature.bind(user_id, *args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != "user_id"}
+            return cache.get_or_load(scope, user_id, func.__name__, params, load, _generation(scope, user_id))
+
+        return wrapper
+
+    return decorator
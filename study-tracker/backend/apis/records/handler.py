@@ -1,11 +1,35 @@
+import asyncio
+import base64
+import codecs
+import contextvars
+import csv
+import io
+import json
+import logging
+import random
+import threading
 import uuid
-from datetime import date, time, datetime, UTC
-from decimal import Decimal
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, datetime, timedelta, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import cache, partial
+from time import sleep
 
 import boto3
-from boto3.dynamodb.conditions import Key
-from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel, Field
+from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, create_model
+
+from analytics import get_snapshot
+from cache import cached, set_generation_source, use_generation
+from metrics import instrument_dynamodb
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Schemas
@@ -61,6 +85,87 @@ class CalendarDay(BaseModel):
     subjects: list[str]
 
 
+class GoalProgressSummary(BaseModel):
+    goal_id: str
+    title: str
+    target_hours: float
+    current_hours: float
+    progress_percent: float
+    remaining_hours: float
+    status: str
+    records_count: int
+
+
+class DashboardResponse(BaseModel):
+    summary: StudyStatsSummary
+    daily: list[CalendarDay]
+    recent_records: list[StudyRecordResponse]
+    goals: list[GoalProgressSummary]
+
+
+class TimeseriesResponse(BaseModel):
+    granularity: str
+    buckets: list[str]
+    total_minutes: list[int]
+    record_count: list[int]
+    series: dict[str, list[int]] | None = None
+
+
+class SubjectStats(BaseModel):
+    subject: str
+    total_minutes: int
+    record_count: int
+
+
+class GoalStats(BaseModel):
+    goal_id: str
+    total_minutes: int
+    record_count: int
+
+
+class AnalyticsResponse(BaseModel):
+    summary: StudyStatsSummary
+    daily: list[CalendarDay]
+    subjects: list[SubjectStats]
+    goals: list[GoalStats]
+
+
+class RecordChangesResponse(BaseModel):
+    token: str
+    reset: bool
+    upserts: list[StudyRecordResponse]
+    deletes: list[str]
+
+
+class StudyRecordBatchCreate(BaseModel):
+    # 1 件ずつ StudyRecordCreate で検証し、不正な項目があっても他の項目は登録する
+    items: list[dict] = Field(..., min_length=1)
+
+
+class StudyRecordBatchDelete(BaseModel):
+    record_ids: list[str] = Field(..., min_length=1)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str  # created / deleted / not_found / duplicate / error
+    record_id: str | None = None
+    record: StudyRecordResponse | None = None
+    detail: str | None = None
+
+
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
+    errors_truncated: bool = False
+
+
 # ---------------------------------------------------------------------------
 # DynamoDB helpers
 # ---------------------------------------------------------------------------
@@ -71,22 +176,278 @@ def _get_settings():
     return settings
 
 
-def _get_dynamodb_resource():
+_dynamodb_resource = None
+_dynamodb_resource_lock = threading.Lock()
+
+
+def _build_dynamodb_resource():
     s = _get_settings()
+    config = Config(
+        max_pool_connections=s.dynamodb_max_pool_connections,
+        tcp_keepalive=s.dynamodb_tcp_keepalive,
+        connect_timeout=s.dynamodb_connect_timeout,
+        read_timeout=s.dynamodb_read_timeout,
+        retries={"max_attempts": s.dynamodb_max_attempts, "mode": s.dynamodb_retry_mode},
+    )
     kwargs = {
         "region_name": s.dynamodb_region,
         "aws_access_key_id": s.aws_access_key_id,
         "aws_secret_access_key": s.aws_secret_access_key,
+        "config": config,
     }
     if s.dynamodb_endpoint:
         kwargs["endpoint_url"] = s.dynamodb_endpoint
-    return boto3.resource("dynamodb", **kwargs)
+    return _prepare_resource(boto3.session.Session().resource("dynamodb", **kwargs))
+
+
+class _NumberDeserializer(TypeDeserializer):
+    """数値 (N) を Decimal ではなく int / float として読み取る
+
+    API は数値を int / float で返すため、応答を読み取る時点で変換しておけば
+    項目ごとに値を走査し直す必要がない。
+    """
+
+    def _deserialize_n(self, value):
+        return int(value) if value.lstrip("-").isdigit() else float(value)
+
+
+def _install_number_deserializer(resource):
+    """リソースが応答の変換に使う deserializer を _NumberDeserializer に置き換える"""
+    injector = getattr(resource, "_injector", None)
+    if injector is not None:
+        injector._deserializer = _NumberDeserializer()
+    return resource
+
+
+def _prepare_resource(resource):
+    """共有リソースに数値の変換と計測用のイベントフックを設定する"""
+    _install_number_deserializer(resource)
+    s = _get_settings()
+    if s.metrics_enabled:
+        instrument_dynamodb(resource.meta.client, consumed_capacity=s.metrics_consumed_capacity)
+    return resource
+
+
+def _get_dynamodb_resource():
+    """プロセス内で共有する DynamoDB リソースを返す（初回呼び出し時に生成）"""
+    global _dynamodb_resource
+    if _dynamodb_resource is None:
+        with _dynamodb_resource_lock:
+            if _dynamodb_resource is None:
+                _dynamodb_resource = _build_dynamodb_resource()
+    return _dynamodb_resource
+
+
+def set_dynamodb_resource(resource) -> None:
+    """共有 DynamoDB リソースを差し替える（テストで moto のリソースを注入する用途）"""
+    global _dynamodb_resource
+    with _dynamodb_resource_lock:
+        _dynamodb_resource = _prepare_resource(resource) if resource is not None else None
+
+
+def reset_dynamodb_resource() -> None:
+    """共有 DynamoDB リソースを破棄し、次回呼び出し時に設定から再生成させる"""
+    set_dynamodb_resource(None)
+
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str) -> ThreadPoolExecutor:
+    """DynamoDB 呼び出し用のスレッドプールを用途ごとに 1 つ返す
+
+    リクエスト処理用 ("request") と、その中で独立した書き込みを並行に発行する用 ("fanout") を
+    分け、入れ子の投入でワーカーを使い切ってデッドロックしないようにする。
+    """
+    if name not in _executors:
+        with _executors_lock:
+            if name not in _executors:
+                _executors[name] = ThreadPoolExecutor(
+                    max_workers=_get_settings().dynamodb_max_concurrency,
+                    thread_name_prefix=f"dynamodb-{name}",
+                )
+    return _executors[name]
+
+
+async def _run(func, *args, **kwargs):
+    """同期の DynamoDB 処理を専用スレッドプールで実行し、イベントループを塞がないようにする
+
+    boto3 のクライアントはスレッドセーフなため、共有リソースをそのまま使える。
+    同時実行数は Starlette の既定スレッドプール (40) ではなく DYNAMODB_MAX_CONCURRENCY で決まる。
+    """
+    call = partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(_get_executor("request"), call)
+
+
+def _run_parallel(calls: list[Callable[[], object]]) -> list:
+    """互いに独立した DynamoDB 呼び出しを並行に実行し、結果を順に返す"""
+    if len(calls) <= 1:
+        return [call() for call in calls]
+    executor = _get_executor("fanout")
+    futures = [executor.submit(contextvars.copy_context().run, call) for call in calls]
+    return [future.result() for future in futures]
 
 
 def _get_records_table():
     return _get_dynamodb_resource().Table(_get_settings().records_table_name)
 
 
+def _get_goals_table():
+    return _get_dynamodb_resource().Table(_get_settings().goals_table_name)
+
+
+def _get_rollups_table():
+    return _get_dynamodb_resource().Table(_get_settings().rollups_table_name)
+
+
+def _get_versions_table():
+    return _get_dynamodb_resource().Table(_get_settings().versions_table_name)
+
+
+def _get_changes_table():
+    return _get_dynamodb_resource().Table(_get_settings().changes_table_name)
+
+
+_type_serializer = TypeSerializer()
+_type_deserializer = TypeDeserializer()
+
+
+class InvalidCursorError(ValueError):
+    """ページングカーソルを解釈できない、または別ユーザー・別の条件の一覧のものである"""
+
+
+# カーソルに含める、発行した一覧の条件 (索引と絞り込み) の属性名
+CURSOR_FILTER_ATTRIBUTE = "filter"
+
+
+def _cursor_filter(*values) -> str:
+    """一覧の条件を 1 つの文字列にする（別の条件で渡されたカーソルを見分けるため）"""
+    return json.dumps([None if v is None else str(v) for v in values], separators=(",", ":"))
+
+
+def _check_cursor(cursor: str, user_id: str, cursor_filter: str, keys: set[str]) -> dict:
+    """カーソルを読み、ユーザー・一覧の条件・キー属性が揃っていることを確かめて開始キーを返す"""
+    start = _decode_cursor(cursor)
+    if (
+        start.get("user_id") != user_id
+        or start.pop(CURSOR_FILTER_ATTRIBUTE, None) != cursor_filter
+        or not keys <= start.keys()
+    ):
+        raise InvalidCursorError(cursor)
+    return start
+
+
+def _encode_cursor(key: dict) -> str:
+    raw = json.dumps(
+        {k: _type_serializer.serialize(v) for k, v in key.items()},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return {k: _type_deserializer.deserialize(v) for k, v in json.loads(raw).items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursorError(cursor) from e
+
+
+def _query_all(table, **kwargs) -> Iterator[dict]:
+    """LastEvaluatedKey を辿りながら query の結果を 1 件ずつ返す"""
+    while True:
+        resp = table.query(**kwargs)
+        yield from resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _scan_all(table, **kwargs) -> Iterator[dict]:
+    """LastEvaluatedKey を辿りながら scan の結果を 1 件ずつ返す"""
+    while True:
+        resp = table.scan(**kwargs)
+        yield from resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _query_page(
+    table, limit: int, start_key: dict | None, cursor_filter: str = "", **kwargs
+) -> tuple[list[dict], str | None]:
+    """1 ページ分だけ query し、次ページ用のカーソル (一覧の条件 cursor_filter を含む) と合わせて返す"""
+    kwargs["Limit"] = limit
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    resp = table.query(**kwargs)
+    last_key = resp.get("LastEvaluatedKey")
+    if not last_key:
+        return resp.get("Items", []), None
+    return resp.get("Items", []), _encode_cursor({**last_key, CURSOR_FILTER_ATTRIBUTE: cursor_filter})
+
+
+def _projection_kwargs(fields: Iterable[str] | None) -> dict:
+    """取得する属性を fields に絞る ProjectionExpression を組み立てる（None なら全属性）"""
+    if not fields:
+        return {}
+    names = {f"#p{i}": name for i, name in enumerate(fields)}
+    return {"ProjectionExpression": ", ".join(names), "ExpressionAttributeNames": names}
+
+
+def _is_condition_failed(e: ClientError) -> bool:
+    return e.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+
+BATCH_WRITE_CHUNK_SIZE = 25
+BATCH_GET_CHUNK_SIZE = 100
+
+
+def _retry_unprocessed(send: Callable[[list], list], pending: list) -> list:
+    """send が返す未処理分を指数バックオフ（full jitter）で再送し、最後まで残った分を返す"""
+    s = _get_settings()
+    for attempt in range(s.batch_max_retries + 1):
+        if attempt:
+            sleep(random.uniform(0, s.batch_retry_base_delay * 2 ** attempt))
+        pending = send(pending)
+        if not pending:
+            break
+    return pending
+
+
+def _batch_write(table, requests: list[dict]) -> list[dict]:
+    """BatchWriteItem を 25 件ずつ実行し、リトライしても処理できなかったリクエストを返す"""
+    resource = _get_dynamodb_resource()
+
+    def send(chunk: list[dict]) -> list[dict]:
+        resp = resource.batch_write_item(RequestItems={table.name: chunk})
+        return resp.get("UnprocessedItems", {}).get(table.name, [])
+
+    failed: list[dict] = []
+    for start in range(0, len(requests), BATCH_WRITE_CHUNK_SIZE):
+        failed += _retry_unprocessed(send, requests[start:start + BATCH_WRITE_CHUNK_SIZE])
+    return failed
+
+
+def _batch_get(table, keys: list[dict]) -> tuple[list[dict], list[dict]]:
+    """BatchGetItem を 100 件ずつ実行し、取得できたアイテムとリトライしても残ったキーを返す"""
+    resource = _get_dynamodb_resource()
+    items: list[dict] = []
+
+    def send(chunk: list[dict]) -> list[dict]:
+        resp = resource.batch_get_item(RequestItems={table.name: {"Keys": chunk}})
+        items.extend(resp.get("Responses", {}).get(table.name, []))
+        return resp.get("UnprocessedKeys", {}).get(table.name, {}).get("Keys", [])
+
+    failed: list[dict] = []
+    for start in range(0, len(keys), BATCH_GET_CHUNK_SIZE):
+        failed += _retry_unprocessed(send, keys[start:start + BATCH_GET_CHUNK_SIZE])
+    return items, failed
+
+
 # ---------------------------------------------------------------------------
 # Dependencies
 # ---------------------------------------------------------------------------
@@ -96,29 +457,209 @@ def get_user_id() -> str:
     return _get_settings().default_user_id
 
 
+def _get_repository():
+    from repository import get_repository
+    return get_repository()
+
+
 # ---------------------------------------------------------------------------
 # Business logic
 # ---------------------------------------------------------------------------
 
 
+# GSI のキーとしてのみ保持し、API では返さない属性
+_INTERNAL_ATTRIBUTES = ("user_subject",)
+
+# 値がなければ保存しない属性（API では既定値で返す）
+_RECORD_DEFAULTS = {"start_time": None, "end_time": None, "memo": "", "goal_id": None}
+
+
 def _serialize_record(item: dict) -> dict:
-    result = dict(item)
-    for key, value in result.items():
-        if isinstance(value, Decimal):
-            result[key] = int(value)
+    # 数値は _NumberDeserializer が読み取り時に int へ変換している
+    result = {**_RECORD_DEFAULTS, **item}
+    for key in _INTERNAL_ATTRIBUTES:
+        result.pop(key, None)
     return result
 
 
-def create_record(user_id: str, data: dict) -> dict:
-    table = _get_records_table()
-    now = datetime.now(UTC).isoformat()
-    record_id = str(uuid.uuid4())
+def _apply_goal_delta(user_id: str, goal_id: str, minutes: int, count: int) -> None:
+    """目標の current_minutes / records_count を ADD で加減算する
+
+    存在しない目標（削除済み・未作成）に紐づく分は読み捨てる。
+    """
+    try:
+        _get_goals_table().update_item(
+            Key={"user_id": user_id, "goal_id": goal_id},
+            UpdateExpression="ADD current_minutes :m, records_count :c",
+            ConditionExpression=Attr("goal_id").exists(),
+            ExpressionAttributeValues={":m": minutes, ":c": count},
+        )
+    except ClientError as e:
+        if not _is_condition_failed(e):
+            raise
+
+
+def get_version(user_id: str, scope: str) -> dict:
+    """ユーザー・スコープ ("records" / "goals") のデータ版数と最終更新時刻を返す
+
+    版数は書き込みのたびに 1 増える。一度も書き込みがなければ 0。
+    """
+    resp = _get_versions_table().get_item(
+        Key={"user_id": user_id, "scope": scope}, ConsistentRead=True
+    )
+    item = resp.get("Item", {})
+    return {"version": int(item.get("version", 0)), "updated_at": item.get("updated_at")}
+
+
+# キャッシュの世代はスコープの版数（他のプロセス・goals API の書き込みでも進む）
+set_generation_source(lambda user_id, scope: get_version(user_id, scope)["version"])
+
 
+def _combine_versions(versions: list[dict]) -> dict:
+    """複数スコープの版数を、どれかが進めば変わる 1 つの版数にまとめる"""
+    return {
+        "version": ".".join(str(v["version"]) for v in versions),
+        "updated_at": max((v["updated_at"] for v in versions if v["updated_at"]), default=None),
+    }
+
+
+def _get_combined_version(user_id: str, scopes: tuple[str, ...]) -> dict:
+    return _combine_versions(_run_parallel([partial(get_version, user_id, scope) for scope in scopes]))
+
+
+def _change_key(scope: str, version: int) -> str:
+    # 版数を 0 埋めし、文字列の順序を版数の順序に揃える
+    return f"{scope}#{version:012d}"
+
+
+def _bump_version(user_id: str, scope: str, log: list[tuple[str, str]]) -> None:
+    """版数を 1 進め、変更ログに新しい版で変わった ID（と操作）を書く
+
+    版数は ADD で割り当てるため、同時の書き込みと競合せず、事前の読み取りも再試行も要らない。
+    データの書き込みは確定した後なので、ここで失敗しても例外にはせずログに残す
+    （変更ログが欠けた版は _read_change_log が reset として返す）。
+    """
+    s = _get_settings()
+    now = datetime.now(UTC)
+    try:
+        resp = _get_versions_table().update_item(
+            Key={"user_id": user_id, "scope": scope},
+            UpdateExpression="SET updated_at = :now ADD version :one",
+            ExpressionAttributeValues={":now": now.isoformat(), ":one": 1},
+            ReturnValues="UPDATED_NEW",
+        )
+        version = resp["Attributes"]["version"]
+        _get_changes_table().put_item(Item={
+            "user_id": user_id,
+            "change_key": _change_key(scope, version),
+            "version": version,
+            "upserts": [item_id for item_id, op in log if op == "upsert"],
+            "deletes": [item_id for item_id, op in log if op == "delete"],
+            "reset": any(op == "reset" for _, op in log),
+            "changed_at": now.isoformat(),
+            # DynamoDB の TTL で保持期間を過ぎたものを消す
+            "expires_at": int((now + timedelta(days=s.changes_retention_days)).timestamp()),
+        })
+    except ClientError:
+        logger.exception("failed to record a change: user=%s scope=%s", user_id, scope)
+
+
+def _mark_changed(user_id: str, changes: dict[str, list[tuple[str, str]]]) -> None:
+    """書き込みの反映後に版数を進める（変更ログも同時に書く）
+
+    キャッシュは版数を世代に使うため、版数が進めば古いエントリは参照されなくなる。
+    changes はスコープごとの [(ID, "upsert" / "delete")]。ID を書かない一括の書き込みは [("", "reset")] で、
+    それより前の同期トークンには reset を返す。
+    """
+    _run_parallel([partial(_bump_version, user_id, scope, log) for scope, log in changes.items()])
+
+
+def _change_log(changes: list[tuple[dict | None, dict | None]]) -> dict[str, list[tuple[str, str]]]:
+    """学習記録の変更（変更前, 変更後）から、スコープごとの変更ログを作る
+
+    紐づく学習記録が変わった目標は進捗が変わるため、goals スコープに upsert として書く。
+    """
+    records: list[tuple[str, str]] = []
+    goal_ids: dict[str, None] = {}
+    for old, new in changes:
+        records.append(((new or old)["record_id"], "upsert" if new else "delete"))
+        for item in (old, new):
+            if item and item.get("goal_id"):
+                goal_ids[item["goal_id"]] = None
+    log = {"records": records}
+    if goal_ids:
+        log["goals"] = [(goal_id, "upsert") for goal_id in goal_ids]
+    return log
+
+
+def _rollup_key(study_date: str, subject: str) -> str:
+    return f"{study_date}#{subject}"
+
+
+def _apply_rollup_delta(user_id: str, study_date: str, subject: str, minutes: int, count: int) -> None:
+    """日次・科目別集計 (total_minutes / record_count) を ADD で加減算する
+
+    record_count が 0 になった集計アイテムは削除する。
+    """
+    table = _get_rollups_table()
+    key = {"user_id": user_id, "rollup_key": _rollup_key(study_date, subject)}
+    resp = table.update_item(
+        Key=key,
+        UpdateExpression="SET study_date = :d, subject = :s ADD total_minutes :m, record_count :c",
+        ExpressionAttributeValues={":d": study_date, ":s": subject, ":m": minutes, ":c": count},
+        ReturnValues="ALL_NEW",
+    )
+    if resp["Attributes"]["record_count"] <= 0:
+        try:
+            table.delete_item(Key=key, ConditionExpression=Attr("record_count").lte(0))
+        except ClientError as e:
+            if not _is_condition_failed(e):
+                raise
+
+
+def _apply_record_changes(user_id: str, changes: list[tuple[dict | None, dict | None]]) -> None:
+    """学習記録の変更（変更前, 変更後）から目標カウンタと日次集計をまとめて加減算する
+
+    加減算はキーごとに独立しているため、並行に発行する。
+    """
+    goal_deltas: dict[str, list[int]] = {}
+    rollup_deltas: dict[tuple[str, str], list[int]] = {}
+    for old, new in changes:
+        for item, sign in ((old, -1), (new, 1)):
+            if not item:
+                continue
+            minutes = sign * int(item["duration_minutes"])
+            delta = rollup_deltas.setdefault((item["study_date"], item["subject"]), [0, 0])
+            delta[0] += minutes
+            delta[1] += sign
+            if item.get("goal_id"):
+                delta = goal_deltas.setdefault(item["goal_id"], [0, 0])
+                delta[0] += minutes
+                delta[1] += sign
+
+    calls = [
+        partial(_apply_goal_delta, user_id, goal_id, minutes, count)
+        for goal_id, (minutes, count) in goal_deltas.items()
+        if minutes or count
+    ] + [
+        partial(_apply_rollup_delta, user_id, study_date, subject, minutes, count)
+        for (study_date, subject), (minutes, count) in rollup_deltas.items()
+        if minutes or count
+    ]
+    _run_parallel(calls)
+
+    # 目標の進捗も変わるため、Goals API 側のキャッシュ・版数・変更ログも進める
+    _mark_changed(user_id, _change_log(changes))
+
+
+def _build_record_item(user_id: str, data: dict, now: str) -> dict:
+    """StudyRecordCreate の内容から DynamoDB に保存するアイテムを組み立てる"""
     item = {
         "user_id": user_id,
-        "record_id": record_id,
+        "record_id": str(uuid.uuid4()),
         "study_date": str(data["study_date"]),
         "subject": data["subject"],
+        "user_subject": _user_subject(user_id, data["subject"]),
         "duration_minutes": data["duration_minutes"],
         "memo": data.get("memo", ""),
         "goal_id": data.get("goal_id"),
@@ -130,11 +671,61 @@ def create_record(user_id: str, data: dict) -> dict:
     if data.get("end_time"):
         item["end_time"] = str(data["end_time"])
 
-    item = {k: v for k, v in item.items() if v is not None}
+    return {k: v for k, v in item.items() if v is not None}
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+
+def create_record(user_id: str, data: dict) -> dict:
+    table = _get_records_table()
+    item = _build_record_item(user_id, data, datetime.now(UTC).isoformat())
     table.put_item(Item=item)
+
+    _apply_record_changes(user_id, [(None, item)])
     return _serialize_record(item)
 
 
+def _build_batch_items(user_id: str, payloads: list[dict], now: str) -> tuple[list[dict], dict[str, dict]]:
+    """一括登録の項目を 1 件ずつ検証し、項目ごとの結果と保存するアイテム (record_id → アイテム) を返す"""
+    results: list[dict] = []
+    items: dict[str, dict] = {}
+
+    for index, payload in enumerate(payloads):
+        try:
+            data = StudyRecordCreate.model_validate(payload).model_dump()
+        except ValidationError as e:
+            results.append({"index": index, "status": "error", "detail": _format_validation_error(e)})
+            continue
+        item = _build_record_item(user_id, data, now)
+        items[item["record_id"]] = item
+        results.append({"index": index, "status": "created", "record_id": item["record_id"]})
+    return results, items
+
+
+def create_records_batch(user_id: str, payloads: list[dict]) -> list[dict]:
+    """複数の学習記録を BatchWriteItem でまとめて登録し、項目ごとの結果を返す"""
+    results, items = _build_batch_items(user_id, payloads, datetime.now(UTC).isoformat())
+    failed = _batch_write(
+        _get_records_table(), [{"PutRequest": {"Item": item}} for item in items.values()]
+    )
+    failed_ids = {req["PutRequest"]["Item"]["record_id"] for req in failed}
+
+    for result in results:
+        if result.get("record_id") in failed_ids:
+            result.update(status="error", record_id=None, detail="書き込みに失敗しました")
+        elif result["status"] == "created":
+            result["record"] = _serialize_record(items[result["record_id"]])
+
+    _apply_record_changes(
+        user_id, [(None, item) for record_id, item in items.items() if record_id not in failed_ids]
+    )
+    return results
+
+
 def get_record(user_id: str, record_id: str) -> dict | None:
     table = _get_records_table()
     resp = table.get_item(Key={"user_id": user_id, "record_id": record_id})
@@ -142,47 +733,99 @@ def get_record(user_id: str, record_id: str) -> dict | None:
     return _serialize_record(item) if item else None
 
 
-def list_records(
+def _user_subject(user_id: str, subject: str) -> str:
+    """subject-index のパーティションキー"""
+    return f"{user_id}#{subject}"
+
+
+def _records_query_kwargs(
     user_id: str,
     date_from: date | None = None,
     date_to: date | None = None,
     subject: str | None = None,
-) -> list[dict]:
-    table = _get_records_table()
+) -> dict:
+    """条件に合う GSI を選び、study_date の降順で読む query 引数を組み立てる
 
-    if date_from or date_to:
+    subject 指定時は subject-index (user_id#subject, study_date)、
+    それ以外は date-index (user_id, study_date) を使う。
+    """
+    if subject:
+        index_name = "subject-index"
+        key_condition = Key("user_subject").eq(_user_subject(user_id, subject))
+    else:
+        index_name = "date-index"
         key_condition = Key("user_id").eq(user_id)
-        if date_from and date_to:
-            key_condition &= Key("study_date").between(str(date_from), str(date_to))
-        elif date_from:
-            key_condition &= Key("study_date").gte(str(date_from))
-        else:
-            key_condition &= Key("study_date").lte(str(date_to))
 
-        resp = table.query(IndexName="date-index", KeyConditionExpression=key_condition)
-    else:
-        resp = table.query(KeyConditionExpression=Key("user_id").eq(user_id))
+    if date_from and date_to:
+        key_condition &= Key("study_date").between(str(date_from), str(date_to))
+    elif date_from:
+        key_condition &= Key("study_date").gte(str(date_from))
+    elif date_to:
+        key_condition &= Key("study_date").lte(str(date_to))
 
-    items = [_serialize_record(i) for i in resp.get("Items", [])]
+    return {
+        "IndexName": index_name,
+        "KeyConditionExpression": key_condition,
+        "ScanIndexForward": False,
+    }
 
-    if subject:
-        items = [i for i in items if i.get("subject") == subject]
 
-    items.sort(key=lambda x: x.get("study_date", ""), reverse=True)
-    return items
+def _iter_records(
+    user_id: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    subject: str | None = None,
+    fields: tuple[str, ...] | None = None,
+) -> Iterator[dict]:
+    """条件に合う学習記録を study_date の降順で全ページ分、順に返す（fields 指定時はその属性だけ読む）"""
+    kwargs = {**_records_query_kwargs(user_id, date_from, date_to, subject), **_projection_kwargs(fields)}
+    for item in _query_all(_get_records_table(), **kwargs):
+        yield _serialize_record(item)
 
 
-def update_record(user_id: str, record_id: str, data: dict) -> dict | None:
-    existing = get_record(user_id, record_id)
-    if not existing:
-        return None
+@cached("records")
+def list_records(
+    user_id: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    subject: str | None = None,
+    fields: tuple[str, ...] | None = None,
+) -> list[dict]:
+    return list(_iter_records(user_id, date_from=date_from, date_to=date_to, subject=subject, fields=fields))
 
-    table = _get_records_table()
+
+@cached("records")
+def list_records_page(
+    user_id: str,
+    limit: int,
+    cursor: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    subject: str | None = None,
+    fields: tuple[str, ...] | None = None,
+) -> tuple[list[dict], str | None]:
+    """学習記録を study_date の降順で 1 ページ分返す（次ページがなければカーソルは None）
+
+    カーソルは発行したときと同じ条件でだけ使える。索引 (date-index / subject-index) や範囲が
+    変わると開始キーが合わないため、条件が違えば InvalidCursorError にする。
+    """
+    cursor_filter = _cursor_filter(date_from, date_to, subject)
+    start_key = _check_cursor(cursor, user_id, cursor_filter, {"record_id", "study_date"}) if cursor else None
+
+    kwargs = {**_records_query_kwargs(user_id, date_from, date_to, subject), **_projection_kwargs(fields)}
+    items, next_cursor = _query_page(_get_records_table(), limit, start_key, cursor_filter, **kwargs)
+    return [_serialize_record(i) for i in items], next_cursor
+
+
+def update_record(user_id: str, record_id: str, data: dict) -> dict | None:
     update_fields = {k: v for k, v in data.items() if v is not None}
     if not update_fields:
-        return existing
+        return get_record(user_id, record_id)
 
+    table = _get_records_table()
     update_fields["updated_at"] = datetime.now(UTC).isoformat()
+    if "subject" in update_fields:
+        update_fields["user_subject"] = _user_subject(user_id, update_fields["subject"])
 
     for key, value in update_fields.items():
         if hasattr(value, "isoformat"):
@@ -199,75 +842,626 @@ def update_record(user_id: str, record_id: str, data: dict) -> dict | None:
         expr_names[placeholder_name] = key
         expr_values[placeholder_value] = value
 
-    table.update_item(
-        Key={"user_id": user_id, "record_id": record_id},
-        UpdateExpression="SET " + ", ".join(update_expr_parts),
-        ExpressionAttributeNames=expr_names,
-        ExpressionAttributeValues=expr_values,
-    )
-
-    return get_record(user_id, record_id)
+    # 存在確認と更新を 1 回の条件付き書き込みで行う。目標カウンタ・日次集計の差分計算に
+    # 変更前の値が必要なため ALL_OLD を受け取り、変更後の値は手元で組み立てる
+    try:
+        resp = table.update_item(
+            Key={"user_id": user_id, "record_id": record_id},
+            UpdateExpression="SET " + ", ".join(update_expr_parts),
+            ConditionExpression=Attr("record_id").exists(),
+            ExpressionAttributeNames=expr_names,
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_OLD",
+        )
+    except ClientError as e:
+        if _is_condition_failed(e):
+            return None
+        raise
+
+    existing = resp["Attributes"]
+    updated = {**existing, **update_fields}
+    _apply_record_changes(user_id, [(existing, updated)])
+    return _serialize_record(updated)
+
+
+def _delete_existing(user_id: str, record_id: str) -> dict | None:
+    """学習記録を条件付きで削除し、削除した項目を返す（既にない場合は None）"""
+    try:
+        resp = _get_records_table().delete_item(
+            Key={"user_id": user_id, "record_id": record_id},
+            ConditionExpression=Attr("record_id").exists(),
+            ReturnValues="ALL_OLD",
+        )
+    except ClientError as e:
+        if _is_condition_failed(e):
+            return None
+        raise
+    return resp["Attributes"]
 
 
 def delete_record(user_id: str, record_id: str) -> bool:
-    existing = get_record(user_id, record_id)
-    if not existing:
+    deleted = _delete_existing(user_id, record_id)
+    if deleted is None:
         return False
-
-    table = _get_records_table()
-    table.delete_item(Key={"user_id": user_id, "record_id": record_id})
+    _apply_record_changes(user_id, [(deleted, None)])
     return True
 
 
-def get_stats_summary(user_id: str, date_from: date, date_to: date) -> dict:
-    records = list_records(user_id, date_from=date_from, date_to=date_to)
+def _try_delete_existing(user_id: str, record_id: str) -> dict | None | ClientError:
+    try:
+        return _delete_existing(user_id, record_id)
+    except ClientError as e:
+        return e
+
+
+def delete_records_batch(user_id: str, record_ids: list[str]) -> list[dict]:
+    """複数の学習記録を削除し、項目ごとの結果を返す
+
+    削除は項目ごとに条件付き (ReturnValues=ALL_OLD) で並行に送る。同じ記録を別の削除と
+    取り合っても、集計とカウンタには実際に削除できた項目だけを反映する。
+    """
+    unique_ids = list(dict.fromkeys(record_ids))
+    outcomes = dict(zip(
+        unique_ids,
+        _run_parallel([partial(_try_delete_existing, user_id, record_id) for record_id in unique_ids]),
+    ))
+    deleted = {record_id: item for record_id, item in outcomes.items() if isinstance(item, dict)}
+    failed_ids = {record_id for record_id, item in outcomes.items() if isinstance(item, ClientError)}
+
+    _apply_record_changes(user_id, [(item, None) for item in deleted.values()])
+    return _delete_results(record_ids, deleted.keys(), failed_ids)
+
+
+def _delete_results(record_ids: list[str], deleted_ids: set[str], failed_ids: set[str] = frozenset()) -> list[dict]:
+    """一括削除の項目ごとの結果（同じ record_id の 2 回目以降は削除済みと数えず duplicate にする）"""
+    results = []
+    seen = set()
+    for index, record_id in enumerate(record_ids):
+        if record_id in seen:
+            results.append({
+                "index": index, "status": "duplicate", "record_id": record_id,
+                "detail": "同じ record_id が先に指定されています",
+            })
+            continue
+        seen.add(record_id)
+        if record_id in failed_ids:
+            results.append({"index": index, "status": "error", "record_id": record_id, "detail": "削除に失敗しました"})
+        elif record_id in deleted_ids:
+            results.append({"index": index, "status": "deleted", "record_id": record_id})
+        else:
+            results.append({"index": index, "status": "not_found", "record_id": record_id})
+    return results
+
+
+EXPORT_FIELDS = [
+    "record_id",
+    "study_date",
+    "subject",
+    "duration_minutes",
+    "start_time",
+    "end_time",
+    "memo",
+    "goal_id",
+    "created_at",
+    "updated_at",
+]
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+IMPORT_CHUNK_SIZE = 100
+IMPORT_MAX_ERRORS = 100
+
+
+def export_records(
+    user_id: str,
+    fmt: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    subject: str | None = None,
+) -> Iterator[str]:
+    """学習記録をページ単位で読み出しながら NDJSON / CSV の行として返す"""
+    records = _get_repository().iter_records(user_id, date_from=date_from, date_to=date_to, subject=subject)
+    if fmt == "ndjson":
+        for r in records:
+            yield json.dumps({k: r.get(k) for k in EXPORT_FIELDS}, ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    for r in records:
+        writer.writerow(r)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """受信したバイト列を逐次デコードし、(行番号, 行) を返す"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_no = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line.removesuffix("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield line_no + 1, pending.removesuffix("\r")
+
+
+async def _parse_ndjson(lines: AsyncIterator[tuple[int, str]]) -> AsyncIterator[tuple[int, dict | str]]:
+    """NDJSON を 1 行ずつ解釈し、(行番号, 項目 or エラー内容) を返す"""
+    async for line_no, line in lines:
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"JSON として解釈できません: {e.msg}"
+            continue
+        yield line_no, payload if isinstance(payload, dict) else "オブジェクトではありません"
+
+
+async def _parse_csv(lines: AsyncIterator[tuple[int, str]]) -> AsyncIterator[tuple[int, dict | str]]:
+    """ヘッダー付き CSV を 1 レコードずつ解釈し、(開始行番号, 項目 or エラー内容) を返す
+
+    引用符内の改行を含むレコードは、引用符の数が偶数になるまで行を連結してから解釈する。
+    空欄の列は未指定として扱う。
+    """
+    header: list[str] | None = None
+    pending: list[str] = []
+    start = 0
+    async for line_no, line in lines:
+        if not pending:
+            start = line_no
+        pending.append(line)
+        text = "\n".join(pending)
+        if text.count('"') % 2:
+            continue
+        pending = []
+        if not text.strip():
+            continue
+
+        row = next(csv.reader([text]))
+        if header is None:
+            header = row
+            continue
+        if len(row) != len(header):
+            yield start, f"列数がヘッダーと一致しません ({len(row)} / {len(header)})"
+            continue
+        yield start, {k: v for k, v in zip(header, row) if v != ""}
+
+    if pending:
+        yield start, "引用符が閉じられていません"
+
+
+async def import_records(user_id: str, rows: AsyncIterator[tuple[int, dict | str]]) -> dict:
+    """解釈済みの行を IMPORT_CHUNK_SIZE 件ずつ一括登録し、件数と行ごとのエラーを返す
+
+    エラーは件数だけ数え、内容は先頭の IMPORT_MAX_ERRORS 件まで持つ（大量の不正行でメモリを使わない）。
+    """
+    imported = 0
+    failed = 0
+    errors: list[dict] = []
+
+    def add_error(line_no: int, detail: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < IMPORT_MAX_ERRORS:
+            errors.append({"line": line_no, "detail": detail})
+
+    async def flush(chunk: list[tuple[int, dict]]) -> None:
+        nonlocal imported
+        results = await _run(_get_repository().create_records_batch, user_id, [p for _, p in chunk])
+        for (line_no, _), result in zip(chunk, results):
+            if result["status"] == "created":
+                imported += 1
+            else:
+                add_error(line_no, result["detail"])
+
+    chunk: list[tuple[int, dict]] = []
+    async for line_no, payload in rows:
+        if isinstance(payload, str):
+            add_error(line_no, payload)
+            continue
+        chunk.append((line_no, payload))
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            await flush(chunk)
+            chunk = []
+    if chunk:
+        await flush(chunk)
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
+
 
-    total_minutes = sum(r["duration_minutes"] for r in records)
+def backfill_user_subject() -> int:
+    """subject-index 導入前の学習記録に user_subject を付与し、更新件数を返す"""
+    table = _get_records_table()
+    count = 0
+    user_ids: set[str] = set()
+    for item in _scan_all(
+        table,
+        FilterExpression=Attr("user_subject").not_exists(),
+        ProjectionExpression="user_id, record_id, subject",
+    ):
+        table.update_item(
+            Key={"user_id": item["user_id"], "record_id": item["record_id"]},
+            UpdateExpression="SET user_subject = :us",
+            ExpressionAttributeValues={":us": _user_subject(item["user_id"], item["subject"])},
+        )
+        user_ids.add(item["user_id"])
+        count += 1
+
+    for user_id in user_ids:
+        _mark_changed(user_id, {"records": []})
+    return count
+
+
+def rebuild_rollups() -> int:
+    """日次・科目別集計を学習記録から作り直し、書き込んだ集計アイテム数を返す
+
+    再構築中に書き込まれた学習記録の分はずれる可能性があるため、書き込みの少ない時間帯に実行する。
+    """
+    totals: dict[tuple[str, str, str], list[int]] = {}
+    for item in _scan_all(
+        _get_records_table(),
+        ProjectionExpression="user_id, study_date, subject, duration_minutes",
+    ):
+        total = totals.setdefault((item["user_id"], item["study_date"], item["subject"]), [0, 0])
+        total[0] += int(item["duration_minutes"])
+        total[1] += 1
+
+    table = _get_rollups_table()
+    user_ids = {user_id for user_id, _, _ in totals}
+    with table.batch_writer() as batch:
+        for item in _scan_all(table, ProjectionExpression="user_id, rollup_key"):
+            batch.delete_item(Key={"user_id": item["user_id"], "rollup_key": item["rollup_key"]})
+            user_ids.add(item["user_id"])
+    with table.batch_writer() as batch:
+        for (user_id, study_date, subject), (minutes, count) in totals.items():
+            batch.put_item(Item={
+                "user_id": user_id,
+                "rollup_key": _rollup_key(study_date, subject),
+                "study_date": study_date,
+                "subject": subject,
+                "total_minutes": minutes,
+                "record_count": count,
+            })
+
+    for user_id in user_ids:
+        _mark_changed(user_id, {"records": []})
+    return len(totals)
+
+
+def _iter_rollups(user_id: str, date_from: date, date_to: date) -> Iterator[dict]:
+    """期間内の日次・科目別集計を日付順に返す"""
+    items = _query_all(
+        _get_rollups_table(),
+        KeyConditionExpression=Key("user_id").eq(user_id)
+        & Key("rollup_key").between(f"{date_from}#", f"{date_to}#\uffff"),
+    )
+    for item in items:
+        if item["record_count"] > 0:
+            yield {
+                "study_date": item["study_date"],
+                "subject": item["subject"],
+                "total_minutes": int(item["total_minutes"]),
+                "record_count": int(item["record_count"]),
+            }
+
+
+def _aggregate_rollups(rollups: Iterable[dict], date_from: date, date_to: date) -> tuple[dict, list[dict]]:
+    """日次・科目別集計を 1 回走査し、統計サマリーと日別データを同時に作る"""
+    total_minutes = 0
+    total_records = 0
     subjects: dict[str, int] = {}
-    study_dates: set[str] = set()
+    day_map: dict[str, dict] = {}
 
-    for r in records:
-        subjects[r["subject"]] = subjects.get(r["subject"], 0) + r["duration_minutes"]
-        study_dates.add(r["study_date"])
+    for r in rollups:
+        total_minutes += r["total_minutes"]
+        total_records += r["record_count"]
+        subjects[r["subject"]] = subjects.get(r["subject"], 0) + r["total_minutes"]
+
+        d = r["study_date"]
+        if d not in day_map:
+            day_map[d] = {"date": d, "total_minutes": 0, "record_count": 0, "subjects": []}
+        day_map[d]["total_minutes"] += r["total_minutes"]
+        day_map[d]["record_count"] += r["record_count"]
+        day_map[d]["subjects"].append(r["subject"])
 
     days_in_range = (date_to - date_from).days + 1
-    daily_average = total_minutes / days_in_range if days_in_range > 0 else 0
+    daily_average = total_minutes / days_in_range if days_in_range > 0 else 0.0
 
-    return {
+    summary = {
         "total_minutes": total_minutes,
-        "total_records": len(records),
+        "total_records": total_records,
         "subjects": subjects,
         "daily_average_minutes": round(daily_average, 1),
-        "study_days": len(study_dates),
+        "study_days": len(day_map),
     }
+    # 集計アイテムは日付・科目の順に並んでいるため、日別データの並べ替えは不要
+    return summary, list(day_map.values())
 
 
-def get_calendar_data(user_id: str, year: int, month: int) -> list[dict]:
+@cached("records")
+def get_stats_summary(user_id: str, date_from: date, date_to: date) -> dict:
+    summary, _ = _aggregate_rollups(_iter_rollups(user_id, date_from, date_to), date_from, date_to)
+    return summary
+
+
+def _calendar_range(year: int, month: int) -> tuple[date, date]:
+    """月の初日と末日（日次集計は両端を含めて読むため、翌月 1 日は含めない）"""
     date_from = date(year, month, 1)
-    if month == 12:
-        date_to = date(year + 1, 1, 1)
-    else:
-        date_to = date(year, month + 1, 1)
+    return date_from, _next_bucket(date_from, "month") - timedelta(days=1)
 
-    records = list_records(user_id, date_from=date_from, date_to=date_to)
 
-    day_map: dict[str, dict] = {}
-    for r in records:
+def _month_span(month_from: str, month_to: str) -> tuple[date, date, int]:
+    """YYYY-MM の範囲を、最初の月の初日・最後の月の末日・月数にする"""
+    year_from, m_from = map(int, month_from.split("-"))
+    year_to, m_to = map(int, month_to.split("-"))
+    date_from, _ = _calendar_range(year_from, m_from)
+    _, date_to = _calendar_range(year_to, m_to)
+    return date_from, date_to, (year_to - year_from) * 12 + m_to - m_from + 1
+
+
+def _calendar_days(user_id: str, date_from: date, date_to: date) -> list[dict]:
+    _, days = _aggregate_rollups(_iter_rollups(user_id, date_from, date_to), date_from, date_to)
+    return days
+
+
+@cached("records")
+def get_calendar_data(user_id: str, year: int, month: int) -> list[dict]:
+    return _calendar_days(user_id, *_calendar_range(year, month))
+
+
+@cached("records")
+def get_calendar_range(user_id: str, date_from: date, date_to: date) -> list[dict]:
+    """複数か月分の日別データを、日次集計の範囲読み取り 1 回で返す"""
+    return _calendar_days(user_id, date_from, date_to)
+
+
+def _bucket_start(d: date, granularity: str) -> date:
+    """d を含む区間の開始日（week は月曜始まり）"""
+    if granularity == "week":
+        return d - timedelta(days=d.weekday())
+    if granularity == "month":
+        return d.replace(day=1)
+    return d
+
+
+def _next_bucket(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def _count_buckets(date_from: date, date_to: date, granularity: str) -> int:
+    if date_from > date_to:
+        return 0
+    if granularity == "week":
+        return (_bucket_start(date_to, "week") - _bucket_start(date_from, "week")).days // 7 + 1
+    if granularity == "month":
+        return (date_to.year - date_from.year) * 12 + date_to.month - date_from.month + 1
+    return (date_to - date_from).days + 1
+
+
+def _aggregate_timeseries(
+    rollups: Iterable[dict], date_from: date, date_to: date, granularity: str, split_by: str | None = None
+) -> dict:
+    """日次・科目別集計を 1 回走査し、区間ごとの系列を作る（記録のない区間も 0 で埋める）
+
+    区間は開始日で表す。最初・最後の区間は期間の外にはみ出しうるが、集計するのは期間内の分だけ。
+    """
+    starts = []
+    start = _bucket_start(date_from, granularity)
+    while start <= date_to:
+        starts.append(str(start))
+        start = _next_bucket(start, granularity)
+    index = {bucket: i for i, bucket in enumerate(starts)}
+    total_minutes = [0] * len(starts)
+    record_count = [0] * len(starts)
+    series: dict[str, list[int]] = {}
+    # 同じ日の集計は科目の数だけ続くため、日付から区間への変換は 1 日 1 回で済ませる
+    bucket_of: dict[str, int] = {}
+
+    for r in rollups:
         d = r["study_date"]
-        if d not in day_map:
-            day_map[d] = {"date": d, "total_minutes": 0, "record_count": 0, "subjects": set()}
-        day_map[d]["total_minutes"] += r["duration_minutes"]
-        day_map[d]["record_count"] += 1
-        day_map[d]["subjects"].add(r["subject"])
+        if d not in bucket_of:
+            bucket_of[d] = index[str(_bucket_start(date.fromisoformat(d), granularity))]
+        i = bucket_of[d]
+        total_minutes[i] += r["total_minutes"]
+        record_count[i] += r["record_count"]
+        if split_by == "subject":
+            series.setdefault(r["subject"], [0] * len(starts))[i] += r["total_minutes"]
+
+    return {
+        "granularity": granularity,
+        "buckets": starts,
+        "total_minutes": total_minutes,
+        "record_count": record_count,
+        "series": dict(sorted(series.items())) if split_by else None,
+    }
 
-    result = []
-    for day_data in sorted(day_map.values(), key=lambda x: x["date"]):
-        day_data["subjects"] = sorted(day_data["subjects"])
-        result.append(day_data)
 
+@cached("records")
+def get_timeseries(
+    user_id: str, date_from: date, date_to: date, granularity: str, split_by: str | None = None
+) -> dict:
+    rollups = _iter_rollups(user_id, date_from, date_to)
+    return _aggregate_timeseries(rollups, date_from, date_to, granularity, split_by)
+
+
+def _goal_progress(item: dict) -> dict:
+    """目標アイテムのカウンタから進捗を計算する（Goals API の get_goal_progress と同じ計算）"""
+    target = float(item["target_hours"])
+    current = round(int(item.get("current_minutes", 0)) / 60, 2)
+    progress = min(round((current / target) * 100, 1), 100.0) if target > 0 else 0.0
+
+    return {
+        "goal_id": item["goal_id"],
+        "title": item["title"],
+        "target_hours": target,
+        "current_hours": current,
+        "progress_percent": progress,
+        "remaining_hours": round(max(target - current, 0), 2),
+        "status": item["status"],
+        "records_count": int(item.get("records_count", 0)),
+    }
+
+
+def _list_active_goal_progress(user_id: str) -> list[dict]:
+    items = list(_query_all(
+        _get_goals_table(),
+        IndexName="status-index",
+        KeyConditionExpression=Key("user_id").eq(user_id) & Key("status").eq("active"),
+    ))
+    items.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+    return [_goal_progress(i) for i in items]
+
+
+def get_dashboard(user_id: str, date_from: date, date_to: date, recent_limit: int) -> dict:
+    """ダッシュボードに必要なデータを 1 回で返す
+
+    期間の集計は日次集計の範囲読み取り 1 回から、サマリー・日別・科目別をまとめて作る。
+    直近の記録と進行中の目標の読み取りは並行に行う。
+    """
+    records_query = _records_query_kwargs(user_id)
+    rollups, (recent, _), goals = _run_parallel([
+        partial(list, _iter_rollups(user_id, date_from, date_to)),
+        partial(_query_page, _get_records_table(), recent_limit, None, **records_query),
+        partial(_list_active_goal_progress, user_id),
+    ])
+    summary, daily = _aggregate_rollups(rollups, date_from, date_to)
+
+    return {
+        "summary": summary,
+        "daily": daily,
+        "recent_records": [_serialize_record(i) for i in recent],
+        "goals": goals,
+    }
+
+
+def get_analytics(user_id: str, date_from: date, date_to: date) -> dict:
+    """長い期間の統計（サマリー・日別・科目別・目標別）を学習記録のスナップショットから計算する
+
+    スナップショットは版数が変わるまで使い回すため、書き込み後の最初の 1 回だけ学習記録を全件読む（analytics.py）。
+    """
+    return get_snapshot(user_id, _get_repository()).analytics(date_from, date_to)
+
+
+def _sync_token(user_id: str, scope: str, version: dict) -> str:
+    return _encode_cursor(
+        {"user_id": user_id, "scope": scope, "version": version["version"], "updated_at": version["updated_at"]}
+    )
+
+
+def _is_sync_expired(updated_at: str | None) -> bool:
+    """トークンの版が変更ログの保持期間より古い（それ以降の変更ログが消えているかもしれない）"""
+    if not updated_at:
+        return False
+    cutoff = datetime.now(UTC) - timedelta(days=_get_settings().changes_retention_days)
+    return datetime.fromisoformat(updated_at) < cutoff
+
+
+def _collect_changes(
+    user_id: str,
+    scope: str,
+    since: str | None,
+    version: dict,
+    read_log: Callable[[int, int], Iterable[tuple[str, str]]],
+    fetch: Callable[[list[str]], list[dict]],
+    id_key: str,
+) -> dict:
+    """同期トークン since 以降の変更を、現在のアイテム（upserts）と削除された ID（deletes）にまとめる
+
+    変更ログは ID と操作だけを持つため、upsert は現在のアイテムを読んで返す（もう消えていれば削除として返す）。
+    トークンがない・保持期間を過ぎた・途中に一括の書き込みがある・変更が CHANGES_MAX_ITEMS 件を超える場合は
+    reset を返し、全件を読み直させる。
+    """
+    result = {"token": _sync_token(user_id, scope, version), "reset": False, "upserts": [], "deletes": []}
+    if since is None:
+        return {**result, "reset": True}
+    after = _decode_cursor(since)
+    try:
+        after_version = int(after["version"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidCursorError(since) from e
+    if after.get("user_id") != user_id or after.get("scope") != scope:
+        raise InvalidCursorError(since)
+    if after_version > version["version"] or _is_sync_expired(after.get("updated_at")):
+        return {**result, "reset": True}
+
+    # 同じ ID が何度も変わっていれば、最後の操作だけが残る
+    ops: dict[str, str] = {}
+    if after_version < version["version"]:
+        for item_id, op in read_log(after_version, version["version"]):
+            if op == "reset":
+                return {**result, "reset": True}
+            ops[item_id] = op
+    if len(ops) > _get_settings().changes_max_items:
+        return {**result, "reset": True}
+
+    found = {item[id_key]: item for item in fetch([i for i, op in ops.items() if op == "upsert"])}
+    result["upserts"] = [found[i] for i in ops if i in found]
+    result["deletes"] = [i for i in ops if i not in found]
     return result
 
 
+def _read_change_log(user_id: str, scope: str, after: int, until: int) -> Iterator[tuple[str, str]]:
+    entries = _query_all(
+        _get_changes_table(),
+        KeyConditionExpression=Key("user_id").eq(user_id)
+        & Key("change_key").between(_change_key(scope, after + 1), _change_key(scope, until)),
+    )
+    expected = after + 1
+    for entry in entries:
+        # 版が飛んでいれば、変更ログを書けなかった（または書き込み中の）版がある
+        if entry.get("reset") or entry["version"] != expected:
+            yield "", "reset"
+            return
+        expected += 1
+        yield from ((item_id, "upsert") for item_id in entry["upserts"])
+        yield from ((item_id, "delete") for item_id in entry["deletes"])
+    if expected != until + 1:
+        yield "", "reset"
+
+
+def _get_records_by_ids(user_id: str, record_ids: list[str]) -> list[dict]:
+    items, unread = _batch_get(
+        _get_records_table(), [{"user_id": user_id, "record_id": record_id} for record_id in record_ids]
+    )
+    if unread:
+        # 読めなかった分を削除として返さないよう、失敗させる
+        raise RuntimeError(f"学習記録を読み取れませんでした: {len(unread)} 件")
+    return [_serialize_record(item) for item in items]
+
+
+def get_changes(user_id: str, since: str | None) -> dict:
+    """同期トークン since 以降に作成・更新・削除された学習記録と、次の同期トークンを返す"""
+    return _collect_changes(
+        user_id,
+        "records",
+        since,
+        get_version(user_id, "records"),
+        partial(_read_change_log, user_id, "records"),
+        partial(_get_records_by_ids, user_id),
+        "record_id",
+    )
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
@@ -275,69 +1469,362 @@ def get_calendar_data(user_id: str, year: int, month: int) -> list[dict]:
 router = APIRouter()
 
 
+DEFAULT_PAGE_LIMIT = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# 統計は区間の翌日・翌週・翌月を計算するため、date の上限 (9999-12-31) の年は扱わない
+MAX_STATS_YEAR = 9998
+
+
+def _validator_headers(version: dict) -> dict[str, str]:
+    headers = {"ETag": f'W/"{version["version"]}"', "Cache-Control": "no-cache"}
+    if version["updated_at"]:
+        headers["Last-Modified"] = format_datetime(datetime.fromisoformat(version["updated_at"]), usegmt=True)
+    return headers
+
+
+def _is_not_modified(request: Request, version: dict, etag: str) -> bool:
+    """If-None-Match (優先) / If-Modified-Since を版数と比べる"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and version["updated_at"]:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        updated_at = datetime.fromisoformat(version["updated_at"]).replace(microsecond=0)
+        return updated_at <= since
+    return False
+
+
+def _check_stats_years(*years: int) -> None:
+    """統計の期間が扱える年に収まっているかを確かめる (範囲外は 400)"""
+    if any(not 1 <= year <= MAX_STATS_YEAR for year in years):
+        raise HTTPException(status_code=400, detail=f"年は 1〜{MAX_STATS_YEAR} の範囲で指定してください")
+
+
+def _check_date_range(date_from: date, date_to: date) -> None:
+    """期間の向きを確かめる (逆向きは 422。空の結果を返すと指定の誤りに気づけない)"""
+    if date_from > date_to:
+        raise HTTPException(status_code=422, detail="date_from には date_to 以前の日付を指定してください")
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """fields クエリ (カンマ区切り) を検証する。record_id は常に含める"""
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in StudyRecordResponse.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"不明なフィールドです: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(["record_id", *names]))
+
+
+@cache
+def _projected_list_adapter(fields: tuple[str, ...]) -> TypeAdapter:
+    """StudyRecordResponse から指定フィールドだけを持つ一覧用モデルを作る"""
+    model = create_model(
+        "StudyRecordProjection",
+        **{name: (StudyRecordResponse.model_fields[name].annotation, StudyRecordResponse.model_fields[name])
+           for name in fields},
+    )
+    return TypeAdapter(list[model])
+
+
+def _projected_response(items: list[dict], fields: tuple[str, ...], response: Response) -> Response:
+    adapter = _projected_list_adapter(fields)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(items)),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+
+def _get_json_response_class():
+    from main import json_response_class
+    return json_response_class
+
+
+def _trusted_response(content, response: Response) -> Response:
+    """内部で組み立てたデータを response_model で検証し直さずに返す
+
+    項目は書き込み時に検証済みで、_serialize_record が API の形に揃えている。件数の多い経路では
+    再検証を省いて直接直列化する（response_model は OpenAPI のスキーマとしてのみ使われる）。
+    """
+    return _get_json_response_class()(content, headers=dict(response.headers))
+
+
+async def _conditional_get(request: Request, response: Response, user_id: str, *scopes: str) -> Response | None:
+    """条件付き GET を処理する
+
+    データが変わっていなければ 304 を返す。変わっていれば検証子ヘッダーを response に付けて None を返す。
+    版数はデータより先に読むため、読み取り中に書き込みがあっても古い版数で新しいデータを返すだけで済む。
+    読んだ版数はキャッシュの世代にも使い、検証子と本文が同じ版数のものになるようにする。
+    """
+    version = await _run(_get_repository().get_combined_version, user_id, scopes)
+    headers = _validator_headers(version)
+    if _is_not_modified(request, version, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if len(scopes) == 1:
+        use_generation(scopes[0], user_id, version["version"])
+    response.headers.update(headers)
+    return None
+
+
 @router.get("/", response_model=list[StudyRecordResponse])
-def route_list_records(
+async def route_list_records(
+    request: Request,
+    response: Response,
     date_from: date | None = Query(None),
     date_to: date | None = Query(None),
     subject: str | None = Query(None),
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = Query(None),
+    fields: str | None = Query(None, description="返すフィールド (カンマ区切り)。指定したフィールドだけを読み取る"),
     user_id: str = Depends(get_user_id),
 ):
-    return list_records(user_id, date_from=date_from, date_to=date_to, subject=subject)
+    projection = _parse_fields(fields)
+    not_modified = await _conditional_get(request, response, user_id, "records")
+    if not_modified is not None:
+        return not_modified
+
+    if limit is None and cursor is None:
+        items = await _run(
+            _get_repository().list_records,
+            user_id,
+            date_from=date_from,
+            date_to=date_to,
+            subject=subject,
+            fields=projection,
+        )
+    else:
+        try:
+            items, next_cursor = await _run(
+                _get_repository().list_records_page,
+                user_id,
+                limit or DEFAULT_PAGE_LIMIT,
+                cursor,
+                date_from=date_from,
+                date_to=date_to,
+                subject=subject,
+                fields=projection,
+            )
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="カーソルが不正です")
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    if projection:
+        return _projected_response(items, projection, response)
+    return _trusted_response(items, response)
 
 
 @router.post("/", response_model=StudyRecordResponse, status_code=201)
-def route_create_record(
+async def route_create_record(
     body: StudyRecordCreate,
     user_id: str = Depends(get_user_id),
 ):
-    return create_record(user_id, body.model_dump())
+    return await _run(_get_repository().create_record, user_id, body.model_dump())
+
+
+def _check_batch_size(size: int) -> None:
+    limit = _get_settings().batch_max_items
+    if size > limit:
+        raise HTTPException(status_code=422, detail=f"一度に処理できるのは {limit} 件までです")
+
+
+@router.post("/batch", response_model=list[BatchItemResult])
+async def route_create_records_batch(
+    body: StudyRecordBatchCreate,
+    user_id: str = Depends(get_user_id),
+):
+    _check_batch_size(len(body.items))
+    return await _run(_get_repository().create_records_batch, user_id, body.items)
+
+
+@router.delete("/batch", response_model=list[BatchItemResult])
+async def route_delete_records_batch(
+    body: StudyRecordBatchDelete,
+    user_id: str = Depends(get_user_id),
+):
+    _check_batch_size(len(body.record_ids))
+    return await _run(_get_repository().delete_records_batch, user_id, body.record_ids)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def route_export_records(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    date_from: date | None = Query(None),
+    date_to: date | None = Query(None),
+    subject: str | None = Query(None),
+    user_id: str = Depends(get_user_id),
+):
+    return StreamingResponse(
+        export_records(user_id, fmt, date_from=date_from, date_to=date_to, subject=subject),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="records.{fmt}"'},
+    )
+
+
+@router.post("/import", response_model=ImportResult)
+async def route_import_records(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    user_id: str = Depends(get_user_id),
+):
+    lines = _iter_lines(request.stream())
+    rows = _parse_csv(lines) if fmt == "csv" else _parse_ndjson(lines)
+    return await import_records(user_id, rows)
+
+
+@router.get("/changes", response_model=RecordChangesResponse)
+async def route_get_changes(
+    response: Response,
+    since: str | None = Query(None, description="前回の応答の token。省略すると reset と現在の token だけを返す"),
+    user_id: str = Depends(get_user_id),
+):
+    try:
+        changes = await _run(_get_repository().get_changes, user_id, since)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="同期トークンが不正です")
+    return _trusted_response(changes, response)
+
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def route_get_dashboard(
+    request: Request,
+    response: Response,
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    recent_limit: int = Query(5, ge=1, le=50),
+    user_id: str = Depends(get_user_id),
+):
+    _check_date_range(date_from, date_to)
+    not_modified = await _conditional_get(request, response, user_id, "records", "goals")
+    if not_modified is not None:
+        return not_modified
+    dashboard = await _run(_get_repository().get_dashboard, user_id, date_from, date_to, recent_limit)
+    return _trusted_response(dashboard, response)
 
 
 @router.get("/stats/summary", response_model=StudyStatsSummary)
-def route_get_stats_summary(
+async def route_get_stats_summary(
+    request: Request,
+    response: Response,
     date_from: date = Query(...),
     date_to: date = Query(...),
     user_id: str = Depends(get_user_id),
 ):
-    return get_stats_summary(user_id, date_from, date_to)
+    not_modified = await _conditional_get(request, response, user_id, "records")
+    if not_modified is not None:
+        return not_modified
+    return await _run(_get_repository().get_stats_summary, user_id, date_from, date_to)
 
 
 @router.get("/stats/calendar", response_model=list[CalendarDay])
-def route_get_calendar_data(
+async def route_get_calendar_data(
+    request: Request,
+    response: Response,
     year: int = Query(...),
     month: int = Query(..., ge=1, le=12),
     user_id: str = Depends(get_user_id),
 ):
-    return get_calendar_data(user_id, year, month)
+    _check_stats_years(year)
+    not_modified = await _conditional_get(request, response, user_id, "records")
+    if not_modified is not None:
+        return not_modified
+    return _trusted_response(await _run(_get_repository().get_calendar_data, user_id, year, month), response)
+
+
+@router.get("/stats/calendar/range", response_model=list[CalendarDay])
+async def route_get_calendar_range(
+    request: Request,
+    response: Response,
+    month_from: str = Query(..., alias="from", pattern=r"^[1-9]\d{3}-(0[1-9]|1[0-2])$"),
+    month_to: str = Query(..., alias="to", pattern=r"^[1-9]\d{3}-(0[1-9]|1[0-2])$"),
+    user_id: str = Depends(get_user_id),
+):
+    _check_stats_years(int(month_from[:4]), int(month_to[:4]))
+    date_from, date_to, months = _month_span(month_from, month_to)
+    limit = _get_settings().calendar_max_months
+    if months < 1:
+        raise HTTPException(status_code=422, detail="from には to 以前の月を指定してください")
+    if months > limit:
+        raise HTTPException(status_code=422, detail=f"一度に返せるのは {limit} か月分までです")
+    not_modified = await _conditional_get(request, response, user_id, "records")
+    if not_modified is not None:
+        return not_modified
+    return _trusted_response(await _run(_get_repository().get_calendar_range, user_id, date_from, date_to), response)
+
+
+@router.get("/stats/timeseries", response_model=TimeseriesResponse)
+async def route_get_timeseries(
+    request: Request,
+    response: Response,
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    split_by: str | None = Query(None, pattern="^subject$"),
+    user_id: str = Depends(get_user_id),
+):
+    _check_stats_years(date_from.year, date_to.year)
+    _check_date_range(date_from, date_to)
+    limit = _get_settings().timeseries_max_buckets
+    if _count_buckets(date_from, date_to, granularity) > limit:
+        raise HTTPException(status_code=422, detail=f"一度に返せる区間は {limit} 個までです")
+    not_modified = await _conditional_get(request, response, user_id, "records")
+    if not_modified is not None:
+        return not_modified
+    timeseries = await _run(_get_repository().get_timeseries, user_id, date_from, date_to, granularity, split_by)
+    return _trusted_response(timeseries, response)
+
+
+@router.get("/stats/analytics", response_model=AnalyticsResponse)
+async def route_get_analytics(
+    request: Request,
+    response: Response,
+    date_from: date = Query(...),
+    date_to: date = Query(...),
+    user_id: str = Depends(get_user_id),
+):
+    not_modified = await _conditional_get(request, response, user_id, "records")
+    if not_modified is not None:
+        return not_modified
+    return _trusted_response(await _run(get_analytics, user_id, date_from, date_to), response)
 
 
 @router.get("/{record_id}", response_model=StudyRecordResponse)
-def route_get_record(
+async def route_get_record(
     record_id: str,
     user_id: str = Depends(get_user_id),
 ):
-    record = get_record(user_id, record_id)
+    record = await _run(_get_repository().get_record, user_id, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="学習記録が見つかりません")
     return record
 
 
 @router.put("/{record_id}", response_model=StudyRecordResponse)
-def route_update_record(
+async def route_update_record(
     record_id: str,
     body: StudyRecordUpdate,
     user_id: str = Depends(get_user_id),
 ):
-    record = update_record(user_id, record_id, body.model_dump(exclude_unset=True))
+    record = await _run(
+        _get_repository().update_record, user_id, record_id, body.model_dump(exclude_unset=True)
+    )
     if not record:
         raise HTTPException(status_code=404, detail="学習記録が見つかりません")
     return record
 
 
 @router.delete("/{record_id}", status_code=204)
-def route_delete_record(
+async def route_delete_record(
     record_id: str,
     user_id: str = Depends(get_user_id),
 ):
-    if not delete_record(user_id, record_id):
+    if not await _run(_get_repository().delete_record, user_id, record_id):
         raise HTTPException(status_code=404, detail="学習記録が見つかりません")
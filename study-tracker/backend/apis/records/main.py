@@ -1,22 +1,95 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic_settings import BaseSettings
 
+from cache import get_cache
+from compress import CompressionMiddleware
+from metrics import MetricsMiddleware, render_metrics
+
 
 class Settings(BaseSettings):
+    storage_backend: str = "dynamodb"
+    sqlite_path: str = "study-tracker.db"
+    sqlite_busy_timeout: float = 5.0
+    sqlite_synchronous: str = "NORMAL"
     dynamodb_endpoint: str = "http://localhost:8000"
     dynamodb_region: str = "ap-northeast-1"
     aws_access_key_id: str = "dummy"
     aws_secret_access_key: str = "dummy"
+    dynamodb_max_pool_connections: int = 100
+    dynamodb_max_concurrency: int = 100
+    dynamodb_tcp_keepalive: bool = True
+    dynamodb_connect_timeout: float = 2.0
+    dynamodb_read_timeout: float = 10.0
+    dynamodb_max_attempts: int = 3
+    dynamodb_retry_mode: str = "standard"
+    batch_max_items: int = 500
+    batch_max_retries: int = 5
+    batch_retry_base_delay: float = 0.05
+    cache_backend: str = "memory"
+    cache_ttl_seconds: float = 30.0
+    cache_max_entries: int = 10000
+    cache_max_entry_bytes: int = 262144
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_key_prefix: str = "study-tracker"
+    analytics_max_snapshots: int = 100
+    timeseries_max_buckets: int = 1000
+    calendar_max_months: int = 24
+    compression_encodings: str = "zstd,br,gzip"
+    compression_minimum_size: int = 1024
+    compression_content_types: str = "application/json,application/x-ndjson,text/csv"
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    server_mode: str = "dev"
+    server_runner: str = "uvicorn"
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0
+    server_loop: str = "auto"
+    server_http: str = "auto"
+    server_backlog: int = 2048
+    server_keepalive_seconds: int = 65
+    server_graceful_timeout: int = 30
+    server_max_requests: int = 0
+    server_preload: bool = True
+    server_access_log: bool = False
+    metrics_enabled: bool = True
+    metrics_consumed_capacity: bool = True
+    metrics_server_timing: bool = True
     cors_origins: str = "http://localhost:5173"
     default_user_id: str = "default-user"
     records_table_name: str = "study-tracker-records"
+    goals_table_name: str = "study-tracker-goals"
+    versions_table_name: str = "study-tracker-versions"
+    rollups_table_name: str = "study-tracker-rollups"
+    changes_table_name: str = "study-tracker-changes"
+    changes_retention_days: int = 7
+    changes_max_items: int = 1000
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
 settings = Settings()
 
+
+def _json_response_class() -> type[JSONResponse]:
+    """orjson があればそれで直列化する JSONResponse を返す（標準の json より速い）"""
+    try:
+        import orjson
+    except ImportError:
+        return JSONResponse
+
+    class ORJSONResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return orjson.dumps(content)
+
+    return ORJSONResponse
+
+
+json_response_class = _json_response_class()
+
 app = FastAPI(title="Records API", version="1.0.0")
 
 app.add_middleware(
@@ -25,7 +98,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Server-Timing"],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=[e.strip() for e in settings.compression_encodings.split(",") if e.strip()],
+    minimum_size=settings.compression_minimum_size,
+    content_types=[t.strip() for t in settings.compression_content_types.split(",") if t.strip()],
+    levels={
+        "gzip": settings.compression_gzip_level,
+        "br": settings.compression_brotli_quality,
+        "zstd": settings.compression_zstd_level,
+    },
+)
+if settings.metrics_enabled:
+    # 最後に追加したミドルウェアが最も外側になり、圧縮を含めたリクエスト全体を計測する
+    app.add_middleware(MetricsMiddleware, server_timing=settings.metrics_server_timing)
 
 
 @app.get("/health")
@@ -33,6 +121,16 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/cache/stats")
+def cache_stats():
+    return get_cache().stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 from handler import router  # noqa: E402
 
 app.include_router(router, prefix="/api/v1/records", tags=["records"])
@@ -0,0 +1,290 @@
+"""リクエスト単位の DynamoDB 計測と Prometheus 形式のメトリクス
+
+DynamoDB クライアントのイベントフックで、呼び出し回数・消費キャパシティ・所要時間を実行中の
+リクエスト (contextvars) に積み上げる。`handler._run` はコンテキストをコピーしてスレッドに渡すため、
+スレッドプールで実行した呼び出しも元のリクエストに数えられる。
+
+MetricsMiddleware はリクエストごとに集計を始め、レスポンスに Server-Timing ヘッダーを付け、
+終了時にプロセス内のメトリクスへ加算する。/metrics はそれを Prometheus のテキスト形式で返す。
+値はプロセスごとに持つため、SERVER_WORKERS が複数の場合はワーカーごとの値になる。
+
+ストリーミングのレスポンス (エクスポート) は、ヘッダー送信後の呼び出しが Server-Timing に含まれない
+(メトリクスには含まれる)。
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 読み取りとして数える操作 (それ以外の消費キャパシティは書き込みとして数える)
+_READ_OPERATIONS = frozenset({"GetItem", "BatchGetItem", "Query", "Scan", "TransactGetItems"})
+# ReturnConsumedCapacity を受け付ける操作
+_CAPACITY_OPERATIONS = _READ_OPERATIONS | {
+    "PutItem", "UpdateItem", "DeleteItem", "BatchWriteItem", "TransactWriteItems",
+}
+_STARTED_KEY = "study_tracker_metrics_started"
+
+
+# ---------------------------------------------------------------------------
+# Registry
+# ---------------------------------------------------------------------------
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        with self._lock:
+            return self._values.get(labelvalues, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, labelvalues)))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # ラベル値 → (バケットごとの件数, 合計, 件数)
+        self._values: dict[tuple, tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labelvalues: str, value: float) -> None:
+        with self._lock:
+            counts, total, count = self._values.get(labelvalues) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[labelvalues] = (counts, total + value, count + 1)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labelvalues, (counts, total, count) in sorted(self._values.items()):
+                labels = dict(zip(self.labelnames, labelvalues))
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': repr(bound)})} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "処理した HTTP リクエスト数", ("method", "route", "status")
+)
+HTTP_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP リクエストの処理時間", ("method", "route"), _LATENCY_BUCKETS
+)
+DYNAMODB_CALLS_PER_REQUEST = Histogram(
+    "http_request_dynamodb_calls", "1 リクエストあたりの DynamoDB 呼び出し回数", ("method", "route"),
+    (0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+DYNAMODB_CALLS = Counter(
+    "dynamodb_calls_total", "DynamoDB の呼び出し回数", ("operation", "status")
+)
+DYNAMODB_DURATION = Histogram(
+    "dynamodb_call_duration_seconds", "DynamoDB 呼び出しの所要時間 (リトライを含む)", ("operation",),
+    _LATENCY_BUCKETS,
+)
+DYNAMODB_READ_UNITS = Counter(
+    "dynamodb_consumed_read_capacity_units_total", "消費した読み込みキャパシティユニット", ("operation", "table")
+)
+DYNAMODB_WRITE_UNITS = Counter(
+    "dynamodb_consumed_write_capacity_units_total", "消費した書き込みキャパシティユニット", ("operation", "table")
+)
+
+_REGISTRY = (
+    HTTP_REQUESTS, HTTP_DURATION, DYNAMODB_CALLS_PER_REQUEST,
+    DYNAMODB_CALLS, DYNAMODB_DURATION, DYNAMODB_READ_UNITS, DYNAMODB_WRITE_UNITS,
+)
+
+
+def render_metrics() -> str:
+    """プロセス内のメトリクスを Prometheus のテキスト形式で返す"""
+    return "\n".join(line for metric in _REGISTRY for line in metric.render()) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Per-request stats
+# ---------------------------------------------------------------------------
+
+
+class RequestStats:
+    """1 リクエストで発生した DynamoDB 呼び出しの集計 (スレッドから並行に加算される)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, read_units: float, write_units: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+            self.read_units += read_units
+            self.write_units += write_units
+
+    def server_timing(self, total_seconds: float) -> str:
+        # 並行に実行した呼び出しは所要時間を単純に足すため、dynamodb の dur は total を超えることがある
+        with self._lock:
+            return (
+                f'dynamodb;dur={self.seconds * 1000:.1f};desc="{self.calls} calls", '
+                f'rcu;desc="{self.read_units:g}", wcu;desc="{self.write_units:g}", '
+                f"total;dur={total_seconds * 1000:.1f}"
+            )
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    """実行中のリクエストの集計を返す (リクエスト外なら None)"""
+    return _current.get()
+
+
+# ---------------------------------------------------------------------------
+# DynamoDB hooks
+# ---------------------------------------------------------------------------
+
+
+def _request_consumed_capacity(params, model, **kwargs) -> None:
+    if model.name in _CAPACITY_OPERATIONS:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+
+def _before_call(context, **kwargs) -> None:
+    context[_STARTED_KEY] = time.perf_counter()
+
+
+def _after_call(parsed, model, context, **kwargs) -> None:
+    started = context.pop(_STARTED_KEY, None)
+    seconds = time.perf_counter() - started if started is not None else 0.0
+    operation = model.name
+    error = (parsed or {}).get("Error", {}).get("Code")
+
+    read_units = write_units = 0.0
+    consumed = (parsed or {}).get("ConsumedCapacity") or []
+    for capacity in consumed if isinstance(consumed, list) else [consumed]:
+        table = capacity.get("TableName", "")
+        if "ReadCapacityUnits" in capacity or "WriteCapacityUnits" in capacity:
+            read, write = capacity.get("ReadCapacityUnits", 0.0), capacity.get("WriteCapacityUnits", 0.0)
+        elif operation in _READ_OPERATIONS:
+            read, write = capacity.get("CapacityUnits", 0.0), 0.0
+        else:
+            read, write = 0.0, capacity.get("CapacityUnits", 0.0)
+        if read:
+            DYNAMODB_READ_UNITS.inc(operation, table, amount=read)
+        if write:
+            DYNAMODB_WRITE_UNITS.inc(operation, table, amount=write)
+        read_units += read
+        write_units += write
+
+    DYNAMODB_CALLS.inc(operation, error or "ok")
+    DYNAMODB_DURATION.observe(operation, value=seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.add(seconds, read_units, write_units)
+
+
+def instrument_dynamodb(client, consumed_capacity: bool = True) -> None:
+    """DynamoDB クライアントに計測用のイベントフックを登録する (同じクライアントに何度呼んでもよい)"""
+    events = client.meta.events
+    if consumed_capacity:
+        events.register(
+            "before-parameter-build.dynamodb", _request_consumed_capacity,
+            unique_id="study-tracker-metrics-capacity",
+        )
+    events.register("before-call.dynamodb", _before_call, unique_id="study-tracker-metrics-before-call")
+    events.register("after-call.dynamodb", _after_call, unique_id="study-tracker-metrics-after-call")
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+
+def _route_label(scope: Scope) -> str:
+    """パスパラメータを {名前} に戻したパスを返す (ID ごとにラベルが増えないようにする)
+
+    ルートに一致しなかったリクエストは、任意のパスでラベルが増えないよう "unmatched" にまとめる。
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    for name, value in scope.get("path_params", {}).items():
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == str(value):
+                segments[i] = f"{{{name}}}"
+                break
+    return "/".join(segments)
+
+
+class MetricsMiddleware:
+    """リクエストごとに DynamoDB の集計を始め、Server-Timing ヘッダーとメトリクスに反映する"""
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route_path = _route_label(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route_path, str(status))
+            HTTP_DURATION.observe(method, route_path, value=time.perf_counter() - started)
+            DYNAMODB_CALLS_PER_REQUEST.observe(method, route_path, value=stats.calls)
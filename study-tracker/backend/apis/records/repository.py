@@ -0,0 +1,447 @@
+"""学習記録の保存先 (リポジトリ)
+
+ルートは get_repository() が返す実装を通して読み書きする。実装は STORAGE_BACKEND で選ぶ:
+    dynamodb  DynamoDB（既定）。handler のビジネスロジック（キャッシュ・日次集計・目標カウンタ）をそのまま使う
+    sqlite    組み込みの SQLite（SQLITE_PATH）。1 台で動かす構成向け。統計と目標の進捗は SQL の集約で計算する
+
+どちらも同じ形の dict を返す（_serialize_record / _aggregate_rollups / _goal_progress を共有する）。
+Records / Goals API は同じ STORAGE_BACKEND・SQLITE_PATH で動かす。
+"""
+import threading
+from collections.abc import Iterator
+from datetime import UTC, date, datetime
+from typing import Protocol
+
+import handler
+from handler import StudyRecordResponse, StudyRecordUpdate
+from sqlite_store import SQLiteStore
+
+
+class RecordRepository(Protocol):
+    def create_record(self, user_id: str, data: dict) -> dict: ...
+
+    def create_records_batch(self, user_id: str, payloads: list[dict]) -> list[dict]: ...
+
+    def get_record(self, user_id: str, record_id: str) -> dict | None: ...
+
+    def list_records(
+        self,
+        user_id: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        subject: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> list[dict]: ...
+
+    def list_records_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        subject: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> tuple[list[dict], str | None]: ...
+
+    def iter_records(
+        self,
+        user_id: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        subject: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> Iterator[dict]: ...
+
+    def update_record(self, user_id: str, record_id: str, data: dict) -> dict | None: ...
+
+    def delete_record(self, user_id: str, record_id: str) -> bool: ...
+
+    def delete_records_batch(self, user_id: str, record_ids: list[str]) -> list[dict]: ...
+
+    def get_stats_summary(self, user_id: str, date_from: date, date_to: date) -> dict: ...
+
+    def get_calendar_data(self, user_id: str, year: int, month: int) -> list[dict]: ...
+
+    def get_calendar_range(self, user_id: str, date_from: date, date_to: date) -> list[dict]: ...
+
+    def get_timeseries(
+        self, user_id: str, date_from: date, date_to: date, granularity: str, split_by: str | None = None
+    ) -> dict: ...
+
+    def get_dashboard(self, user_id: str, date_from: date, date_to: date, recent_limit: int) -> dict: ...
+
+    def get_combined_version(self, user_id: str, scopes: tuple[str, ...]) -> dict: ...
+
+    def get_changes(self, user_id: str, since: str | None) -> dict: ...
+
+
+# ---------------------------------------------------------------------------
+# DynamoDB
+# ---------------------------------------------------------------------------
+
+
+class DynamoDBRecordRepository:
+    """handler の DynamoDB 実装をそのまま使う"""
+
+    create_record = staticmethod(handler.create_record)
+    create_records_batch = staticmethod(handler.create_records_batch)
+    get_record = staticmethod(handler.get_record)
+    list_records = staticmethod(handler.list_records)
+    list_records_page = staticmethod(handler.list_records_page)
+    iter_records = staticmethod(handler._iter_records)
+    update_record = staticmethod(handler.update_record)
+    delete_record = staticmethod(handler.delete_record)
+    delete_records_batch = staticmethod(handler.delete_records_batch)
+    get_stats_summary = staticmethod(handler.get_stats_summary)
+    get_calendar_data = staticmethod(handler.get_calendar_data)
+    get_calendar_range = staticmethod(handler.get_calendar_range)
+    get_timeseries = staticmethod(handler.get_timeseries)
+    get_dashboard = staticmethod(handler.get_dashboard)
+    get_combined_version = staticmethod(handler._get_combined_version)
+    get_changes = staticmethod(handler.get_changes)
+
+
+# ---------------------------------------------------------------------------
+# SQLite
+# ---------------------------------------------------------------------------
+
+
+# API の項目とテーブルの列は同じ名前
+_RECORD_COLUMNS = tuple(StudyRecordResponse.model_fields)
+_UPDATABLE_COLUMNS = frozenset(StudyRecordUpdate.model_fields)
+# iter_records が 1 回に読む件数
+ITER_PAGE_SIZE = 1000
+
+_ROLLUPS_SQL = """
+    SELECT study_date, subject, SUM(duration_minutes) AS total_minutes, COUNT(*) AS record_count
+    FROM records
+    WHERE user_id = ? AND study_date BETWEEN ? AND ?
+    GROUP BY study_date, subject
+    ORDER BY study_date, subject
+"""
+
+_ACTIVE_GOALS_SQL = """
+    SELECT g.goal_id, g.title, g.target_hours, g.status,
+           COALESCE(SUM(r.duration_minutes), 0) AS current_minutes, COUNT(r.record_id) AS records_count
+    FROM goals g
+    LEFT JOIN records r ON r.user_id = g.user_id AND r.goal_id = g.goal_id
+    WHERE g.user_id = ? AND g.status = 'active'
+    GROUP BY g.user_id, g.goal_id
+    ORDER BY g.created_at DESC
+"""
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def _record_filters(
+    user_id: str, date_from: date | None, date_to: date | None, subject: str | None
+) -> tuple[list[str], list]:
+    clauses, params = ["user_id = ?"], [user_id]
+    if subject:
+        clauses.append("subject = ?")
+        params.append(subject)
+    if date_from:
+        clauses.append("study_date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        clauses.append("study_date <= ?")
+        params.append(str(date_to))
+    return clauses, params
+
+
+class SQLiteRecordRepository:
+    """学習記録を SQLite に保存する実装
+
+    日次集計と目標カウンタは持たず、書き込みは学習記録 1 行と版数だけを同じトランザクションで更新する。
+    統計は (user_id, study_date)、目標の進捗は (user_id, goal_id) のインデックスで範囲を読んで集約する。
+    読み取りはプロセス内で完結するため、キャッシュは使わない。
+    """
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def close(self) -> None:
+        self.store.close()
+
+    # --- 書き込み ---
+
+    def _insert(self, conn, items: list[dict]) -> None:
+        conn.executemany(
+            f"INSERT INTO records ({', '.join(_RECORD_COLUMNS)}) VALUES ({', '.join('?' * len(_RECORD_COLUMNS))})",
+            [tuple(item.get(column) for column in _RECORD_COLUMNS) for item in items],
+        )
+
+    def create_record(self, user_id: str, data: dict) -> dict:
+        item = handler._build_record_item(user_id, data, _now())
+        with self.store.transaction() as conn:
+            self._insert(conn, [item])
+            self.store.bump_versions(conn, user_id, handler._change_log([(None, item)]))
+        return handler._serialize_record(item)
+
+    def create_records_batch(self, user_id: str, payloads: list[dict]) -> list[dict]:
+        results, items = handler._build_batch_items(user_id, payloads, _now())
+        if items:
+            with self.store.transaction() as conn:
+                self._insert(conn, list(items.values()))
+                log = handler._change_log([(None, item) for item in items.values()])
+                self.store.bump_versions(conn, user_id, log)
+        for result in results:
+            if result["status"] == "created":
+                result["record"] = handler._serialize_record(items[result["record_id"]])
+        return results
+
+    def update_record(self, user_id: str, record_id: str, data: dict) -> dict | None:
+        update_fields = {
+            k: str(v) if hasattr(v, "isoformat") else v
+            for k, v in data.items()
+            if v is not None and k in _UPDATABLE_COLUMNS
+        }
+        if not update_fields:
+            return self.get_record(user_id, record_id)
+        update_fields["updated_at"] = _now()
+
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM records WHERE user_id = ? AND record_id = ?", (user_id, record_id)
+            ).fetchone()
+            if row is None:
+                return None
+            existing = dict(row)
+            conn.execute(
+                f"UPDATE records SET {', '.join(f'{k} = ?' for k in update_fields)} "
+                "WHERE user_id = ? AND record_id = ?",
+                (*update_fields.values(), user_id, record_id),
+            )
+            updated = {**existing, **update_fields}
+            self.store.bump_versions(conn, user_id, handler._change_log([(existing, updated)]))
+        return handler._serialize_record(updated)
+
+    def delete_record(self, user_id: str, record_id: str) -> bool:
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "DELETE FROM records WHERE user_id = ? AND record_id = ? RETURNING record_id, goal_id",
+                (user_id, record_id),
+            ).fetchone()
+            if row is None:
+                return False
+            self.store.bump_versions(conn, user_id, handler._change_log([(dict(row), None)]))
+        return True
+
+    def delete_records_batch(self, user_id: str, record_ids: list[str]) -> list[dict]:
+        unique_ids = list(dict.fromkeys(record_ids))
+        with self.store.transaction() as conn:
+            deleted = [
+                dict(row)
+                for row in conn.execute(
+                    f"DELETE FROM records WHERE user_id = ? AND record_id IN ({', '.join('?' * len(unique_ids))}) "
+                    "RETURNING record_id, goal_id",
+                    (user_id, *unique_ids),
+                )
+            ]
+            if deleted:
+                self.store.bump_versions(conn, user_id, handler._change_log([(row, None) for row in deleted]))
+
+        return handler._delete_results(record_ids, {row["record_id"] for row in deleted})
+
+    # --- 読み取り ---
+
+    def get_record(self, user_id: str, record_id: str) -> dict | None:
+        rows = self.store.query("SELECT * FROM records WHERE user_id = ? AND record_id = ?", (user_id, record_id))
+        return handler._serialize_record(rows[0]) if rows else None
+
+    def _select_records(
+        self,
+        user_id: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        subject: str | None = None,
+        fields: tuple[str, ...] | None = None,
+        after: dict | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """study_date・record_id の降順で読む（after はその位置より後ろから読む）"""
+        columns = list(dict.fromkeys([*(fields or _RECORD_COLUMNS), "study_date", "record_id"]))
+        unknown = set(columns) - set(_RECORD_COLUMNS)
+        if unknown:
+            raise ValueError(f"不明なフィールドです: {', '.join(sorted(unknown))}")
+
+        clauses, params = _record_filters(user_id, date_from, date_to, subject)
+        if after:
+            clauses.append("(study_date, record_id) < (?, ?)")
+            params += [after["study_date"], after["record_id"]]
+        sql = (
+            f"SELECT {', '.join(columns)} FROM records WHERE {' AND '.join(clauses)} "
+            "ORDER BY study_date DESC, record_id DESC"
+        )
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [handler._serialize_record(row) for row in self.store.query(sql, params)]
+
+    def list_records(
+        self,
+        user_id: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        subject: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> list[dict]:
+        return self._select_records(user_id, date_from, date_to, subject, fields)
+
+    def list_records_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: str | None = None,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        subject: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        cursor_filter = handler._cursor_filter(date_from, date_to, subject)
+        after = handler._check_cursor(cursor, user_id, cursor_filter, {"study_date", "record_id"}) if cursor else None
+
+        # 1 件多く読み、次ページがあるかを判定する
+        items = self._select_records(user_id, date_from, date_to, subject, fields, after, limit + 1)
+        if len(items) <= limit:
+            return items, None
+        last = items[limit - 1]
+        next_cursor = handler._encode_cursor({
+            "user_id": user_id, "study_date": last["study_date"], "record_id": last["record_id"],
+            handler.CURSOR_FILTER_ATTRIBUTE: cursor_filter,
+        })
+        return items[:limit], next_cursor
+
+    def iter_records(
+        self,
+        user_id: str,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        subject: str | None = None,
+        fields: tuple[str, ...] | None = None,
+    ) -> Iterator[dict]:
+        # ストリーミング中は呼び出しのたびにスレッドが変わりうるため、カーソルを開いたままにせずページ単位で読む
+        after = None
+        while True:
+            items = self._select_records(
+                user_id, date_from, date_to, subject, fields, after=after, limit=ITER_PAGE_SIZE
+            )
+            yield from items
+            if len(items) < ITER_PAGE_SIZE:
+                return
+            after = items[-1]
+
+    def _rollups(self, conn, user_id: str, date_from: date, date_to: date) -> list[dict]:
+        """期間内の日次・科目別集計を学習記録から集約する（DynamoDB の日次集計アイテムと同じ形）"""
+        return [dict(row) for row in conn.execute(_ROLLUPS_SQL, (user_id, str(date_from), str(date_to)))]
+
+    def get_stats_summary(self, user_id: str, date_from: date, date_to: date) -> dict:
+        rollups = self._rollups(self.store.connection(), user_id, date_from, date_to)
+        summary, _ = handler._aggregate_rollups(rollups, date_from, date_to)
+        return summary
+
+    def get_calendar_data(self, user_id: str, year: int, month: int) -> list[dict]:
+        return self.get_calendar_range(user_id, *handler._calendar_range(year, month))
+
+    def get_calendar_range(self, user_id: str, date_from: date, date_to: date) -> list[dict]:
+        rollups = self._rollups(self.store.connection(), user_id, date_from, date_to)
+        _, days = handler._aggregate_rollups(rollups, date_from, date_to)
+        return days
+
+    def get_timeseries(
+        self, user_id: str, date_from: date, date_to: date, granularity: str, split_by: str | None = None
+    ) -> dict:
+        rollups = self._rollups(self.store.connection(), user_id, date_from, date_to)
+        return handler._aggregate_timeseries(rollups, date_from, date_to, granularity, split_by)
+
+    def get_dashboard(self, user_id: str, date_from: date, date_to: date, recent_limit: int) -> dict:
+        # 集計・直近の記録・目標を同じ時点のデータで読む
+        with self.store.transaction(write=False) as conn:
+            rollups = self._rollups(conn, user_id, date_from, date_to)
+            recent = self._select_records(user_id, limit=recent_limit)
+            goals = [dict(row) for row in conn.execute(_ACTIVE_GOALS_SQL, (user_id,))]
+        summary, daily = handler._aggregate_rollups(rollups, date_from, date_to)
+
+        return {
+            "summary": summary,
+            "daily": daily,
+            "recent_records": recent,
+            "goals": [handler._goal_progress(goal) for goal in goals],
+        }
+
+    def get_combined_version(self, user_id: str, scopes: tuple[str, ...]) -> dict:
+        return handler._combine_versions(self.store.get_versions(user_id, scopes))
+
+    def _get_records_by_ids(self, user_id: str, record_ids: list[str]) -> list[dict]:
+        if not record_ids:
+            return []
+        rows = self.store.query(
+            f"SELECT * FROM records WHERE user_id = ? AND record_id IN ({', '.join('?' * len(record_ids))})",
+            (user_id, *record_ids),
+        )
+        return [handler._serialize_record(row) for row in rows]
+
+    def get_changes(self, user_id: str, since: str | None) -> dict:
+        # 版数・変更ログ・現在の学習記録を同じ時点のデータで読む
+        with self.store.transaction(write=False):
+            (version,) = self.store.get_versions(user_id, ("records",))
+            return handler._collect_changes(
+                user_id,
+                "records",
+                since,
+                version,
+                lambda after, until: self.store.read_changes(user_id, "records", after, until),
+                lambda record_ids: self._get_records_by_ids(user_id, record_ids),
+                "record_id",
+            )
+
+
+# ---------------------------------------------------------------------------
+# Repository
+# ---------------------------------------------------------------------------
+
+
+def _build_repository() -> RecordRepository:
+    s = handler._get_settings()
+    if s.storage_backend == "sqlite":
+        store = SQLiteStore(
+            s.sqlite_path,
+            busy_timeout=s.sqlite_busy_timeout,
+            synchronous=s.sqlite_synchronous,
+            changes_retention_days=s.changes_retention_days,
+        )
+        return SQLiteRecordRepository(store)
+    if s.storage_backend != "dynamodb":
+        raise RuntimeError(f"STORAGE_BACKEND は dynamodb / sqlite のいずれかです: {s.storage_backend}")
+    return DynamoDBRecordRepository()
+
+
+_repository: RecordRepository | None = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> RecordRepository:
+    """プロセス内で共有するリポジトリを返す（初回呼び出し時に設定から生成）"""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = _build_repository()
+    return _repository
+
+
+def set_repository(repository: RecordRepository | None) -> None:
+    """共有リポジトリを差し替える（以前のものが接続を持っていれば閉じる）"""
+    global _repository
+    with _repository_lock:
+        previous, _repository = _repository, repository
+    if previous is not None and previous is not repository and hasattr(previous, "close"):
+        previous.close()
+
+
+def reset_repository() -> None:
+    """共有リポジトリを破棄し、次回呼び出し時に設定から再生成させる"""
+    set_repository(None)
@@ -0,0 +1,100 @@
+"""API サーバーの起動
+
+SERVER_MODE で開発用と本番用を切り替える (Dockerfile の CMD はこのスクリプト)。
+
+    dev   uvicorn 1 プロセス。ファイルの変更を監視して自動で再起動する (既定)
+    prod  ワーカー複数・keep-alive / backlog / 終了待ちを設定して起動する。監視はしない
+
+prod のランナーは SERVER_RUNNER で選ぶ:
+    uvicorn   uvicorn のワーカー管理を使う (既定)
+    gunicorn  gunicorn + UvicornWorker。SERVER_PRELOAD=true ならアプリを読み込んでから fork する
+              (`gunicorn` パッケージが必要)
+
+DynamoDB リソース・スレッドプール・キャッシュは最初のリクエストで作るため、preload しても
+fork 前に接続やスレッドが作られることはない。
+
+    python serve.py
+"""
+import os
+
+from main import settings
+
+APP = "main:app"
+
+
+def _workers() -> int:
+    return settings.server_workers or os.cpu_count() or 1
+
+
+def _run_dev() -> None:
+    import uvicorn
+
+    uvicorn.run(APP, host=settings.server_host, port=settings.server_port, reload=True)
+
+
+def _run_uvicorn() -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=_workers(),
+        loop=settings.server_loop,
+        http=settings.server_http,
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_seconds,
+        timeout_graceful_shutdown=settings.server_graceful_timeout,
+        limit_max_requests=settings.server_max_requests or None,
+        access_log=settings.server_access_log,
+    )
+
+
+def _run_gunicorn() -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as e:
+        raise RuntimeError(
+            "SERVER_RUNNER=gunicorn には gunicorn パッケージが必要です (pip install gunicorn)"
+        ) from e
+
+    options = {
+        "bind": f"{settings.server_host}:{settings.server_port}",
+        "workers": _workers(),
+        # loop / http は auto (uvloop / httptools があればそれを使う)
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": settings.server_preload,
+        "backlog": settings.server_backlog,
+        "keepalive": settings.server_keepalive_seconds,
+        "graceful_timeout": settings.server_graceful_timeout,
+        "max_requests": settings.server_max_requests,
+        # 全ワーカーが同時に再起動しないよう、上限をばらつかせる
+        "max_requests_jitter": settings.server_max_requests // 10,
+        "accesslog": "-" if settings.server_access_log else None,
+    }
+
+    class _Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    _Application().run()
+
+
+def main() -> None:
+    if settings.server_mode == "dev":
+        _run_dev()
+    elif settings.server_mode != "prod":
+        raise RuntimeError(f"SERVER_MODE は dev / prod のいずれかです: {settings.server_mode}")
+    elif settings.server_runner == "gunicorn":
+        _run_gunicorn()
+    else:
+        _run_uvicorn()
+
+
+if __name__ == "__main__":
+    main()
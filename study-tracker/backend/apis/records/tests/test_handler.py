@@ -1,3 +1,8 @@
+import json
+import threading
+import time
+
+
 def test_health(client):
     resp = client.get("/health")
     assert resp.status_code == 200
@@ -134,3 +139,1106 @@ def test_calendar_data(client):
     assert data[0]["date"] == "2025-01-15"
     assert data[0]["total_minutes"] == 90
     assert data[0]["record_count"] == 2
+
+
+def test_dynamodb_resource_is_shared(dynamodb_mock):
+    import handler
+
+    handler.reset_dynamodb_resource()
+    resource = handler._get_dynamodb_resource()
+    assert handler._get_dynamodb_resource() is resource
+    settings = handler._get_settings()
+    assert resource.meta.client.meta.config.max_pool_connections == settings.dynamodb_max_pool_connections
+
+
+def test_number_deserializer_is_installed(dynamodb_mock):
+    # boto3 の非公開属性 (resource._injector) に依存しているため、boto3 の更新で
+    # 置き換えが効かなくなったらここで気付けるようにする (Decimal は orjson で直列化できない)
+    import handler
+
+    handler.reset_dynamodb_resource()
+    resource = handler._get_dynamodb_resource()
+    injector = getattr(resource, "_injector", None)
+    assert injector is not None, "boto3 の resource に _injector がない: _install_number_deserializer を見直すこと"
+    assert isinstance(injector._deserializer, handler._NumberDeserializer)
+
+
+def test_list_records_paginated(client):
+    for day in (15, 17, 16, 18, 14):
+        client.post("/api/v1/records/", json={
+            "study_date": f"2025-01-{day:02d}",
+            "subject": "Python",
+            "duration_minutes": 30,
+        })
+
+    dates = []
+    cursor = None
+    while True:
+        url = "/api/v1/records/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert len(resp.json()) <= 2
+        dates += [r["study_date"] for r in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert dates == [f"2025-01-{day}" for day in (18, 17, 16, 15, 14)]
+
+
+def test_list_records_invalid_cursor(client):
+    resp = client.get("/api/v1/records/?cursor=not-a-cursor")
+    assert resp.status_code == 400
+
+
+def test_list_records_rejects_cursor_from_other_filter(client):
+    for day in (15, 16, 17):
+        client.post("/api/v1/records/", json={"study_date": f"2025-01-{day}", "subject": "Python", "duration_minutes": 30})
+
+    cursor = client.get("/api/v1/records/?limit=1").headers["X-Next-Cursor"]
+    # 絞り込みなし (date-index) のカーソルを subject-index や別の期間の一覧には使えない
+    assert client.get(f"/api/v1/records/?limit=1&cursor={cursor}&subject=Python").status_code == 400
+    assert client.get(f"/api/v1/records/?limit=1&cursor={cursor}&date_from=2025-01-16").status_code == 400
+    assert client.get(f"/api/v1/records/?limit=1&cursor={cursor}").status_code == 200
+
+    cursor = client.get("/api/v1/records/?limit=1&subject=Python").headers["X-Next-Cursor"]
+    resp = client.get(f"/api/v1/records/?limit=1&cursor={cursor}&subject=Python")
+    assert resp.status_code == 200
+    assert [r["study_date"] for r in resp.json()] == ["2025-01-16"]
+
+
+def test_query_all_follows_last_evaluated_key(client, dynamodb_mock):
+    import handler
+    from boto3.dynamodb.conditions import Key
+
+    for i in range(3):
+        client.post("/api/v1/records/", json={
+            "study_date": "2025-01-15",
+            "subject": "Python",
+            "duration_minutes": 30 + i,
+        })
+
+    table = dynamodb_mock.Table("study-tracker-records")
+    items = list(handler._query_all(
+        table, KeyConditionExpression=Key("user_id").eq("default-user"), Limit=1
+    ))
+    assert len(items) == 3
+
+
+def test_list_records_by_subject_uses_subject_index(client):
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-10",
+        "subject": "Python",
+        "duration_minutes": 30,
+    })
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-12",
+        "subject": "TypeScript",
+        "duration_minutes": 45,
+    })
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-20",
+        "subject": "Python",
+        "duration_minutes": 60,
+    })
+
+    resp = client.get("/api/v1/records/?subject=Python")
+    assert resp.status_code == 200
+    records = resp.json()
+    assert [r["study_date"] for r in records] == ["2025-01-20", "2025-01-10"]
+    assert all("user_subject" not in r for r in records)
+
+    resp = client.get("/api/v1/records/?subject=Python&date_from=2025-01-15")
+    assert [r["study_date"] for r in resp.json()] == ["2025-01-20"]
+
+
+def test_update_record_subject_moves_between_subject_queries(client):
+    resp = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+    })
+    record_id = resp.json()["record_id"]
+
+    client.put(f"/api/v1/records/{record_id}", json={"subject": "Go"})
+
+    assert client.get("/api/v1/records/?subject=Python").json() == []
+    assert [r["record_id"] for r in client.get("/api/v1/records/?subject=Go").json()] == [record_id]
+
+
+def test_backfill_user_subject(client, dynamodb_mock):
+    import handler
+
+    dynamodb_mock.Table("study-tracker-records").put_item(Item={
+        "user_id": "default-user",
+        "record_id": "legacy-001",
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+        "created_at": "2025-01-15T00:00:00+00:00",
+        "updated_at": "2025-01-15T00:00:00+00:00",
+    })
+    assert client.get("/api/v1/records/?subject=Python").json() == []
+
+    assert handler.backfill_user_subject() == 1
+    assert [r["record_id"] for r in client.get("/api/v1/records/?subject=Python").json()] == ["legacy-001"]
+
+
+def _put_goal(dynamodb_mock, goal_id):
+    dynamodb_mock.Table("study-tracker-goals").put_item(Item={
+        "user_id": "default-user",
+        "goal_id": goal_id,
+        "title": goal_id,
+        "target_hours": 10,
+        "current_minutes": 0,
+        "records_count": 0,
+        "status": "active",
+    })
+
+
+def _goal_counters(dynamodb_mock, goal_id):
+    item = dynamodb_mock.Table("study-tracker-goals").get_item(
+        Key={"user_id": "default-user", "goal_id": goal_id}
+    )["Item"]
+    return int(item["current_minutes"]), int(item["records_count"])
+
+
+def test_record_writes_maintain_goal_counters(client, dynamodb_mock):
+    _put_goal(dynamodb_mock, "goal-a")
+    _put_goal(dynamodb_mock, "goal-b")
+
+    record_id = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+        "goal_id": "goal-a",
+    }).json()["record_id"]
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-16",
+        "subject": "Python",
+        "duration_minutes": 30,
+        "goal_id": "goal-a",
+    })
+    assert _goal_counters(dynamodb_mock, "goal-a") == (90, 2)
+
+    client.put(f"/api/v1/records/{record_id}", json={"duration_minutes": 45})
+    assert _goal_counters(dynamodb_mock, "goal-a") == (75, 2)
+
+    client.put(f"/api/v1/records/{record_id}", json={"goal_id": "goal-b"})
+    assert _goal_counters(dynamodb_mock, "goal-a") == (30, 1)
+    assert _goal_counters(dynamodb_mock, "goal-b") == (45, 1)
+
+    client.delete(f"/api/v1/records/{record_id}")
+    assert _goal_counters(dynamodb_mock, "goal-b") == (0, 0)
+
+
+def test_record_with_unknown_goal_does_not_create_goal(client, dynamodb_mock):
+    resp = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+        "goal_id": "missing-goal",
+    })
+    assert resp.status_code == 201
+
+    item = dynamodb_mock.Table("study-tracker-goals").get_item(
+        Key={"user_id": "default-user", "goal_id": "missing-goal"}
+    )
+    assert "Item" not in item
+
+
+def test_stats_follow_record_updates_and_deletes(client, dynamodb_mock):
+    record_id = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+    }).json()["record_id"]
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 30,
+    })
+
+    client.put(f"/api/v1/records/{record_id}", json={
+        "study_date": "2025-01-20",
+        "subject": "Go",
+        "duration_minutes": 45,
+    })
+    data = client.get("/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31").json()
+    assert data["total_minutes"] == 75
+    assert data["total_records"] == 2
+    assert data["subjects"] == {"Python": 30, "Go": 45}
+    assert data["study_days"] == 2
+
+    client.delete(f"/api/v1/records/{record_id}")
+    calendar = client.get("/api/v1/records/stats/calendar?year=2025&month=1").json()
+    assert [d["date"] for d in calendar] == ["2025-01-15"]
+
+    rollups = dynamodb_mock.Table("study-tracker-rollups").scan()["Items"]
+    assert [r["rollup_key"] for r in rollups] == ["2025-01-15#Python"]
+
+
+def test_rebuild_rollups(client, dynamodb_mock):
+    import handler
+
+    records_table = dynamodb_mock.Table("study-tracker-records")
+    for i, (study_date, subject) in enumerate((
+        ("2025-01-15", "Python"),
+        ("2025-01-15", "Python"),
+        ("2025-01-16", "Go"),
+    )):
+        records_table.put_item(Item={
+            "user_id": "default-user",
+            "record_id": f"legacy-{i}",
+            "study_date": study_date,
+            "subject": subject,
+            "duration_minutes": 30,
+            "created_at": "2025-01-15T00:00:00+00:00",
+            "updated_at": "2025-01-15T00:00:00+00:00",
+        })
+    dynamodb_mock.Table("study-tracker-rollups").put_item(Item={
+        "user_id": "default-user",
+        "rollup_key": "2025-01-01#stale",
+        "study_date": "2025-01-01",
+        "subject": "stale",
+        "total_minutes": 999,
+        "record_count": 9,
+    })
+
+    assert handler.rebuild_rollups() == 2
+
+    data = client.get("/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31").json()
+    assert data["total_minutes"] == 90
+    assert data["total_records"] == 3
+    assert data["subjects"] == {"Python": 60, "Go": 30}
+
+
+def test_create_records_batch(client, dynamodb_mock):
+    _put_goal(dynamodb_mock, "goal-a")
+    items = [
+        {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 30, "goal_id": "goal-a"},
+        {"study_date": "2025-01-15", "subject": "", "duration_minutes": 30},
+        {"study_date": "2025-01-16", "subject": "Go", "duration_minutes": 45},
+    ] + [
+        {"study_date": "2025-02-01", "subject": "SQL", "duration_minutes": 10}
+        for _ in range(30)
+    ]
+
+    resp = client.post("/api/v1/records/batch", json={"items": items})
+    assert resp.status_code == 200
+    results = resp.json()
+    assert [r["index"] for r in results] == list(range(len(items)))
+    assert results[0]["status"] == "created"
+    assert results[0]["record"]["subject"] == "Python"
+    assert results[1]["status"] == "error"
+    assert "subject" in results[1]["detail"]
+    assert sum(r["status"] == "created" for r in results) == 32
+
+    assert len(client.get("/api/v1/records/").json()) == 32
+    assert _goal_counters(dynamodb_mock, "goal-a") == (30, 1)
+    data = client.get("/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-02-28").json()
+    assert data["total_minutes"] == 375
+    assert data["total_records"] == 32
+
+
+def test_delete_records_batch(client, dynamodb_mock):
+    _put_goal(dynamodb_mock, "goal-a")
+    created = client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 30, "goal_id": "goal-a"},
+        {"study_date": "2025-01-16", "subject": "Go", "duration_minutes": 45},
+    ]}).json()
+    record_ids = [r["record_id"] for r in created]
+
+    resp = client.request("DELETE", "/api/v1/records/batch", json={
+        "record_ids": [record_ids[0], "missing", record_ids[1]],
+    })
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.json()] == ["deleted", "not_found", "deleted"]
+
+    assert client.get("/api/v1/records/").json() == []
+    assert _goal_counters(dynamodb_mock, "goal-a") == (0, 0)
+    assert dynamodb_mock.Table("study-tracker-rollups").scan()["Items"] == []
+
+
+def test_delete_records_batch_counts_records_deleted_concurrently_once(client, dynamodb_mock):
+    import handler
+
+    _put_goal(dynamodb_mock, "goal-a")
+    created = client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 30, "goal_id": "goal-a"},
+        {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 20, "goal_id": "goal-a"},
+    ]}).json()
+    raced, other = [r["record_id"] for r in created]
+
+    # 一括削除が送る直前に、同じ記録を単件の削除が先に消す
+    events = handler._get_dynamodb_resource().meta.client.meta.events
+    racing = []
+
+    def delete_first(params, **kwargs):
+        if not racing and raced in str(params.get("Key")):
+            racing.append(True)
+            assert handler.delete_record("default-user", raced)
+
+    events.register("before-parameter-build.dynamodb.DeleteItem", delete_first)
+    try:
+        resp = client.request("DELETE", "/api/v1/records/batch", json={"record_ids": [raced, other]})
+    finally:
+        events.unregister("before-parameter-build.dynamodb.DeleteItem", delete_first)
+
+    assert [r["status"] for r in resp.json()] == ["not_found", "deleted"]
+    assert _goal_counters(dynamodb_mock, "goal-a") == (0, 0)
+    assert dynamodb_mock.Table("study-tracker-rollups").scan()["Items"] == []
+
+
+def test_delete_records_batch_reports_duplicate_ids(client):
+    created = client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 30},
+        {"study_date": "2025-01-16", "subject": "Go", "duration_minutes": 45},
+    ]}).json()
+    first, second = [r["record_id"] for r in created]
+
+    resp = client.request("DELETE", "/api/v1/records/batch", json={
+        "record_ids": [first, first, "missing", "missing", second],
+    })
+    assert resp.status_code == 200
+    assert [r["status"] for r in resp.json()] == ["deleted", "duplicate", "not_found", "duplicate", "deleted"]
+    assert client.get("/api/v1/records/").json() == []
+    assert client.get("/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31").json()["total_records"] == 0
+
+
+def test_batch_rejects_too_many_items(client):
+    import handler
+
+    limit = handler._get_settings().batch_max_items
+    resp = client.request("DELETE", "/api/v1/records/batch", json={
+        "record_ids": [f"rec-{i}" for i in range(limit + 1)],
+    })
+    assert resp.status_code == 422
+
+
+def test_retry_unprocessed_backs_off_until_done():
+    import handler
+
+    calls = []
+
+    def send(pending):
+        calls.append(list(pending))
+        return pending[1:]
+
+    assert handler._retry_unprocessed(send, [1, 2, 3]) == []
+    assert calls == [[1, 2, 3], [2, 3], [3]]
+
+
+def test_export_records_ndjson(client):
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+        "memo": "FastAPI学習",
+    })
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-16",
+        "subject": "Go",
+        "duration_minutes": 30,
+    })
+
+    resp = client.get("/api/v1/records/export?format=ndjson")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["study_date"] for r in lines] == ["2025-01-16", "2025-01-15"]
+    assert lines[1]["memo"] == "FastAPI学習"
+    assert "user_subject" not in lines[0]
+
+
+def test_export_then_import_csv_round_trip(client, dynamodb_mock):
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+        "start_time": "09:00:00",
+        "memo": "1行目, カンマ\n2行目 \"引用\"",
+    })
+
+    exported = client.get("/api/v1/records/export?format=csv")
+    assert exported.status_code == 200
+    assert exported.text.splitlines()[0].startswith("record_id,study_date,subject")
+
+    client.delete(f"/api/v1/records/{client.get('/api/v1/records/').json()[0]['record_id']}")
+
+    resp = client.post(
+        "/api/v1/records/import?format=csv",
+        content=exported.content,
+        headers={"Content-Type": "text/csv"},
+    )
+    assert resp.status_code == 200
+    assert resp.json() == {"imported": 1, "failed": 0, "errors": [], "errors_truncated": False}
+
+    records = client.get("/api/v1/records/").json()
+    assert len(records) == 1
+    assert records[0]["memo"] == "1行目, カンマ\n2行目 \"引用\""
+    assert records[0]["start_time"] == "09:00:00"
+    assert records[0]["goal_id"] is None
+
+
+def test_import_ndjson_reports_row_errors(client):
+    body = "\n".join([
+        json.dumps({"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60}),
+        "{broken",
+        "",
+        json.dumps({"study_date": "2025-01-16", "subject": "Go", "duration_minutes": 0}),
+        json.dumps({"study_date": "2025-01-17", "subject": "Go", "duration_minutes": 30}),
+    ])
+
+    resp = client.post(
+        "/api/v1/records/import?format=ndjson",
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["imported"] == 2
+    assert data["failed"] == 2
+    assert [e["line"] for e in data["errors"]] == [2, 4]
+
+    summary = client.get("/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31").json()
+    assert summary["total_minutes"] == 90
+
+
+def test_import_keeps_only_the_first_errors(client, monkeypatch):
+    import handler
+
+    monkeypatch.setattr(handler, "IMPORT_MAX_ERRORS", 2)
+    body = "\n".join(["{broken"] * 5 + [
+        json.dumps({"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60}),
+    ])
+
+    resp = client.post(
+        "/api/v1/records/import?format=ndjson",
+        content=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["imported"] == 1
+    assert data["failed"] == 5
+    assert [e["line"] for e in data["errors"]] == [1, 2]
+    assert data["errors_truncated"] is True
+
+
+def test_update_and_delete_nonexistent_record(client):
+    resp = client.put("/api/v1/records/nonexistent", json={"memo": "更新"})
+    assert resp.status_code == 404
+
+    resp = client.delete("/api/v1/records/nonexistent")
+    assert resp.status_code == 404
+
+
+def test_update_record_is_single_write(client, dynamodb_mock):
+    record_id = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15",
+        "subject": "Python",
+        "duration_minutes": 60,
+    }).json()["record_id"]
+
+    operations = []
+    dynamodb_mock.meta.client.meta.events.register(
+        "before-call.dynamodb", lambda model, **kwargs: operations.append(model.name)
+    )
+
+    resp = client.put(f"/api/v1/records/{record_id}", json={"memo": "復習"})
+    assert resp.json()["memo"] == "復習"
+    assert resp.json()["duration_minutes"] == 60
+    # 学習記録の更新 1 回と、版数の割り当て (ADD で読み取りなし)・変更ログの書き込み
+    assert operations == ["UpdateItem", "UpdateItem", "PutItem"]
+
+
+def test_stats_are_cached_until_records_change(client, dynamodb_mock):
+    url = "/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31"
+    client.post("/api/v1/records/", json={"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60})
+
+    operations = []
+    dynamodb_mock.meta.client.meta.events.register(
+        "before-call.dynamodb", lambda model, **kwargs: operations.append(model.name)
+    )
+    assert client.get(url).json()["total_minutes"] == 60
+    assert client.get(url).json()["total_minutes"] == 60
+    # 版数の読み取り (キャッシュの世代にも使う) 以外はキャッシュから返る
+    assert operations == ["GetItem", "Query", "GetItem"]
+
+    client.post("/api/v1/records/", json={"study_date": "2025-01-16", "subject": "Python", "duration_minutes": 30})
+    assert client.get(url).json()["total_minutes"] == 90
+
+    stats = client.get("/cache/stats").json()
+    assert stats["by_function"]["get_stats_summary"] == {"hits": 1, "misses": 2}
+
+
+def test_cache_memory_backend_evicts_oldest_and_expired():
+    from cache import MemoryBackend
+
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", "1", ttl=60)
+    backend.set("b", "2", ttl=60)
+    backend.get("a")
+    backend.set("c", "3", ttl=60)
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == ("1", None, "3")
+
+    backend.set("d", "4", ttl=0)
+    assert backend.get("d") is None
+
+
+def test_cache_skips_values_larger_than_max_entry_bytes(client, dynamodb_mock):
+    from cache import Cache, MemoryBackend, set_cache
+
+    for day in ("2025-01-15", "2025-01-16"):
+        client.post("/api/v1/records/", json={"study_date": day, "subject": "Python", "duration_minutes": 60})
+    cache = Cache(MemoryBackend(max_entries=100), ttl=60, max_entry_bytes=200)
+    set_cache(cache)
+
+    # ページングなしの一覧は上限を超えるため保存しない。小さいサマリーは保存する
+    for _ in range(2):
+        assert len(client.get("/api/v1/records/").json()) == 2
+        client.get("/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31")
+    stats = cache.stats()
+    assert stats["by_function"]["list_records"] == {"hits": 0, "misses": 2}
+    assert stats["by_function"]["get_stats_summary"] == {"hits": 1, "misses": 1}
+    assert stats["oversized"] == 2
+
+
+class _FakeRedis:
+    """RedisBackend が使う get / set だけを持つ代用品"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, px=None):
+        self.data[key] = value.encode()
+
+
+def test_cache_redis_backend_is_shared_between_processes(client, dynamodb_mock):
+    from cache import Cache, RedisBackend, set_cache
+
+    server = _FakeRedis()
+    client.post("/api/v1/records/", json={"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60})
+    set_cache(Cache(RedisBackend(client=server), ttl=60))
+    assert len(client.get("/api/v1/records/").json()) == 1
+
+    # 同じサーバーを見る別のプロセスは、同じ版数のエントリを使う
+    other = Cache(RedisBackend(client=server), ttl=60)
+    set_cache(other)
+    assert len(client.get("/api/v1/records/").json()) == 1
+    assert other.stats()["hits"] == 1
+
+    client.post("/api/v1/records/", json={"study_date": "2025-01-16", "subject": "Python", "duration_minutes": 30})
+    assert len(client.get("/api/v1/records/").json()) == 2
+
+
+def test_conditional_get_returns_304_until_records_change(client):
+    url = "/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31"
+    client.post("/api/v1/records/", json={"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60})
+
+    resp = client.get(url)
+    etag = resp.headers["ETag"]
+    last_modified = resp.headers["Last-Modified"]
+    assert resp.status_code == 200
+
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["ETag"] == etag
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    client.post("/api/v1/records/", json={"study_date": "2025-01-16", "subject": "Python", "duration_minutes": 30})
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.json()["total_minutes"] == 90
+
+
+def test_record_write_with_goal_bumps_goals_version(client, dynamodb_mock):
+    import handler
+
+    _put_goal(dynamodb_mock, "goal-001")
+    client.post("/api/v1/records/", json={"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60})
+    assert handler.get_version("default-user", "goals")["version"] == 0
+
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60, "goal_id": "goal-001",
+    })
+    assert handler.get_version("default-user", "goals")["version"] == 1
+    assert handler.get_version("default-user", "records")["version"] == 2
+
+
+def test_dashboard(client, dynamodb_mock):
+    _put_goal(dynamodb_mock, "goal-001")
+    for day, subject, minutes, goal_id in [
+        ("2025-01-10", "Python", 60, "goal-001"),
+        ("2025-01-10", "SQL", 30, None),
+        ("2025-01-12", "Python", 90, None),
+        ("2024-12-31", "Python", 45, None),
+    ]:
+        body = {"study_date": day, "subject": subject, "duration_minutes": minutes}
+        if goal_id:
+            body["goal_id"] = goal_id
+        client.post("/api/v1/records/", json=body)
+
+    resp = client.get("/api/v1/records/dashboard?date_from=2025-01-01&date_to=2025-01-31&recent_limit=2")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["summary"] == client.get(
+        "/api/v1/records/stats/summary?date_from=2025-01-01&date_to=2025-01-31"
+    ).json()
+    assert data["summary"]["subjects"] == {"Python": 150, "SQL": 30}
+    assert [(d["date"], d["total_minutes"]) for d in data["daily"]] == [("2025-01-10", 90), ("2025-01-12", 90)]
+    assert [r["study_date"] for r in data["recent_records"]] == ["2025-01-12", "2025-01-10"]
+    assert data["goals"] == [{
+        "goal_id": "goal-001",
+        "title": "goal-001",
+        "target_hours": 10.0,
+        "current_hours": 1.0,
+        "progress_percent": 10.0,
+        "remaining_hours": 9.0,
+        "status": "active",
+        "records_count": 1,
+    }]
+
+    etag = resp.headers["ETag"]
+    url = "/api/v1/records/dashboard?date_from=2025-01-01&date_to=2025-01-31"
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def _track_in_flight(dynamodb_mock, delay=0.1):
+    """DynamoDB 呼び出しごとに delay 秒待たせ、同時に実行中だった呼び出しの最大数を数える"""
+    state = {"in_flight": 0, "max": 0}
+    lock = threading.Lock()
+
+    def before(**kwargs):
+        with lock:
+            state["in_flight"] += 1
+            state["max"] = max(state["max"], state["in_flight"])
+        time.sleep(delay)
+
+    def after(**kwargs):
+        with lock:
+            state["in_flight"] -= 1
+
+    dynamodb_mock.meta.client.meta.events.register("before-call.dynamodb", before)
+    dynamodb_mock.meta.client.meta.events.register("after-call.dynamodb", after)
+    return state
+
+
+def test_dashboard_reads_run_concurrently(client, dynamodb_mock):
+    _put_goal(dynamodb_mock, "goal-001")
+    client.post("/api/v1/records/", json={
+        "study_date": "2025-01-10", "subject": "Python", "duration_minutes": 60, "goal_id": "goal-001",
+    })
+    state = _track_in_flight(dynamodb_mock)
+
+    resp = client.get("/api/v1/records/dashboard?date_from=2025-01-01&date_to=2025-01-31")
+    assert resp.status_code == 200
+    assert resp.json()["summary"]["total_minutes"] == 60
+    # 日次集計・直近の記録・進行中の目標の読み取りが重なって実行される
+    assert state["max"] >= 3
+
+
+def test_list_records_with_fields(client, dynamodb_mock):
+    for day in ("2025-01-15", "2025-01-16", "2025-01-17"):
+        client.post("/api/v1/records/", json={
+            "study_date": day, "subject": "Python", "duration_minutes": 60, "memo": "長いメモ" * 100,
+        })
+
+    captured = []
+    dynamodb_mock.meta.client.meta.events.register(
+        "provide-client-params.dynamodb.Query", lambda params, **kwargs: captured.append(params)
+    )
+    resp = client.get("/api/v1/records/?fields=study_date,duration_minutes&limit=2")
+    assert resp.status_code == 200
+    assert resp.json() == [
+        {"record_id": resp.json()[0]["record_id"], "study_date": "2025-01-17", "duration_minutes": 60},
+        {"record_id": resp.json()[1]["record_id"], "study_date": "2025-01-16", "duration_minutes": 60},
+    ]
+    assert set(captured[0]["ExpressionAttributeNames"].values()) >= {"record_id", "study_date", "duration_minutes"}
+    assert "X-Next-Cursor" in resp.headers
+    assert "ETag" in resp.headers
+
+    resp = client.get("/api/v1/records/?fields=memo,unknown")
+    assert resp.status_code == 400
+
+
+def test_list_records_returns_native_numbers_and_defaults(client, dynamodb_mock):
+    import handler
+
+    client.post("/api/v1/records/", json={"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60})
+
+    item = handler._get_records_table().scan()["Items"][0]
+    assert type(item["duration_minutes"]) is int
+
+    resp = client.get("/api/v1/records/")
+    assert resp.status_code == 200
+    record = resp.json()[0]
+    assert record["duration_minutes"] == 60
+    assert record["start_time"] is None
+    assert record["end_time"] is None
+    assert record["goal_id"] is None
+    assert record["memo"] == ""
+    assert "user_subject" not in record
+
+
+def test_large_responses_are_compressed(client):
+    client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": f"2025-01-{day:02d}", "subject": "Python", "duration_minutes": 30, "memo": "復習"}
+        for day in range(1, 29)
+    ]})
+
+    resp = client.get("/api/v1/records/", headers={"Accept-Encoding": "br;q=0, gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert int(resp.headers["Content-Length"]) < len(resp.content)
+    assert len(resp.json()) == 28
+
+    # 最小サイズ未満・許可していない Content-Type・gzip を受け付けないクライアントは圧縮しない
+    assert "Content-Encoding" not in client.get("/health", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/docs", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/api/v1/records/", headers={"Accept-Encoding": "identity"}).headers
+
+    resp = client.get("/api/v1/records/export?format=csv", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert len(resp.text.splitlines()) == 29
+
+
+def test_parse_accept_encoding():
+    from compress import parse_accept_encoding
+
+    assert parse_accept_encoding("gzip, br;q=0.5, zstd;q=0") == {"gzip": 1.0, "br": 0.5, "zstd": 0.0}
+    assert parse_accept_encoding("") == {}
+
+
+def test_serve_prod_mode_passes_tuning_to_uvicorn(monkeypatch):
+    import uvicorn
+
+    import serve
+
+    calls = []
+    monkeypatch.setattr(uvicorn, "run", lambda app, **kwargs: calls.append((app, kwargs)))
+    monkeypatch.setattr(serve.settings, "server_mode", "prod")
+    monkeypatch.setattr(serve.settings, "server_workers", 4)
+
+    serve.main()
+    app, kwargs = calls[0]
+    assert app == "main:app"
+    assert kwargs["workers"] == 4
+    assert "reload" not in kwargs
+    assert kwargs["timeout_keep_alive"] == serve.settings.server_keepalive_seconds
+
+    monkeypatch.setattr(serve.settings, "server_mode", "dev")
+    serve.main()
+    assert calls[1][1]["reload"] is True
+
+
+def test_request_metrics_count_dynamodb_calls(client, dynamodb_mock):
+    import metrics
+
+    record_id = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60,
+    }).json()["record_id"]
+    # メトリクスはプロセス内で累積するため、増分で確かめる
+    before = metrics.HTTP_REQUESTS.value("GET", "/api/v1/records/dashboard", "200")
+
+    resp = client.get("/api/v1/records/dashboard?date_from=2025-01-01&date_to=2025-01-31")
+    timing = resp.headers["Server-Timing"]
+    # 版数 2 件、日次集計・直近の記録・目標の query 各 1 回
+    assert 'desc="5 calls"' in timing
+    assert "total;dur=" in timing
+    assert metrics.HTTP_REQUESTS.value("GET", "/api/v1/records/dashboard", "200") == before + 1
+
+    client.get(f"/api/v1/records/{record_id}")
+    client.get("/api/v1/records/unknown-path/x/y")
+    text = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/v1/records/{record_id}",status="200"}' in text
+    assert 'route="unmatched"' in text
+    assert 'dynamodb_consumed_read_capacity_units_total{operation="Query",table="study-tracker-rollups"}' in text
+    assert 'http_request_dynamodb_calls_bucket{method="GET",route="/api/v1/records/dashboard",le="5"}' in text
+
+
+def test_sqlite_store_uses_wal_and_indexes(sqlite_store):
+    import repository
+
+    conn = sqlite_store.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def plan(sql, params):
+        return " ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+    assert "records_user_date" in plan(repository._ROLLUPS_SQL, ("u", "2025-01-01", "2025-01-31"))
+    assert "records_user_goal" in plan(repository._ACTIVE_GOALS_SQL, ("u",))
+
+
+def test_sqlite_stats_and_goal_progress_are_aggregated_from_records(client, sqlite_store):
+    with sqlite_store.transaction() as conn:
+        conn.execute(
+            "INSERT INTO goals (user_id, goal_id, title, target_hours, created_at, updated_at) "
+            "VALUES ('default-user', 'goal-001', 'Python 100時間', 100, '2025-01-01', '2025-01-01')"
+        )
+    resp = client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 90, "goal_id": "goal-001"},
+        {"study_date": "2025-01-15", "subject": "英語", "duration_minutes": 30},
+        {"study_date": "2025-01-16", "subject": "Python", "duration_minutes": 30, "goal_id": "goal-001"},
+    ]})
+    ids = [r["record_id"] for r in resp.json()]
+    etag = client.get("/api/v1/records/dashboard?date_from=2025-01-15&date_to=2025-01-16").headers["ETag"]
+
+    client.put(f"/api/v1/records/{ids[2]}", json={"duration_minutes": 60})
+    client.delete(f"/api/v1/records/{ids[1]}")
+
+    resp = client.get("/api/v1/records/dashboard?date_from=2025-01-15&date_to=2025-01-16")
+    assert resp.headers["ETag"] != etag
+    body = resp.json()
+    assert body["summary"] == {
+        "total_minutes": 150,
+        "total_records": 2,
+        "subjects": {"Python": 150},
+        "daily_average_minutes": 75.0,
+        "study_days": 2,
+    }
+    assert [d["date"] for d in body["daily"]] == ["2025-01-15", "2025-01-16"]
+    assert body["goals"][0]["current_hours"] == 2.5
+    assert body["goals"][0]["records_count"] == 2
+
+
+def test_analytics_matches_stats_and_follows_writes(client):
+    import analytics
+
+    resp = client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": "2024-12-31", "subject": "Python", "duration_minutes": 20},
+        {"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 90, "goal_id": "goal-001"},
+        {"study_date": "2025-01-15", "subject": "英語", "duration_minutes": 30},
+        {"study_date": "2025-01-15", "subject": "Go", "duration_minutes": 15, "goal_id": "goal-002"},
+        {"study_date": "2025-03-02", "subject": "Go", "duration_minutes": 45, "goal_id": "goal-001"},
+    ]})
+    ids = [r["record_id"] for r in resp.json()]
+    query = "date_from=2025-01-01&date_to=2025-12-31"
+
+    body = client.get(f"/api/v1/records/stats/analytics?{query}").json()
+    assert body["summary"] == client.get(f"/api/v1/records/stats/summary?{query}").json()
+    assert body["daily"] == [
+        {"date": "2025-01-15", "total_minutes": 135, "record_count": 3, "subjects": ["Go", "Python", "英語"]},
+        {"date": "2025-03-02", "total_minutes": 45, "record_count": 1, "subjects": ["Go"]},
+    ]
+    assert body["subjects"] == [
+        {"subject": "Python", "total_minutes": 90, "record_count": 1},
+        {"subject": "Go", "total_minutes": 60, "record_count": 2},
+        {"subject": "英語", "total_minutes": 30, "record_count": 1},
+    ]
+    assert body["goals"] == [
+        {"goal_id": "goal-001", "total_minutes": 135, "record_count": 2},
+        {"goal_id": "goal-002", "total_minutes": 15, "record_count": 1},
+    ]
+
+    # 書き込みがなければスナップショットを使い回し、書き込み後は作り直す
+    snapshot = analytics._snapshots["default-user"]
+    client.get("/api/v1/records/stats/analytics?date_from=2024-12-01&date_to=2024-12-31")
+    assert analytics._snapshots["default-user"] is snapshot
+    client.delete(f"/api/v1/records/{ids[1]}")
+    body = client.get(f"/api/v1/records/stats/analytics?{query}").json()
+    assert analytics._snapshots["default-user"] is not snapshot
+    assert body["summary"]["total_minutes"] == 90
+    assert body["goals"] == [
+        {"goal_id": "goal-001", "total_minutes": 45, "record_count": 1},
+        {"goal_id": "goal-002", "total_minutes": 15, "record_count": 1},
+    ]
+
+
+def test_analytics_engines_agree():
+    import random
+    from datetime import date, timedelta
+
+    import pytest
+
+    import analytics
+
+    pytest.importorskip("numpy")
+    rng = random.Random(0)
+    records = [
+        {
+            "study_date": str(date(2023, 1, 1) + timedelta(days=rng.randrange(900))),
+            "subject": rng.choice(["Python", "Go", "英語", "数学"]),
+            "duration_minutes": rng.randint(1, 180),
+            "goal_id": rng.choice([None, None, "goal-a", "goal-b"]),
+        }
+        for _ in range(2000)
+    ]
+    columns, rows = analytics.RecordColumns(records), analytics.RecordRows(records)
+    for date_from, date_to in ((date(2023, 1, 1), date(2025, 12, 31)), (date(2024, 2, 1), date(2024, 2, 29))):
+        assert columns.analytics(date_from, date_to) == rows.analytics(date_from, date_to)
+    assert columns.analytics(date(2030, 1, 1), date(2030, 1, 31))["summary"]["total_records"] == 0
+    assert analytics.RecordColumns([]).analytics(date(2025, 1, 1), date(2025, 1, 31))["daily"] == []
+
+
+def test_timeseries_buckets_are_gap_filled(client):
+    client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": "2024-12-31", "subject": "Python", "duration_minutes": 20},
+        {"study_date": "2025-01-01", "subject": "Python", "duration_minutes": 60},
+        {"study_date": "2025-01-01", "subject": "英語", "duration_minutes": 30},
+        {"study_date": "2025-01-13", "subject": "Python", "duration_minutes": 45},
+        {"study_date": "2025-03-31", "subject": "英語", "duration_minutes": 15},
+    ]})
+
+    body = client.get(
+        "/api/v1/records/stats/timeseries?granularity=week&date_from=2025-01-01&date_to=2025-01-19"
+    ).json()
+    # 週は月曜始まり。2024-12-30 の週の 12/31 は期間外のため含まない
+    assert body == {
+        "granularity": "week",
+        "buckets": ["2024-12-30", "2025-01-06", "2025-01-13"],
+        "total_minutes": [90, 0, 45],
+        "record_count": [2, 0, 1],
+        "series": None,
+    }
+
+    body = client.get(
+        "/api/v1/records/stats/timeseries?granularity=month&date_from=2025-01-01&date_to=2025-03-31&split_by=subject"
+    ).json()
+    assert body["buckets"] == ["2025-01-01", "2025-02-01", "2025-03-01"]
+    assert body["total_minutes"] == [135, 0, 15]
+    assert body["series"] == {"Python": [105, 0, 0], "英語": [30, 0, 15]}
+
+    days = client.get("/api/v1/records/stats/timeseries?date_from=2024-12-31&date_to=2025-01-02").json()
+    assert days["buckets"] == ["2024-12-31", "2025-01-01", "2025-01-02"]
+    assert days["total_minutes"] == [20, 90, 0]
+
+    resp = client.get("/api/v1/records/stats/timeseries?granularity=day&date_from=2020-01-01&date_to=2025-01-01")
+    assert resp.status_code == 422
+    resp = client.get("/api/v1/records/stats/timeseries?granularity=year&date_from=2025-01-01&date_to=2025-01-31")
+    assert resp.status_code == 422
+
+
+def test_reversed_date_range_is_rejected(client):
+    for url in (
+        "/api/v1/records/stats/timeseries?date_from=2025-01-31&date_to=2025-01-01",
+        "/api/v1/records/stats/timeseries?granularity=month&date_from=2025-03-01&date_to=2025-01-01",
+        "/api/v1/records/dashboard?date_from=2025-01-31&date_to=2025-01-01",
+    ):
+        resp = client.get(url)
+        assert resp.status_code == 422
+        assert "date_to 以前" in resp.json()["detail"]
+
+    # 同じ日は 1 日分として扱う
+    assert client.get("/api/v1/records/dashboard?date_from=2025-01-01&date_to=2025-01-01").status_code == 200
+
+
+def test_calendar_range_spans_months_without_extra_days(client):
+    client.post("/api/v1/records/batch", json={"items": [
+        {"study_date": "2024-12-31", "subject": "Python", "duration_minutes": 20},
+        {"study_date": "2025-01-31", "subject": "Python", "duration_minutes": 60},
+        {"study_date": "2025-02-01", "subject": "英語", "duration_minutes": 30},
+        {"study_date": "2025-03-01", "subject": "英語", "duration_minutes": 15},
+    ]})
+
+    # 1 か月分は翌月 1 日を含まない
+    january = client.get("/api/v1/records/stats/calendar?year=2025&month=1").json()
+    assert [d["date"] for d in january] == ["2025-01-31"]
+    december = client.get("/api/v1/records/stats/calendar?year=2024&month=12").json()
+    assert [d["date"] for d in december] == ["2024-12-31"]
+
+    resp = client.get("/api/v1/records/stats/calendar/range?from=2024-12&to=2025-02")
+    assert resp.status_code == 200
+    assert resp.headers["ETag"]
+    assert [(d["date"], d["total_minutes"]) for d in resp.json()] == [
+        ("2024-12-31", 20), ("2025-01-31", 60), ("2025-02-01", 30),
+    ]
+
+    assert client.get("/api/v1/records/stats/calendar/range?from=2025-02&to=2025-01").status_code == 422
+    assert client.get("/api/v1/records/stats/calendar/range?from=2023-01&to=2025-01").status_code == 422
+    assert client.get("/api/v1/records/stats/calendar/range?from=2025-13&to=2025-12").status_code == 422
+
+
+def test_stats_reject_years_at_the_end_of_the_date_range(client):
+    # 9999 年 12 月の翌月は date で表せないため、500 ではなく 400 を返す
+    for url in (
+        "/api/v1/records/stats/calendar?year=9999&month=12",
+        "/api/v1/records/stats/calendar?year=0&month=1",
+        "/api/v1/records/stats/calendar/range?from=9999-11&to=9999-12",
+        "/api/v1/records/stats/timeseries?date_from=9999-12-01&date_to=9999-12-31&granularity=month",
+    ):
+        resp = client.get(url)
+        assert resp.status_code == 400, url
+    assert client.get("/api/v1/records/stats/calendar/range?from=9998-11&to=9998-12").status_code == 200
+
+
+def test_changes_returns_upserts_and_tombstones_since_token(client):
+    resp = client.get("/api/v1/records/changes")
+    assert resp.status_code == 200
+    first = resp.json()
+    assert first["reset"] is True
+    assert first["upserts"] == [] and first["deletes"] == []
+
+    kept = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60,
+    }).json()["record_id"]
+    removed = client.post("/api/v1/records/", json={
+        "study_date": "2025-01-16", "subject": "英語", "duration_minutes": 30,
+    }).json()["record_id"]
+    client.put(f"/api/v1/records/{kept}", json={"memo": "復習"})
+    client.delete(f"/api/v1/records/{removed}")
+
+    changes = client.get(f"/api/v1/records/changes?since={first['token']}").json()
+    assert changes["reset"] is False
+    # 何度変わっても最新の状態が 1 回だけ返る
+    assert [(r["record_id"], r["memo"]) for r in changes["upserts"]] == [(kept, "復習")]
+    assert changes["deletes"] == [removed]
+
+    # 新しい token 以降に変更がなければ空
+    unchanged = client.get(f"/api/v1/records/changes?since={changes['token']}").json()
+    assert unchanged["reset"] is False
+    assert unchanged["upserts"] == [] and unchanged["deletes"] == []
+    assert unchanged["token"] == changes["token"]
+
+    assert client.get("/api/v1/records/changes?since=not-a-token").status_code == 400
+
+
+def test_write_succeeds_and_sync_resets_when_change_log_write_fails(client, dynamodb_mock, monkeypatch):
+    import handler
+    from botocore.exceptions import ClientError
+
+    token = client.get("/api/v1/records/changes").json()["token"]
+
+    class _FailingTable:
+        def put_item(self, **kwargs):
+            raise ClientError({"Error": {"Code": "InternalServerError", "Message": "unavailable"}}, "PutItem")
+
+    # 学習記録の書き込みは確定しているので、変更ログを書けなくても 500 にしない
+    with monkeypatch.context() as m:
+        m.setattr(handler, "_get_changes_table", lambda: _FailingTable())
+        resp = client.post("/api/v1/records/", json={
+            "study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60,
+        })
+    assert resp.status_code == 201
+    assert len(client.get("/api/v1/records/").json()) == 1
+
+    # 変更ログが欠けた版をまたぐ同期は reset になる
+    changes = client.get(f"/api/v1/records/changes?since={token}").json()
+    assert changes["reset"] is True
+
+
+def test_cached_list_follows_writes_from_other_workers(client, dynamodb_mock):
+    from cache import Cache, MemoryBackend, get_cache, set_cache
+
+    url = "/api/v1/records/"
+    client.post(url, json={"study_date": "2025-01-15", "subject": "Python", "duration_minutes": 60})
+    resp = client.get(url)
+    etag = resp.headers["ETag"]
+    assert len(resp.json()) == 1
+
+    # 別のワーカー (キャッシュを共有しないプロセス) が書き込む
+    this_worker = get_cache()
+    set_cache(Cache(MemoryBackend(max_entries=100), ttl=60))
+    client.post(url, json={"study_date": "2025-01-16", "subject": "Python", "duration_minutes": 30})
+    set_cache(this_worker)
+
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert len(resp.json()) == 2
+    assert client.get(url, headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
@@ -1,13 +1,15 @@
 import Modal from "@/components/common/Modal";
 import { formatMinutes } from "@/utils/format";
 import { formatDateDisplay } from "@/utils/date";
-import type { StudyRecord } from "@/types/study";
+import type { StudyRecordFields } from "@/types/study";
+
+export type DayRecord = StudyRecordFields<"subject" | "duration_minutes" | "memo">;
 
 interface Props {
   open: boolean;
   onClose: () => void;
   date: string;
-  records: StudyRecord[];
+  records: DayRecord[];
 }
 
 export default function DayDetailModal({ open, onClose, date, records }: Props) {
@@ -0,0 +1,35 @@
+import { Link } from "react-router-dom";
+import Card from "@/components/common/Card";
+import ProgressBar from "@/components/common/ProgressBar";
+import { formatHours } from "@/utils/format";
+import type { GoalProgress } from "@/types/goal";
+
+interface Props {
+  goals: GoalProgress[];
+}
+
+export default function GoalProgressList({ goals }: Props) {
+  if (goals.length === 0) {
+    return <Card title="進行中の目標"><p className="text-gray-500 text-sm">データなし</p></Card>;
+  }
+
+  return (
+    <Card title="進行中の目標">
+      <div className="space-y-3">
+        {goals.map((goal) => (
+          <div key={goal.goal_id}>
+            <div className="flex justify-between text-sm mb-1">
+              <Link to={`/goals/${goal.goal_id}`} className="font-medium text-gray-700 hover:text-indigo-600">
+                {goal.title}
+              </Link>
+              <span className="text-gray-500">
+                {formatHours(goal.current_hours)} / {formatHours(goal.target_hours)} ({goal.progress_percent}%)
+              </span>
+            </div>
+            <ProgressBar percent={goal.progress_percent} />
+          </div>
+        ))}
+      </div>
+    </Card>
+  );
+}
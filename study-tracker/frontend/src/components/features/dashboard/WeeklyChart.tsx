@@ -1,21 +1,50 @@
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from "recharts";
 import Card from "@/components/common/Card";
-import type { CalendarDay } from "@/types/study";
+import type { Timeseries, TimeseriesGranularity } from "@/types/study";
 
 interface Props {
-  data: CalendarDay[];
+  data: Timeseries | null;
+  granularity: TimeseriesGranularity;
+  onGranularityChange: (granularity: TimeseriesGranularity) => void;
 }
 
-export default function WeeklyChart({ data }: Props) {
-  const chartData = data.map((d) => ({
-    date: d.date.slice(5),
-    minutes: d.total_minutes,
-    hours: +(d.total_minutes / 60).toFixed(1),
-  }));
+const GRANULARITIES: { value: TimeseriesGranularity; label: string }[] = [
+  { value: "day", label: "日" },
+  { value: "week", label: "週" },
+  { value: "month", label: "月" },
+];
+
+function bucketLabel(bucket: string, granularity: TimeseriesGranularity) {
+  if (granularity === "month") return bucket.slice(0, 7);
+  if (granularity === "week") return `${bucket.slice(5)}〜`;
+  return bucket.slice(5);
+}
+
+export default function WeeklyChart({ data, granularity, onGranularityChange }: Props) {
+  const chartData = data
+    ? data.buckets.map((bucket, i) => {
+        const minutes = data.total_minutes[i] ?? 0;
+        return { date: bucketLabel(bucket, data.granularity), minutes, hours: +(minutes / 60).toFixed(1) };
+      })
+    : [];
+  const hasData = chartData.some((d) => d.minutes > 0);
 
   return (
     <Card title="学習時間推移">
-      {chartData.length === 0 ? (
+      <div className="flex gap-1 mb-3">
+        {GRANULARITIES.map(({ value, label }) => (
+          <button
+            key={value}
+            onClick={() => onGranularityChange(value)}
+            className={`px-3 py-1 text-sm rounded-lg ${
+              value === granularity ? "bg-indigo-600 text-white" : "text-gray-600 hover:bg-gray-100"
+            }`}
+          >
+            {label}
+          </button>
+        ))}
+      </div>
+      {!hasData ? (
         <p className="text-gray-500 text-sm py-8 text-center">データなし</p>
       ) : (
         <ResponsiveContainer width="100%" height={250}>
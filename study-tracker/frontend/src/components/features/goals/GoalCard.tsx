@@ -2,10 +2,10 @@ import { Link } from "react-router-dom";
 import ProgressBar from "@/components/common/ProgressBar";
 import Button from "@/components/common/Button";
 import { formatHours } from "@/utils/format";
-import type { Goal } from "@/types/goal";
+import type { Goal, GoalWithProgress } from "@/types/goal";
 
 interface Props {
-  goal: Goal;
+  goal: GoalWithProgress;
   onDelete?: (goalId: string) => void;
   onStatusChange?: (goalId: string, status: Goal["status"]) => void;
 }
@@ -25,9 +25,7 @@ const statusColors: Record<Goal["status"], string> = {
 };
 
 export default function GoalCard({ goal, onDelete, onStatusChange }: Props) {
-  const progress = goal.target_hours > 0
-    ? Math.min(Math.round((goal.current_hours / goal.target_hours) * 100), 100)
-    : 0;
+  const progress = Math.round(goal.progress_percent);
 
   return (
     <div className="p-4 bg-white rounded-lg border border-gray-200 hover:shadow-sm transition-shadow">
@@ -1,9 +1,9 @@
 import GoalCard from "./GoalCard";
 import LoadingSpinner from "@/components/common/LoadingSpinner";
-import type { Goal } from "@/types/goal";
+import type { Goal, GoalWithProgress } from "@/types/goal";
 
 interface Props {
-  goals: Goal[];
+  goals: GoalWithProgress[];
   loading: boolean;
   onDelete?: (goalId: string) => void;
   onStatusChange?: (goalId: string, status: Goal["status"]) => void;
@@ -1,38 +1,89 @@
-import { useState, useEffect, useCallback } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 import { goalService } from "@/services/goalService";
-import type { Goal, GoalCreate, GoalUpdate } from "@/types/goal";
+import type { Changes } from "@/types/api";
+import type { Goal, GoalCreate, GoalUpdate, GoalWithProgress } from "@/types/goal";
+
+// 作成・更新のレスポンスには進捗が含まれないため、サーバーと同じ計算で補う
+function withProgress(goal: Goal): GoalWithProgress {
+  const progress = goal.target_hours > 0
+    ? Math.min(Math.round((goal.current_hours / goal.target_hours) * 1000) / 10, 100)
+    : 0;
+  return {
+    ...goal,
+    progress_percent: progress,
+    remaining_hours: Math.round(Math.max(goal.target_hours - goal.current_hours, 0) * 100) / 100,
+  };
+}
+
+// サーバーの一覧と同じ順 (created_at の降順) に並べる
+function byCreatedDesc(a: GoalWithProgress, b: GoalWithProgress): number {
+  return a.created_at < b.created_at ? 1 : a.created_at > b.created_at ? -1 : 0;
+}
+
+function applyChanges(
+  goals: GoalWithProgress[],
+  changes: Changes<GoalWithProgress>,
+  status?: string
+): GoalWithProgress[] {
+  const changed = new Set([...changes.deletes, ...changes.upserts.map((g) => g.goal_id)]);
+  return [
+    ...goals.filter((g) => !changed.has(g.goal_id)),
+    ...changes.upserts.filter((g) => !status || g.status === status),
+  ].sort(byCreatedDesc);
+}
 
 export function useGoals(status?: string) {
-  const [goals, setGoals] = useState<Goal[]>([]);
+  const [goals, setGoals] = useState<GoalWithProgress[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // 前回の同期位置。null なら次の fetch で一覧を全件読み直す
+  const token = useRef<string | null>(null);
+
+  const load = useCallback(async () => {
+    // 先に token を取り、一覧の読み取り中の変更も次の差分に含める
+    const start = await goalService.changes();
+    setGoals(await goalService.listProgress(status));
+    token.current = start.token;
+  }, [status]);
 
   const fetch = useCallback(async () => {
-    setLoading(true);
     setError(null);
     try {
-      const data = await goalService.list(status);
-      setGoals(data);
+      if (token.current === null) {
+        setLoading(true);
+        await load();
+        return;
+      }
+      // 学習記録の書き込みで進捗が変わった目標も差分に含まれる
+      const changes = await goalService.changes(token.current);
+      if (changes.reset) {
+        await load();
+        return;
+      }
+      setGoals((prev) => applyChanges(prev, changes, status));
+      token.current = changes.token;
     } catch (e) {
       setError(e instanceof Error ? e.message : "取得に失敗しました");
     } finally {
       setLoading(false);
     }
-  }, [status]);
+  }, [load, status]);
 
   useEffect(() => {
+    // 条件が変わったら差分ではなく読み直す
+    token.current = null;
     fetch();
   }, [fetch]);
 
   const create = async (data: GoalCreate) => {
     const goal = await goalService.create(data);
-    setGoals((prev) => [goal, ...prev]);
+    setGoals((prev) => [withProgress(goal), ...prev]);
     return goal;
   };
 
   const update = async (goalId: string, data: GoalUpdate) => {
     const goal = await goalService.update(goalId, data);
-    setGoals((prev) => prev.map((g) => (g.goal_id === goalId ? goal : g)));
+    setGoals((prev) => prev.map((g) => (g.goal_id === goalId ? withProgress(goal) : g)));
     return goal;
   };
 
@@ -1,49 +1,151 @@
-import { useState, useEffect, useCallback } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 import { studyService } from "@/services/studyService";
+import type { Changes, Page } from "@/types/api";
 import type { StudyRecord, StudyRecordCreate, StudyRecordUpdate } from "@/types/study";
 
-export function useStudyRecords(params?: {
+interface RecordFilter {
   date_from?: string;
   date_to?: string;
   subject?: string;
-}) {
-  const [records, setRecords] = useState<StudyRecord[]>([]);
+}
+
+function matches(record: StudyRecord, filter?: RecordFilter): boolean {
+  if (filter?.date_from && record.study_date < filter.date_from) return false;
+  if (filter?.date_to && record.study_date > filter.date_to) return false;
+  if (filter?.subject && record.subject !== filter.subject) return false;
+  return true;
+}
+
+// サーバーの一覧と同じ順 (study_date・record_id の降順) に並べる
+function byDateDesc(a: StudyRecord, b: StudyRecord): number {
+  if (a.study_date !== b.study_date) return a.study_date < b.study_date ? 1 : -1;
+  return a.record_id < b.record_id ? 1 : a.record_id > b.record_id ? -1 : 0;
+}
+
+// 読み込んだページと、続きのページのカーソル (X-Next-Cursor。null なら最後のページまで読んでいる)
+interface LoadedPages {
+  records: StudyRecord[];
+  nextCursor: string | null;
+}
+
+// 読み込んだページの範囲 (最後の記録より前) に入るか。続きのページにある記録はそのページで読む
+function inLoadedPages(record: StudyRecord, pages: LoadedPages): boolean {
+  const last = pages.records[pages.records.length - 1];
+  return pages.nextCursor === null || last === undefined || byDateDesc(record, last) <= 0;
+}
+
+function applyChanges(
+  pages: LoadedPages,
+  changes: Changes<StudyRecord>,
+  filter?: RecordFilter
+): LoadedPages {
+  const changed = new Set([...changes.deletes, ...changes.upserts.map((r) => r.record_id)]);
+  const records = [
+    ...pages.records.filter((r) => !changed.has(r.record_id)),
+    ...changes.upserts.filter((r) => matches(r, filter) && inLoadedPages(r, pages)),
+  ].sort(byDateDesc);
+  return { ...pages, records };
+}
+
+// 続きのページを足す (差分で先に入った記録は重ねない)
+function appendPage(pages: LoadedPages, page: Page<StudyRecord>): LoadedPages {
+  const loaded = new Set(pages.records.map((r) => r.record_id));
+  return {
+    records: [...pages.records, ...page.items.filter((r) => !loaded.has(r.record_id))].sort(byDateDesc),
+    nextCursor: page.nextCursor,
+  };
+}
+
+export function useStudyRecords(params?: RecordFilter, pageSize = 50) {
+  const [pages, setPages] = useState<LoadedPages>({ records: [], nextCursor: null });
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  // 前回の同期位置。null なら次の fetch で最初のページから読み直す
+  const token = useRef<string | null>(null);
+
+  const load = useCallback(async () => {
+    // 先に token を取り、一覧の読み取り中の変更も次の差分に含める (同じ変更を二度当てても結果は同じ)
+    const start = await studyService.changes();
+    const page = await studyService.listPage({ ...params, limit: pageSize });
+    setPages({ records: page.items, nextCursor: page.nextCursor });
+    token.current = start.token;
+  }, [params?.date_from, params?.date_to, params?.subject, pageSize]);
 
   const fetch = useCallback(async () => {
-    setLoading(true);
     setError(null);
     try {
-      const data = await studyService.list(params);
-      setRecords(data);
+      if (token.current === null) {
+        setLoading(true);
+        await load();
+        return;
+      }
+      const changes = await studyService.changes(token.current);
+      if (changes.reset) {
+        await load();
+        return;
+      }
+      setPages((prev) => applyChanges(prev, changes, params));
+      token.current = changes.token;
     } catch (e) {
       setError(e instanceof Error ? e.message : "取得に失敗しました");
     } finally {
       setLoading(false);
     }
-  }, [params?.date_from, params?.date_to, params?.subject]);
+  }, [load, params?.date_from, params?.date_to, params?.subject]);
+
+  const loadMore = useCallback(async () => {
+    if (pages.nextCursor === null) return;
+    setLoadingMore(true);
+    setError(null);
+    try {
+      const page = await studyService.listPage({ ...params, limit: pageSize, cursor: pages.nextCursor });
+      setPages((prev) => appendPage(prev, page));
+    } catch (e) {
+      setError(e instanceof Error ? e.message : "取得に失敗しました");
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [pages.nextCursor, params?.date_from, params?.date_to, params?.subject, pageSize]);
 
   useEffect(() => {
+    // 条件が変わったら差分ではなく読み直す
+    token.current = null;
     fetch();
   }, [fetch]);
 
   const create = async (data: StudyRecordCreate) => {
     const record = await studyService.create(data);
-    setRecords((prev) => [record, ...prev]);
+    setPages((prev) =>
+      inLoadedPages(record, prev) ? { ...prev, records: [record, ...prev.records].sort(byDateDesc) } : prev
+    );
     return record;
   };
 
   const update = async (recordId: string, data: StudyRecordUpdate) => {
     const record = await studyService.update(recordId, data);
-    setRecords((prev) => prev.map((r) => (r.record_id === recordId ? record : r)));
+    setPages((prev) => ({
+      ...prev,
+      records: prev.records.map((r) => (r.record_id === recordId ? record : r)),
+    }));
     return record;
   };
 
   const remove = async (recordId: string) => {
     await studyService.delete(recordId);
-    setRecords((prev) => prev.filter((r) => r.record_id !== recordId));
+    setPages((prev) => ({ ...prev, records: prev.records.filter((r) => r.record_id !== recordId) }));
   };
 
-  return { records, loading, error, refetch: fetch, create, update, remove };
+  return {
+    records: pages.records,
+    loading,
+    loadingMore,
+    hasMore: pages.nextCursor !== null,
+    error,
+    refetch: fetch,
+    loadMore,
+    create,
+    update,
+    remove,
+  };
 }
@@ -1,26 +1,46 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
+import { format, addMonths, subMonths } from "date-fns";
 import Card from "@/components/common/Card";
 import CalendarView from "@/components/features/calendar/CalendarView";
-import DayDetailModal from "@/components/features/calendar/DayDetailModal";
+import DayDetailModal, { type DayRecord } from "@/components/features/calendar/DayDetailModal";
 import { studyService } from "@/services/studyService";
-import type { CalendarDay, StudyRecord } from "@/types/study";
+import type { CalendarDay } from "@/types/study";
 
 export default function CalendarPage() {
   const [currentDate, setCurrentDate] = useState(new Date());
-  const [calendarData, setCalendarData] = useState<CalendarDay[]>([]);
+  const [calendarData, setCalendarData] = useState<Map<string, CalendarDay>>(new Map());
+  const loadedMonths = useRef(new Set<string>());
   const [selectedDate, setSelectedDate] = useState<string | null>(null);
-  const [dayRecords, setDayRecords] = useState<StudyRecord[]>([]);
+  const [dayRecords, setDayRecords] = useState<DayRecord[]>([]);
 
+  // 表示中の月と前後の月のうち未取得の分を 1 回で読む (前月・翌月に移ると、その先の 1 か月分だけを読み足す)
   useEffect(() => {
-    const year = currentDate.getFullYear();
-    const month = currentDate.getMonth() + 1;
-    studyService.getCalendarData(year, month).then(setCalendarData).catch(() => {});
+    const missing = [subMonths(currentDate, 1), currentDate, addMonths(currentDate, 1)]
+      .map((d) => format(d, "yyyy-MM"))
+      .filter((m) => !loadedMonths.current.has(m));
+    const from = missing[0];
+    const to = missing[missing.length - 1];
+    if (!from || !to) return;
+
+    studyService.getCalendarRange(from, to)
+      .then((days) => {
+        missing.forEach((m) => loadedMonths.current.add(m));
+        setCalendarData((prev) => {
+          const next = new Map(prev);
+          days.forEach((d) => next.set(d.date, d));
+          return next;
+        });
+      })
+      .catch(() => {});
   }, [currentDate]);
 
   const handleDayClick = async (date: string) => {
     setSelectedDate(date);
     try {
-      const records = await studyService.list({ date_from: date, date_to: date });
+      const records = await studyService.listFields(
+        ["subject", "duration_minutes", "memo"],
+        { date_from: date, date_to: date }
+      );
       setDayRecords(records);
     } catch {
       setDayRecords([]);
@@ -33,7 +53,7 @@ export default function CalendarPage() {
 
       <Card>
         <CalendarView
-          data={calendarData}
+          data={[...calendarData.values()]}
           currentDate={currentDate}
           onMonthChange={setCurrentDate}
           onDayClick={handleDayClick}
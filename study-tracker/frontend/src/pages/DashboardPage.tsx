@@ -1,48 +1,76 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useMemo } from "react";
+import { eachDayOfInterval, parseISO } from "date-fns";
 import StatsSummary from "@/components/features/dashboard/StatsSummary";
 import SubjectBreakdown from "@/components/features/dashboard/SubjectBreakdown";
 import WeeklyChart from "@/components/features/dashboard/WeeklyChart";
+import GoalProgressList from "@/components/features/dashboard/GoalProgressList";
 import StudyRecordList from "@/components/features/study/StudyRecordList";
 import Card from "@/components/common/Card";
 import { studyService } from "@/services/studyService";
-import { getMonthRange } from "@/utils/date";
-import type { StudyStatsSummary, CalendarDay, StudyRecord } from "@/types/study";
+import { formatDate, getMonthRange, getTimeseriesRange } from "@/utils/date";
+import type { CalendarDay, Dashboard, Timeseries, TimeseriesGranularity } from "@/types/study";
+
+// ダッシュボードの日別 (記録のある日だけ) を、記録のない日を 0 で埋めた日単位の系列にする
+function toDailyTimeseries(daily: CalendarDay[], from: string, to: string): Timeseries {
+  const byDate = new Map(daily.map((d) => [d.date, d]));
+  const buckets = eachDayOfInterval({ start: parseISO(from), end: parseISO(to) }).map((d) => formatDate(d));
+  return {
+    granularity: "day",
+    buckets,
+    total_minutes: buckets.map((b) => byDate.get(b)?.total_minutes ?? 0),
+    record_count: buckets.map((b) => byDate.get(b)?.record_count ?? 0),
+    series: null,
+  };
+}
 
 export default function DashboardPage() {
-  const [stats, setStats] = useState<StudyStatsSummary | null>(null);
-  const [calendarData, setCalendarData] = useState<CalendarDay[]>([]);
-  const [recentRecords, setRecentRecords] = useState<StudyRecord[]>([]);
+  const [dashboard, setDashboard] = useState<Dashboard | null>(null);
   const [loading, setLoading] = useState(true);
+  const [granularity, setGranularity] = useState<TimeseriesGranularity>("day");
+  const [timeseries, setTimeseries] = useState<Timeseries | null>(null);
+  const [range] = useState(() => getMonthRange());
 
   useEffect(() => {
-    const { from, to } = getMonthRange();
-    const now = new Date();
-
-    Promise.all([
-      studyService.getStatsSummary(from, to),
-      studyService.getCalendarData(now.getFullYear(), now.getMonth() + 1),
-      studyService.list(),
-    ]).then(([statsData, calData, records]) => {
-      setStats(statsData);
-      setCalendarData(calData);
-      setRecentRecords(records.slice(0, 5));
-      setLoading(false);
-    }).catch(() => setLoading(false));
-  }, []);
+    studyService.getDashboard(range.from, range.to)
+      .then((data) => {
+        setDashboard(data);
+        setLoading(false);
+      })
+      .catch(() => setLoading(false));
+  }, [range]);
+
+  // 日単位は今月分がダッシュボードの daily に含まれているので、それを使う
+  const dailyTimeseries = useMemo(
+    () => (dashboard ? toDailyTimeseries(dashboard.daily, range.from, range.to) : null),
+    [dashboard, range],
+  );
+
+  // 週・月は区間ごとにサーバーで集計した系列を読む (記録のない区間も 0 で埋まっている)
+  useEffect(() => {
+    if (granularity === "day") return;
+    const { from, to } = getTimeseriesRange(granularity);
+    studyService.getTimeseries(from, to, granularity).then(setTimeseries).catch(() => {});
+  }, [granularity]);
 
   return (
     <div className="space-y-6">
       <h1 className="text-2xl font-bold text-gray-900">ダッシュボード</h1>
 
-      <StatsSummary stats={stats} loading={loading} />
+      <StatsSummary stats={dashboard?.summary ?? null} loading={loading} />
 
       <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
-        <WeeklyChart data={calendarData} />
-        {stats && <SubjectBreakdown subjects={stats.subjects} />}
+        <WeeklyChart
+          data={granularity === "day" ? dailyTimeseries : timeseries}
+          granularity={granularity}
+          onGranularityChange={setGranularity}
+        />
+        {dashboard && <SubjectBreakdown subjects={dashboard.summary.subjects} />}
       </div>
 
+      {dashboard && <GoalProgressList goals={dashboard.goals} />}
+
       <Card title="最近の学習記録">
-        <StudyRecordList records={recentRecords} loading={loading} />
+        <StudyRecordList records={dashboard?.recent_records ?? []} loading={loading} />
       </Card>
     </div>
   );
@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import Card from "@/components/common/Card";
+import Button from "@/components/common/Button";
 import StudyRecordForm from "@/components/features/study/StudyRecordForm";
 import StudyRecordList from "@/components/features/study/StudyRecordList";
 import { useStudyRecords } from "@/hooks/useStudyRecords";
@@ -7,7 +8,7 @@ import { goalService } from "@/services/goalService";
 import type { Goal } from "@/types/goal";
 
 export default function StudyRecordPage() {
-  const { records, loading, create, remove } = useStudyRecords();
+  const { records, loading, loadingMore, hasMore, loadMore, create, remove } = useStudyRecords();
   const [goals, setGoals] = useState<Goal[]>([]);
 
   useEffect(() => {
@@ -27,6 +28,13 @@ export default function StudyRecordPage() {
 
       <Card title="記録一覧">
         <StudyRecordList records={records} loading={loading} onDelete={remove} />
+        {!loading && hasMore && (
+          <div className="mt-4 text-center">
+            <Button variant="secondary" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? "読み込み中..." : "さらに読み込む"}
+            </Button>
+          </div>
+        )}
       </Card>
     </div>
   );
@@ -1,22 +1,68 @@
+import type { Page } from "@/types/api";
+
 const API_BASE = "/api/v1";
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
 
-async function request<T>(path: string, options?: RequestInit): Promise<T> {
+interface CachedResponse {
+  etag: string | null;
+  lastModified: string | null;
+  body: unknown;
+  nextCursor: string | null;
+}
+
+// GET の検証子と本文をパスごとに保持し、次回は条件付きリクエストにする
+// (変更がなければ 304 が返り、本文の転送と解析を省ける)
+const validators = new Map<string, CachedResponse>();
+
+async function send(path: string, options?: RequestInit): Promise<Response> {
   const res = await fetch(`${API_BASE}${path}`, {
     headers: { "Content-Type": "application/json" },
     ...options,
   });
 
-  if (!res.ok) {
+  if (!res.ok && res.status !== 304) {
     const error = await res.json().catch(() => ({ detail: "不明なエラー" }));
     throw new Error(error.detail ?? `HTTP ${res.status}`);
   }
+  return res;
+}
 
+async function request<T>(path: string, options?: RequestInit): Promise<T> {
+  const res = await send(path, options);
   if (res.status === 204) return undefined as T;
   return res.json();
 }
 
+async function conditionalGet(path: string): Promise<CachedResponse> {
+  const cached = validators.get(path);
+  const headers: Record<string, string> = {};
+  if (cached?.etag) headers["If-None-Match"] = cached.etag;
+  if (cached?.lastModified) headers["If-Modified-Since"] = cached.lastModified;
+
+  const res = await send(path, { headers });
+  if (res.status === 304 && cached) return cached;
+
+  const entry: CachedResponse = {
+    etag: res.headers.get("ETag"),
+    lastModified: res.headers.get("Last-Modified"),
+    body: await res.json(),
+    nextCursor: res.headers.get(NEXT_CURSOR_HEADER),
+  };
+  if (entry.etag || entry.lastModified) validators.set(path, entry);
+  return entry;
+}
+
+async function requestPage<T>(path: string): Promise<Page<T>> {
+  const res = await conditionalGet(path);
+  return {
+    items: res.body as T[],
+    nextCursor: res.nextCursor,
+  };
+}
+
 export const api = {
-  get: <T>(path: string) => request<T>(path),
+  get: async <T>(path: string) => (await conditionalGet(path)).body as T,
+  getPage: <T>(path: string) => requestPage<T>(path),
   post: <T>(path: string, body: unknown) =>
     request<T>(path, { method: "POST", body: JSON.stringify(body) }),
   put: <T>(path: string, body: unknown) =>
@@ -1,5 +1,6 @@
 import { api } from "./api";
-import type { Goal, GoalCreate, GoalUpdate, GoalProgress } from "@/types/goal";
+import type { Changes } from "@/types/api";
+import type { Goal, GoalCreate, GoalUpdate, GoalProgress, GoalWithProgress } from "@/types/goal";
 
 const BASE = "/goals";
 
@@ -9,6 +10,11 @@ export const goalService = {
     return api.get<Goal[]>(`${BASE}/${qs}`);
   },
 
+  listProgress(status?: string) {
+    const qs = status ? `?status=${status}` : "";
+    return api.get<GoalWithProgress[]>(`${BASE}/progress${qs}`);
+  },
+
   get(goalId: string) {
     return api.get<Goal>(`${BASE}/${goalId}`);
   },
@@ -25,6 +31,12 @@ export const goalService = {
     return api.delete(`${BASE}/${goalId}`);
   },
 
+  // since を省略すると reset と現在の token だけが返る
+  changes(since?: string) {
+    const qs = since ? `?since=${encodeURIComponent(since)}` : "";
+    return api.get<Changes<GoalWithProgress>>(`${BASE}/changes${qs}`);
+  },
+
   getProgress(goalId: string) {
     return api.get<GoalProgress>(`${BASE}/${goalId}/progress`);
   },
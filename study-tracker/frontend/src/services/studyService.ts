@@ -1,10 +1,16 @@
 import { api } from "./api";
+import type { Changes } from "@/types/api";
 import type {
   StudyRecord,
+  StudyRecordFields,
   StudyRecordCreate,
+  StudyRecordBatchResult,
   StudyRecordUpdate,
   StudyStatsSummary,
   CalendarDay,
+  Dashboard,
+  Timeseries,
+  TimeseriesGranularity,
 } from "@/types/study";
 
 const BASE = "/records";
@@ -19,6 +25,34 @@ export const studyService = {
     return api.get<StudyRecord[]>(`${BASE}/${qs ? `?${qs}` : ""}`);
   },
 
+  listFields<K extends keyof StudyRecord>(
+    fields: K[],
+    params?: { date_from?: string; date_to?: string; subject?: string }
+  ) {
+    const query = new URLSearchParams();
+    if (params?.date_from) query.set("date_from", params.date_from);
+    if (params?.date_to) query.set("date_to", params.date_to);
+    if (params?.subject) query.set("subject", params.subject);
+    query.set("fields", fields.join(","));
+    return api.get<StudyRecordFields<K>[]>(`${BASE}/?${query.toString()}`);
+  },
+
+  listPage(params?: {
+    date_from?: string;
+    date_to?: string;
+    subject?: string;
+    limit?: number;
+    cursor?: string;
+  }) {
+    const query = new URLSearchParams();
+    if (params?.date_from) query.set("date_from", params.date_from);
+    if (params?.date_to) query.set("date_to", params.date_to);
+    if (params?.subject) query.set("subject", params.subject);
+    query.set("limit", String(params?.limit ?? 100));
+    if (params?.cursor) query.set("cursor", params.cursor);
+    return api.getPage<StudyRecord>(`${BASE}/?${query.toString()}`);
+  },
+
   get(recordId: string) {
     return api.get<StudyRecord>(`${BASE}/${recordId}`);
   },
@@ -27,6 +61,10 @@ export const studyService = {
     return api.post<StudyRecord>(`${BASE}/`, data);
   },
 
+  createMany(items: StudyRecordCreate[]) {
+    return api.post<StudyRecordBatchResult[]>(`${BASE}/batch`, { items });
+  },
+
   update(recordId: string, data: StudyRecordUpdate) {
     return api.put<StudyRecord>(`${BASE}/${recordId}`, data);
   },
@@ -35,12 +73,40 @@ export const studyService = {
     return api.delete(`${BASE}/${recordId}`);
   },
 
+  // since を省略すると reset と現在の token だけが返る
+  changes(since?: string) {
+    const qs = since ? `?since=${encodeURIComponent(since)}` : "";
+    return api.get<Changes<StudyRecord>>(`${BASE}/changes${qs}`);
+  },
+
+  getDashboard(dateFrom: string, dateTo: string, recentLimit = 5) {
+    return api.get<Dashboard>(
+      `${BASE}/dashboard?date_from=${dateFrom}&date_to=${dateTo}&recent_limit=${recentLimit}`
+    );
+  },
+
   getStatsSummary(dateFrom: string, dateTo: string) {
     return api.get<StudyStatsSummary>(
       `${BASE}/stats/summary?date_from=${dateFrom}&date_to=${dateTo}`
     );
   },
 
+  // from / to は YYYY-MM (両端の月を含む)
+  getCalendarRange(from: string, to: string) {
+    return api.get<CalendarDay[]>(`${BASE}/stats/calendar/range?from=${from}&to=${to}`);
+  },
+
+  getTimeseries(
+    dateFrom: string,
+    dateTo: string,
+    granularity: TimeseriesGranularity = "day",
+    splitBySubject = false
+  ) {
+    const query = new URLSearchParams({ date_from: dateFrom, date_to: dateTo, granularity });
+    if (splitBySubject) query.set("split_by", "subject");
+    return api.get<Timeseries>(`${BASE}/stats/timeseries?${query.toString()}`);
+  },
+
   getCalendarData(year: number, month: number) {
     return api.get<CalendarDay[]>(
       `${BASE}/stats/calendar?year=${year}&month=${month}`
@@ -1,3 +1,16 @@
 export interface ApiError {
   detail: string;
 }
+
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
+// 差分同期 (/changes) の応答。reset なら upserts / deletes は空で、一覧を読み直す
+export interface Changes<T> {
+  token: string;
+  reset: boolean;
+  upserts: T[];
+  deletes: string[];
+}
@@ -8,10 +8,16 @@ export interface Goal {
   status: "active" | "completed" | "paused" | "abandoned";
   target_date?: string;
   subject: string;
+  records_count: number;
   created_at: string;
   updated_at: string;
 }
 
+export interface GoalWithProgress extends Goal {
+  progress_percent: number;
+  remaining_hours: number;
+}
+
 export interface GoalCreate {
   title: string;
   description?: string;
@@ -1,3 +1,5 @@
+import type { GoalProgress } from "./goal";
+
 export interface StudyRecord {
   record_id: string;
   user_id: string;
@@ -12,6 +14,9 @@ export interface StudyRecord {
   updated_at: string;
 }
 
+// fields 指定の一覧取得で返る形 (record_id は常に含まれる)
+export type StudyRecordFields<K extends keyof StudyRecord> = Pick<StudyRecord, K | "record_id">;
+
 export interface StudyRecordCreate {
   study_date: string;
   subject: string;
@@ -46,3 +51,29 @@ export interface CalendarDay {
   record_count: number;
   subjects: string[];
 }
+
+export type TimeseriesGranularity = "day" | "week" | "month";
+
+// 区間ごとの系列 (buckets は区間の開始日。記録のない区間も 0 で埋まる)
+export interface Timeseries {
+  granularity: TimeseriesGranularity;
+  buckets: string[];
+  total_minutes: number[];
+  record_count: number[];
+  series: Record<string, number[]> | null;
+}
+
+export interface StudyRecordBatchResult {
+  index: number;
+  status: "created" | "deleted" | "not_found" | "duplicate" | "error";
+  record_id?: string;
+  record?: StudyRecord;
+  detail?: string;
+}
+
+export interface Dashboard {
+  summary: StudyStatsSummary;
+  daily: CalendarDay[];
+  recent_records: StudyRecord[];
+  goals: GoalProgress[];
+}
@@ -1,5 +1,6 @@
-import { format, startOfWeek, endOfWeek, startOfMonth, endOfMonth } from "date-fns";
+import { format, startOfWeek, endOfWeek, startOfMonth, endOfMonth, subWeeks, subMonths } from "date-fns";
 import { ja } from "date-fns/locale";
+import type { TimeseriesGranularity } from "@/types/study";
 
 export function formatDate(date: Date | string): string {
   const d = typeof date === "string" ? new Date(date) : date;
@@ -24,3 +25,14 @@ export function getMonthRange(date: Date = new Date()) {
     to: formatDate(endOfMonth(date)),
   };
 }
+
+// 学習時間推移の表示期間 (day: 今月、week: 直近 12 週、month: 直近 12 か月)
+export function getTimeseriesRange(granularity: TimeseriesGranularity, date: Date = new Date()) {
+  if (granularity === "week") {
+    return { from: getWeekRange(subWeeks(date, 11)).from, to: getWeekRange(date).to };
+  }
+  if (granularity === "month") {
+    return { from: getMonthRange(subMonths(date, 11)).from, to: getMonthRange(date).to };
+  }
+  return getMonthRange(date);
+}